@@ -18,8 +18,15 @@ This module also functions as a :command:`cat` substitute that can handle
 compressed files. It it used by :py:mod:`local <mrjob.local>` mode and can
 function without the rest of the mrjob library.
 """
+import heapq
+import os
+import struct
 import sys
+import threading
 import zlib
+from binascii import hexlify
+from binascii import unhexlify
+from itertools import chain
 
 try:
     import bz2
@@ -27,9 +34,45 @@ try:
 except ImportError:
     bz2 = None
 
+try:
+    from queue import Empty
+    from queue import Full
+    from queue import Queue
+except ImportError:
+    from Queue import Empty
+    from Queue import Full
+    from Queue import Queue
 
-def bunzip2_stream(fileobj, bufsize=1024):
-    """Decompress gzipped data on the fly.
+try:
+    import lz4.frame as lz4_frame
+    lz4_frame  # quiet "redefinition of unused ..." warning from pyflakes
+except ImportError:
+    lz4_frame = None
+
+try:
+    import zstandard
+    zstandard  # quiet "redefinition of unused ..." warning from pyflakes
+except ImportError:
+    zstandard = None
+
+# we need this flag to read gzip rather than raw zlib, but it's not
+# actually defined in zlib, so we define it here.
+_READ_GZIP_DATA = 16
+
+# how many bytes to read from files at a time
+_READ_SIZE = 1024 * 1024
+
+# how many chunks of decompressed data a background thread can get ahead
+# by (see decompress())
+_BACKGROUND_MAX_CHUNKS = 4
+
+# how often a background thread that's waiting for its chunks to be read
+# checks if it should give up, in seconds
+_BACKGROUND_POLL_INTERVAL = 0.1
+
+
+def bunzip2_stream(fileobj, bufsize=_READ_SIZE):
+    """Decompress bzip2ed data on the fly.
 
     :param fileobj: object supporting ``read()``
     :param bufsize: number of bytes to read from *fileobj* at a time.
@@ -38,6 +81,12 @@ def bunzip2_stream(fileobj, bufsize=1024):
 
         This yields decompressed chunks; it does *not* split on lines. To get
         lines, wrap this in :py:func:`to_lines`.
+
+    .. versionchanged:: 0.5.8
+       Reads every stream of a file made of several bzip2 streams
+       concatenated together (e.g. from :command:`pbzip2`), like
+       :command:`bzip2 -d` does, rather than stopping after the first one.
+       *bufsize* defaults to 1 MiB rather than 1 KiB.
     """
     if bz2 is None:
         raise Exception(
@@ -50,44 +99,99 @@ def bunzip2_stream(fileobj, bufsize=1024):
         if not chunk:
             return
 
-        part = d.decompress(chunk)
-        if part:
-            yield part
+        # handle several bzip2 streams concatenated together (e.g. from
+        # pbzip2), like the bzip2 command does
+        while chunk:
+            try:
+                part = d.decompress(chunk)
+            except EOFError:
+                # the last stream ended at the end of the previous chunk
+                d = bz2.BZ2Decompressor()
+                continue
 
+            if part:
+                yield part
 
-def gunzip_stream(fileobj, bufsize=1024):
+            chunk = d.unused_data
+            if chunk:
+                d = bz2.BZ2Decompressor()
+
+
+def gunzip_stream(fileobj, bufsize=_READ_SIZE):
     """Decompress gzipped data on the fly.
 
     :param fileobj: object supporting ``read()``
-    :param bufsize: number of bytes to read from *fileobj* at a time. The
-                    default is the same as in :py:mod:`gzip`.
+    :param bufsize: number of bytes to read from *fileobj* at a time.
 
     .. warning::
 
         This yields decompressed chunks; it does *not* split on lines. To get
         lines, wrap this in :py:func:`to_lines`.
+
+    .. versionchanged:: 0.5.8
+       Reads every member of a file made of several gzip members
+       concatenated together (e.g. from :command:`bgzip`), like
+       :command:`gunzip` does, rather than stopping after the first one.
+       *bufsize* defaults to 1 MiB rather than 1 KiB.
     """
     # see Issue #601 for why we need this.
+    d = zlib.decompressobj(_READ_GZIP_DATA | zlib.MAX_WBITS)
+    while True:
+        chunk = fileobj.read(bufsize)
+        if not chunk:
+            return
+        # handle several gzip members concatenated together, like gzip
+        # does (ignoring any zero padding at the end)
+        while chunk:
+            data = d.decompress(chunk)
+            if data:
+                yield data
 
-    # we need this flag to read gzip rather than raw zlib, but it's not
-    # actually defined in zlib, so we define it here.
-    READ_GZIP_DATA = 16
-    d = zlib.decompressobj(READ_GZIP_DATA | zlib.MAX_WBITS)
+            chunk = d.unused_data.lstrip(b'\0')
+            if chunk:
+                d = zlib.decompressobj(_READ_GZIP_DATA | zlib.MAX_WBITS)
+
+
+def _decompress_stream(fileobj, decompressor, bufsize=_READ_SIZE):
+    """Decompress data from *fileobj* on the fly, using *decompressor*,
+    which has a ``decompress()`` method (like the objects returned by
+    :py:func:`zlib.decompressobj`).
+
+    This yields decompressed chunks; it does *not* split on lines.
+    """
     while True:
         chunk = fileobj.read(bufsize)
         if not chunk:
             return
-        data = d.decompress(chunk)
+
+        data = decompressor.decompress(chunk)
         if data:
             yield data
 
 
-
-def decompress(fileobj, path):
+def decompress(fileobj, path, background=False):
     """Take a *fileobj* correponding to the given path and returns an iterator
     that yield chunks of bytes, or, if *path* doesn't correspond to a
     compressed file type, *fileobj* itself.
+
+    Besides ``.gz`` and ``.bz2``, this handles the types of files that
+    :py:func:`compress` writes.
+
+    If *background* is true, read and decompress *fileobj* in a background
+    thread (see :py:func:`_decompress_in_background`), so that this can
+    happen while you process the chunks.
     """
+    chunks = _decompress(fileobj, path)
+
+    if background and chunks is not fileobj:
+        return _decompress_in_background(chunks)
+    else:
+        return chunks
+
+
+def _decompress(fileobj, path):
+    """Implementation of :py:func:`decompress`, without the background
+    thread."""
     if path.endswith('.gz'):
         return gunzip_stream(fileobj)
     elif path.endswith('.bz2'):
@@ -96,24 +200,770 @@ def decompress(fileobj, path):
                             ' (likely not installed).')
         else:
             return bunzip2_stream(fileobj)
+    elif path.endswith('.deflate'):
+        return _decompress_stream(fileobj, zlib.decompressobj())
+    elif path.endswith('.lz4'):
+        if lz4_frame is None:
+            raise Exception('lz4 module was not successfully imported'
+                            ' (likely not installed).')
+        return _decompress_stream(
+            fileobj, lz4_frame.LZ4FrameDecompressor())
+    elif path.endswith('.zst'):
+        if zstandard is None:
+            raise Exception('zstandard module was not successfully imported'
+                            ' (likely not installed).')
+        return _decompress_stream(
+            fileobj, zstandard.ZstdDecompressor().decompressobj())
     else:
         return fileobj
 
 
+def _decompress_in_background(chunks, max_chunks=_BACKGROUND_MAX_CHUNKS):
+    """Iterate through *chunks* in a background thread, and yield them.
+
+    zlib and bz2 release the GIL while decompressing, so this lets
+    decompression happen at the same time as whatever the caller is doing
+    with the data. The thread gets at most *max_chunks* chunks ahead of
+    the caller. Exceptions raised by *chunks* are re-raised in the caller.
+
+    If the caller stops early (closing this generator), the thread stops
+    after its current chunk.
+    """
+    queue = Queue(max_chunks)
+    stop = threading.Event()
+
+    def put(item):
+        # give up if the caller goes away
+        while not stop.is_set():
+            try:
+                queue.put(item, timeout=_BACKGROUND_POLL_INTERVAL)
+                return True
+            except Full:
+                pass
+
+        return False
+
+    def read_chunks():
+        try:
+            for chunk in chunks:
+                if not put((chunk, None)):
+                    return
+        except BaseException as e:
+            put((None, e))
+        else:
+            put((None, None))
+
+    thread = threading.Thread(target=read_chunks)
+    thread.daemon = True
+    thread.start()
+
+    try:
+        while True:
+            try:
+                chunk, error = queue.get(timeout=_BACKGROUND_POLL_INTERVAL)
+            except Empty:
+                # time out now and then, so that we can be interrupted
+                if thread.is_alive() or not queue.empty():
+                    continue
+                raise Exception('background thread exited unexpectedly')
+
+            if chunk is None:
+                if error is not None:
+                    raise error
+                return
+
+            yield chunk
+    finally:
+        stop.set()
+        thread.join()
+
+
+def can_compress(path):
+    """Can :py:func:`compress` compress files with *path*'s file extension?
+    (This is ``False`` for uncompressed files, and for ``.lz4`` and ``.zst``
+    if the :py:mod:`lz4` or :py:mod:`zstandard` module isn't installed.)"""
+    return _compressor(path) is not None
+
+
+def compress(fileobj, path):
+    """Wrap *fileobj* (opened for writing, in binary mode) in an object
+    whose ``write()`` method compresses data based on *path*'s file
+    extension, or, if *path* doesn't correspond to a compressed file type
+    we can write, return *fileobj* itself.
+
+    This handles ``.gz``, ``.bz2``, ``.deflate`` (zlib), ``.lz4``, and
+    ``.zst`` (Zstandard). It's meant for intermediate files, so it favors
+    speed over size (e.g. zlib level 1).
+
+    Call ``close()`` on the returned object to finish writing compressed
+    data (this does not close *fileobj*).
+    """
+    compressor = _compressor(path)
+
+    if compressor is None:
+        return fileobj
+    else:
+        return _CompressedWriter(fileobj, compressor)
+
+
+def _compressor(path):
+    """Return an object with ``compress()`` and ``flush()`` methods (like
+    the objects returned by :py:func:`zlib.compressobj`) to compress
+    data for *path*, or ``None``."""
+    if path.endswith('.gz'):
+        return zlib.compressobj(1, zlib.DEFLATED,
+                                _READ_GZIP_DATA | zlib.MAX_WBITS)
+    elif path.endswith('.bz2') and bz2 is not None:
+        return bz2.BZ2Compressor(1)
+    elif path.endswith('.deflate'):
+        return zlib.compressobj(1)
+    elif path.endswith('.lz4') and lz4_frame is not None:
+        return lz4_frame.LZ4FrameCompressor()
+    elif path.endswith('.zst') and zstandard is not None:
+        return zstandard.ZstdCompressor(level=1).compressobj()
+    else:
+        return None
+
+
+class _CompressedWriter(object):
+    """Minimal file-like wrapper that compresses data as it's written.
+    See :py:func:`compress`."""
+
+    def __init__(self, fileobj, compressor):
+        self._fileobj = fileobj
+        self._compressor = compressor
+        self.closed = False
+
+        # lz4 frames have a header
+        if hasattr(compressor, 'begin'):
+            fileobj.write(compressor.begin())
+
+    def write(self, data):
+        self._fileobj.write(self._compressor.compress(data))
+
+    def flush(self):
+        # don't flush the compressor; that would hurt compression
+        self._fileobj.flush()
+
+    def close(self):
+        if not self.closed:
+            self._fileobj.write(self._compressor.flush())
+            self._fileobj.flush()
+            self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class PartitionWriter(object):
+    """File-like object that splits the lines written to it into one file
+    for each path in *output_paths*, by key (everything before the first
+    tab), like Hadoop's ``HashPartitioner``. If lines are written in
+    sorted order, each partition is sorted too.
+
+    Files are compressed based on their extension (see :py:func:`compress`).
+    Call :py:meth:`close` to finish writing them.
+    """
+    def __init__(self, output_paths):
+        self._files = []
+        self._outfiles = []
+
+        # anything written after the last newline
+        self._partial_line = b''
+
+        self.closed = False
+
+        try:
+            for path in output_paths:
+                f = open(path, 'wb')
+                self._files.append(f)
+                self._outfiles.append(compress(f, path))
+        except:
+            self._close_files()
+            raise
+
+    def write(self, data):
+        """Write *data*, which may contain any number of lines (including
+        partial ones)."""
+        if self._partial_line:
+            data = self._partial_line + data
+
+        lines = data.split(b'\n')
+        self._partial_line = lines.pop()
+
+        self._write_lines(lines)
+
+    def flush(self):
+        for outfile in self._outfiles:
+            outfile.flush()
+
+    def close(self):
+        """Finish writing (and compressing) each partition."""
+        if self.closed:
+            return
+        self.closed = True
+
+        try:
+            if self._partial_line:
+                self._write_lines([self._partial_line])
+                self._partial_line = b''
+
+            for outfile in self._outfiles:
+                outfile.close()
+        finally:
+            self._close_files()
+
+    def _write_lines(self, lines):
+        """Write *lines* (without trailing newlines) to their partitions."""
+        num_partitions = len(self._outfiles)
+        partitions = [[] for _ in range(num_partitions)]
+
+        for line in lines:
+            key = line.split(b'\t', 1)[0]
+            partitions[_partition_for_key(key, num_partitions)].append(line)
+
+        for outfile, partition in zip(self._outfiles, partitions):
+            if partition:
+                partition.append(b'')
+                outfile.write(b'\n'.join(partition))
+
+    def _close_files(self):
+        for f in self._files:
+            f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _partition_for_key(key, num_partitions):
+    """Pick a partition for *key* (bytes). Unlike :py:func:`hash`, this is
+    the same in every process."""
+    return (zlib.crc32(key) & 0xffffffff) % num_partitions
+
+
+def merge_sorted_files(paths):
+    """Yield the lines from the (possibly compressed) files at *paths*,
+    each of which is sorted, in sorted order.
+
+    Like :py:mod:`mrjob.sort`, this ignores trailing newlines when
+    comparing lines, and yields lines that always end with ``\\n``.
+    """
+    files = []
+    try:
+        for path in paths:
+            files.append(open(path, 'rb'))
+
+        runs = [_split_lines(decompress(f, path))
+                for f, path in zip(files, paths)]
+
+        for line in heapq.merge(*runs):
+            yield line + b'\n'
+    finally:
+        for f in files:
+            f.close()
+
+
+def _split_lines(chunks):
+    """Yield the lines in *chunks* (bytes), without trailing newlines."""
+    partial_line = b''
+
+    for chunk in chunks:
+        lines = chunk.split(b'\n')
+        lines[0] = partial_line + lines[0]
+        partial_line = lines.pop()
+
+        for line in lines:
+            yield line
+
+    if partial_line:
+        yield partial_line
+
+
+# file extensions of the compressed files that decompress() handles
+_COMPRESSED_EXTENSIONS = ('.bz2', '.deflate', '.gz', '.lz4', '.zst')
+
+# file extensions (of compressed files) that read_split() can always split,
+# plus '' for uncompressed files. Gzipped files can only be split if
+# they're indexed (see write_gzip_index())
+_SPLITTABLE_EXTENSIONS = ('', '.bz2')
+
+
+def _compression_extension(path):
+    """Return the extension of *path* that :py:func:`decompress` would use
+    to decompress it (e.g. ``'.gz'``), or ``''`` if it's not compressed."""
+    for ext in _COMPRESSED_EXTENSIONS:
+        if path.endswith(ext):
+            return ext
+
+    return ''
+
+
+def read_split(fileobj, start, length, path=None):
+    """Yield the lines in an input split, the way Hadoop's
+    ``LineRecordReader`` does: every line that *starts* in the byte range
+    ``[start, start + length)`` of *fileobj*, including the part of the last
+    line that runs past the end of the range.
+
+    Since lines that start before *start* belong to the previous split,
+    every line in a file goes to exactly one split.
+
+    If *path* ends in ``.bz2`` or ``.gz``, the range is of compressed data,
+    and the split gets the lines in the bzip2 blocks (or gzip members)
+    that start in it (see :py:func:`read_gzip_index`). Other compressed
+    files (e.g. ``.deflate``) can't be split, and raise :py:class:`ValueError`.
+
+    :param fileobj: seekable file object, opened in binary mode
+    :param start: offset of the start of the split
+    :param length: length of the split, in bytes
+    :param path: path of the file, used to determine if it's compressed
+    """
+    if path is None:
+        path = ''
+
+    ext = _compression_extension(path)
+
+    if ext == '.bz2':
+        if bz2 is None:
+            raise Exception('bz2 module was not successfully imported'
+                            ' (likely not installed).')
+        return _read_decompressed_split(
+            _bz2_blocks(fileobj, start), (start + length) * 8,
+            _BZ2_HEADER_BITS)
+    elif ext == '.gz':
+        index = read_gzip_index(path)
+        if index is None:
+            raise ValueError("can't split %s; it isn't indexed" % path)
+        return _read_decompressed_split(
+            _gzip_members(fileobj, index, start), start + length, 0)
+    elif ext:
+        raise ValueError("can't split %s files" % ext)
+    else:
+        return _read_uncompressed_split(fileobj, start, length)
+
+
+def _read_uncompressed_split(fileobj, start, length):
+    """Implementation of :py:func:`read_split` for uncompressed files."""
+    end = start + length
+
+    if start > 0:
+        # skip the rest of any line that started in the previous split
+        fileobj.seek(start - 1)
+        fileobj.readline()
+    else:
+        fileobj.seek(0)
+
+    pos = fileobj.tell()
+
+    while pos < end:
+        line = fileobj.readline()
+        if not line:
+            return
+
+        yield line
+        pos += len(line)
+
+
+def _read_decompressed_split(units, end, first_offset):
+    """Yield the lines in a split of a file made of separately compressed
+    units (bzip2 blocks or gzip members).
+
+    *units* yields ``(offset, data)``, where *offset* is where a unit starts
+    in the compressed file and *data* is (some of) its decompressed data,
+    starting with the first unit that starts in the split. The split owns
+    units that start before *end*.
+
+    Like ``LineRecordReader``, we skip the first line (unless the split
+    starts with the first unit in the file, which starts at
+    *first_offset*), since it belongs to the previous split, and we yield
+    the line that starts right at the end of the split, if any.
+    """
+    skip_first_line = None  # set when we see the first unit
+    partial_line = b''
+
+    for offset, data in units:
+        if offset >= end:
+            break
+
+        if skip_first_line is None:
+            skip_first_line = (offset != first_offset)
+
+        lines = (partial_line + data).split(b'\n')
+        partial_line = lines.pop()
+
+        for line in lines:
+            if skip_first_line:
+                skip_first_line = False
+            else:
+                yield line + b'\n'
+    else:
+        # no more data
+        if partial_line and not skip_first_line:
+            yield partial_line
+        return
+
+    # if we didn't own any units, or no line started in them, we're done
+    if skip_first_line is None or skip_first_line:
+        return
+
+    # otherwise, finish the line in progress, reading the next units
+    for offset, data in chain([(offset, data)], units):
+        i = data.find(b'\n')
+        if i != -1:
+            yield partial_line + data[:i + 1]
+            return
+        partial_line += data
+
+    if partial_line:
+        yield partial_line
+
+
+def _bz2_blocks(fileobj, start):
+    """Yield ``(offset, data)`` for each bzip2 block in *fileobj* that
+    starts at or after byte *start*, where *offset* is where the block
+    starts, in bits, and *data* is its decompressed contents.
+
+    bzip2 blocks aren't aligned to bytes, so to decompress a block, we
+    shift it into a bzip2 stream of its own.
+    """
+    fileobj.seek(start)
+
+    buf = bytearray()
+    buf_offset = start  # offset of *buf* in the file, in bytes
+    block_bit = None  # start of the current block in *buf*, in bits
+    search_bit = 0  # where to look for the next marker in *buf*, in bits
+
+    while True:
+        marker_bit, is_block = _find_bz2_marker(buf, search_bit)
+
+        if marker_bit is None:
+            chunk = fileobj.read(_READ_SIZE)
+            if not chunk:
+                return
+
+            # no need to search the bytes we've already searched again
+            # (markers are 6 or 7 bytes long)
+            search_bit = max(search_bit, (len(buf) - 7) * 8)
+
+            # discard data we're done with
+            done = search_bit if block_bit is None else block_bit
+            done = done // 8
+            del buf[:done]
+            buf_offset += done
+            search_bit -= done * 8
+            if block_bit is not None:
+                block_bit -= done * 8
+
+            buf.extend(chunk)
+            continue
+
+        if block_bit is not None:
+            yield (buf_offset * 8 + block_bit,
+                   _decompress_bz2_block(buf, block_bit, marker_bit))
+
+        block_bit = marker_bit if is_block else None
+        search_bit = marker_bit + 48
+
+
+def _make_bz2_patterns():
+    """Make a list of patterns for finding bzip2 markers (see
+    :py:data:`_BZ2_PATTERNS`)."""
+    patterns = []
+
+    for magic, is_block in ((_BZ2_BLOCK_MAGIC, True),
+                            (_BZ2_EOS_MAGIC, False)):
+        for shift in range(8):
+            num_bytes = (shift + 48 + 7) // 8
+            padding = num_bytes * 8 - shift - 48
+            pattern = bytearray(unhexlify(
+                ('%0' + str(num_bytes * 2) + 'x') % (magic << padding)))
+
+            if shift:
+                # first and last bytes only partially match
+                key, key_offset = bytes(pattern[1:-1]), 1
+            else:
+                key, key_offset = bytes(pattern), 0
+
+            patterns.append((is_block, shift, pattern, key, key_offset,
+                             0xff >> shift, (0xff << padding) & 0xff))
+
+    return patterns
+
+
+# bzip2 blocks start with this 48-bit magic number (the BCD digits of
+# pi), and bzip2 streams end with this one (the BCD digits of sqrt(pi))
+_BZ2_BLOCK_MAGIC = 0x314159265359
+_BZ2_EOS_MAGIC = 0x177245385090
+
+# bzip2 streams start with "BZh" and the block size, so the first block
+# starts this many bits in
+_BZ2_HEADER_BITS = 32
+
+# (is_block, shift, pattern, key, key_offset, first_mask, last_mask) for
+# each bzip2 marker, shifted *shift* bits into its first byte. *key* is the
+# bytes that fully match, which we can search for quickly
+_BZ2_PATTERNS = _make_bz2_patterns()
+
+
+def _find_bz2_marker(buf, start_bit):
+    """Find the first bzip2 block or end-of-stream marker that starts at
+    or after *start_bit* in *buf* (a :py:class:`bytearray`).
+
+    Returns ``(offset, is_block)``, where *offset* is in bits, or
+    ``(None, None)`` if there is no (complete) marker.
+    """
+    best_bit = None
+    best_is_block = None
+
+    for (is_block, shift, pattern, key, key_offset,
+         first_mask, last_mask) in _BZ2_PATTERNS:
+        # i is the byte the marker starts in
+        i = max((start_bit - shift + 7) // 8, 0)
+
+        while True:
+            j = buf.find(key, i + key_offset)
+            if j == -1:
+                break
+
+            i = j - key_offset
+            if best_bit is not None and i * 8 + shift >= best_bit:
+                break
+
+            last = i + len(pattern) - 1
+            if last >= len(buf):
+                break
+
+            if (buf[i] & first_mask == pattern[0] and
+                    buf[last] & last_mask == pattern[-1]):
+                best_bit = i * 8 + shift
+                best_is_block = is_block
+                break
+
+            i += 1
+
+    return best_bit, best_is_block
+
+
+def _decompress_bz2_block(buf, start_bit, end_bit):
+    """Decompress the bzip2 block at bits ``[start_bit, end_bit)`` of *buf*
+    by making it into a bzip2 stream of its own."""
+    first_byte = start_bit // 8
+    last_byte = (end_bit + 7) // 8
+    num_bits = end_bit - start_bit
+
+    block = int(hexlify(bytes(buf[first_byte:last_byte])), 16)
+    block = (block >> (last_byte * 8 - end_bit)) & ((1 << num_bits) - 1)
+
+    # the block's CRC comes right after its magic number. Since it's the
+    # only block in the stream, it's also the stream's CRC
+    crc = (block >> (num_bits - 80)) & 0xffffffff
+
+    stream = (((block << 48) | _BZ2_EOS_MAGIC) << 32) | crc
+    num_bits += 80
+
+    # pad to a whole byte
+    padding = -num_bits % 8
+    stream <<= padding
+    num_bits += padding
+
+    data = b'BZh9' + unhexlify(('%0' + str(num_bits // 4) + 'x') % stream)
+
+    return bz2.BZ2Decompressor().decompress(data)
+
+
+def _gzip_members(fileobj, index, start):
+    """Yield ``(offset, data)`` for each chunk of decompressed data from
+    gzip members in *fileobj* that start at or after byte *start*, where
+    *offset* is where the member starts. *index* is from
+    :py:func:`read_gzip_index`."""
+    offsets = [offset for offset, _ in index]
+
+    for i, offset in enumerate(offsets):
+        if offset < start:
+            continue
+
+        if i + 1 < len(offsets):
+            remaining = offsets[i + 1] - offset
+        else:
+            remaining = None  # read to the end of the file
+
+        fileobj.seek(offset)
+        d = zlib.decompressobj(_READ_GZIP_DATA | zlib.MAX_WBITS)
+
+        while remaining is None or remaining > 0:
+            if remaining is None:
+                chunk = fileobj.read(_READ_SIZE)
+            else:
+                chunk = fileobj.read(min(_READ_SIZE, remaining))
+                remaining -= len(chunk)
+
+            if not chunk:
+                break
+
+            data = d.decompress(chunk)
+            if data:
+                yield offset, data
+
+
+def gzip_index_path(path):
+    """Where the index for the gzipped file at *path* goes (see
+    :py:func:`write_gzip_index`)."""
+    return path + '.gzi'
+
+
+def read_gzip_index(path):
+    """Read the index for the gzipped file at *path*.
+
+    Returns a list of ``(compressed_offset, uncompressed_offset)`` for
+    each gzip member in the file, or ``None`` if there is no index or
+    it's older than the file.
+    """
+    index_path = gzip_index_path(path)
+
+    try:
+        if os.path.getmtime(index_path) < os.path.getmtime(path):
+            return None
+
+        with open(index_path, 'rb') as index_file:
+            data = index_file.read()
+    except (IOError, OSError):
+        return None
+
+    num_entries = struct.unpack('<Q', data[:8])[0]
+
+    index = [(0, 0)]
+    for i in range(num_entries):
+        index.append(struct.unpack('<QQ', data[8 + 16 * i:24 + 16 * i]))
+
+    return index
+
+
+def write_gzip_index(path):
+    """Index the start of each gzip member of the gzipped file at *path*
+    (a gzipped file can be several gzipped files concatenated together,
+    like the output of :command:`bgzip`) so that it can be split, and
+    write the index next to it, in the same format as :command:`bgzip`'s
+    ``.gzi`` files.
+
+    Returns the index (see :py:func:`read_gzip_index`).
+    """
+    index = [(0, 0)]
+    compressed_size = 0
+    uncompressed_size = 0
+
+    with open(path, 'rb') as f:
+        d = zlib.decompressobj(_READ_GZIP_DATA | zlib.MAX_WBITS)
+
+        while True:
+            chunk = f.read(_READ_SIZE)
+            if not chunk:
+                break
+            compressed_size += len(chunk)
+
+            while chunk:
+                uncompressed_size += len(d.decompress(chunk))
+
+                chunk = d.unused_data.lstrip(b'\0')
+                if chunk:
+                    index.append(
+                        (compressed_size - len(chunk), uncompressed_size))
+                    d = zlib.decompressobj(_READ_GZIP_DATA | zlib.MAX_WBITS)
+
+    # write to a temp file first, so that tasks never see a partial index
+    index_path = gzip_index_path(path)
+    tmp_path = '%s.tmp-%d' % (index_path, os.getpid())
+
+    with open(tmp_path, 'wb') as index_file:
+        index_file.write(struct.pack('<Q', len(index) - 1))
+        for offsets in index[1:]:
+            index_file.write(struct.pack('<QQ', *offsets))
+
+    try:
+        os.rename(tmp_path, index_path)
+    except OSError:
+        # on Windows, rename() won't replace an existing file
+        os.remove(index_path)
+        os.rename(tmp_path, index_path)
+
+    return index
+
+
 def _main():
+    """Write the (decompressed) contents of a file to stdout.
+
+    Usage: ``cat.py PATH [START LENGTH]`` to output the lines in a file or
+    a split of it (see :py:func:`read_split`), ``cat.py --merge PATH...``
+    to merge sorted files (see :py:func:`merge_sorted_files`), or
+    ``cat.py --partition PATH...`` to split stdin into one file per path
+    (see :py:class:`PartitionWriter`).
+
+    ``cat.py --from-typedbytes`` and ``cat.py --to-typedbytes`` convert
+    typed bytes records on stdin to lines and back again, for jobs that
+    shuffle typed bytes (these need mrjob in ``PYTHONPATH``).
+    """
     args = sys.argv[1:]
-    if len(args) != 1:
-        raise ValueError('please pass a single path')
-    path = args[0]
 
-    # we want to write bytes
+    # we want to read and write bytes
+    stdin_buffer = getattr(sys.stdin, 'buffer', sys.stdin)
     if hasattr(sys.stdout, 'buffer'):
         stdout_buffer = sys.stdout.buffer
     else:
         stdout_buffer = sys.stdout
 
+    if args and args[0] == '--partition':
+        with PartitionWriter(args[1:]) as partition_file:
+            while True:
+                chunk = stdin_buffer.read(_READ_SIZE)
+                if not chunk:
+                    break
+                partition_file.write(chunk)
+        return
+
+    if args == ['--from-typedbytes']:
+        # only jobs that use mrjob's typed bytes protocols get here, so
+        # mrjob is importable
+        from mrjob.protocol import _TypedBytesToLinesWriter
+
+        with _TypedBytesToLinesWriter(stdout_buffer) as lines_file:
+            while True:
+                chunk = stdin_buffer.read(_READ_SIZE)
+                if not chunk:
+                    break
+                lines_file.write(chunk)
+        return
+
+    if args == ['--to-typedbytes']:
+        from mrjob.protocol import _typedbytes_line_to_record
+
+        for line in stdin_buffer:
+            if line.endswith(b'\n'):
+                line = line[:-1]
+            stdout_buffer.write(_typedbytes_line_to_record(line))
+        return
+
+    if args and args[0] == '--merge':
+        for line in merge_sorted_files(args[1:]):
+            stdout_buffer.write(line)
+        return
+
+    if len(args) not in (1, 3):
+        raise ValueError('please pass a single path (and optionally, the'
+                         ' start and length of a split)')
+    path = args[0]
+
     with open(path, 'rb') as f:
-        for chunk in decompress(f, path):
+        if len(args) == 3:
+            chunks = read_split(f, int(args[1]), int(args[2]), path)
+        else:
+            # decompress while we write to stdout
+            chunks = decompress(f, path, background=True)
+
+        for chunk in chunks:
             stdout_buffer.write(chunk)
 
 
@@ -377,7 +377,9 @@ class DataprocJobRunner(MRJobRunner):
 
         self._gcs_fs = GCSFilesystem()
 
-        self._fs = CompositeFilesystem(self._gcs_fs, LocalFilesystem())
+        self._fs = CompositeFilesystem(
+            self._gcs_fs, LocalFilesystem(),
+            cache_secs=self._opts['fs_cache_secs'])
         return self._fs
 
     def _get_tmpdir(self, given_tmpdir):
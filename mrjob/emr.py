@@ -12,6 +12,7 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import contextlib
 import hashlib
 import json
 import logging
@@ -29,6 +30,7 @@ from collections import defaultdict
 from datetime import datetime
 from datetime import timedelta
 from itertools import islice
+from multiprocessing.pool import ThreadPool
 from subprocess import Popen
 from subprocess import PIPE
 
@@ -232,6 +234,9 @@ _CHEAPEST_2_X_INSTANCE_TYPE = 'm1.small'
 # these are the only kinds of instance roles that exist
 _INSTANCE_ROLES = ('master', 'core', 'task')
 
+# how many times to try uploading each part of a multipart upload
+_UPLOAD_PART_MAX_TRIES = 3
+
 
 # used to bail out and retry when a pooled cluster self-terminates
 class _PooledClusterSelfTerminatedException(Exception):
@@ -406,6 +411,34 @@ def _get_reason(cluster_or_step):
         'message', '').rstrip()
 
 
+def _run_in_pool(pool, func, args_list):
+    """Call *func* with each tuple of arguments in *args_list*, using
+    *pool* (a :py:class:`multiprocessing.pool.ThreadPool`), or one at a
+    time if *pool* is ``None``.
+
+    Waits for every call to finish, and then re-raises the first
+    exception, if any (so that we don't, say, cancel a multipart upload
+    while some of its parts are still uploading).
+    """
+    if pool is None:
+        for args in args_list:
+            func(*args)
+        return
+
+    results = [pool.apply_async(func, args) for args in args_list]
+
+    error = None
+    for result in results:
+        try:
+            result.get()
+        except Exception as ex:
+            if error is None:
+                error = ex
+
+    if error is not None:
+        raise error
+
+
 class EMRRunnerOptionStore(RunnerOptionStore):
 
     ALLOWED_KEYS = _allowed_keys('emr')
@@ -440,6 +473,7 @@ class EMRRunnerOptionStore(RunnerOptionStore):
             'pool_name': 'default',
             'pool_wait_minutes': 0,
             'cloud_fs_sync_secs': 5.0,
+            'cloud_max_concurrent_uploads': 8,
             'cloud_upload_part_size': 100,  # 100 MB
             'sh_bin': ['/bin/sh', '-ex'],
             'ssh_bin': ['ssh'],
@@ -873,10 +907,13 @@ class EMRJobRunner(MRJobRunner, LogInterpretationMixin):
                     ec2_key_pair_file=self._opts['ec2_key_pair_file'])
 
                 self._fs = CompositeFilesystem(
-                    self._ssh_fs, s3_fs, LocalFilesystem())
+                    self._ssh_fs, s3_fs, LocalFilesystem(),
+                    cache_secs=self._opts['fs_cache_secs'])
             else:
                 self._ssh_fs = None
-                self._fs = CompositeFilesystem(s3_fs, LocalFilesystem())
+                self._fs = CompositeFilesystem(
+                    s3_fs, LocalFilesystem(),
+                    cache_secs=self._opts['fs_cache_secs'])
 
         return self._fs
 
@@ -1022,13 +1059,27 @@ class EMRJobRunner(MRJobRunner, LogInterpretationMixin):
 
         log.info('Copying local files to %s...' % self._upload_mgr.prefix)
 
+        args_list = []
         for path, s3_uri in self._upload_mgr.path_to_uri().items():
             log.debug('  %s -> %s' % (path, s3_uri))
-            self._upload_contents(s3_uri, path)
+            args_list.append((s3_uri, path))
+
+        # parts of large files get their own pool, so that threads
+        # uploading whole files never wait on parts queued behind them
+        with self._upload_pool(len(args_list)) as file_pool:
+            with self._upload_pool() as part_pool:
+                _run_in_pool(file_pool, self._upload_contents,
+                             [args + (part_pool,) for args in args_list])
+
+        # we uploaded through boto, not self.fs.put()
+        self.fs._invalidate_cache(self._upload_mgr.prefix)
 
-    def _upload_contents(self, s3_uri, path):
+    def _upload_contents(self, s3_uri, path, part_pool=None):
         """Uploads the file at the given path to S3, possibly using
-        multipart upload."""
+        multipart upload.
+
+        If *part_pool* is set, use it to upload parts; otherwise, make
+        a pool just for this file."""
         fsize = os.stat(path).st_size
         part_size = self._get_upload_part_size()
 
@@ -1039,7 +1090,8 @@ class EMRJobRunner(MRJobRunner, LogInterpretationMixin):
             mpul = s3_key.bucket.initiate_multipart_upload(s3_key.name)
 
             try:
-                self._upload_parts(mpul, path, fsize, part_size)
+                self._upload_parts(mpul, path, fsize, part_size,
+                                   pool=part_pool)
             except:
                 mpul.cancel_upload()
                 raise
@@ -1050,19 +1102,58 @@ class EMRJobRunner(MRJobRunner, LogInterpretationMixin):
         else:
             s3_key.set_contents_from_filename(path)
 
-    def _upload_parts(self, mpul, path, fsize, part_size):
+    def _upload_parts(self, mpul, path, fsize, part_size, pool=None):
         offsets = range(0, fsize, part_size)
 
+        args_list = []
         for i, offset in enumerate(offsets):
-            part_num = i + 1
+            chunk_bytes = min(part_size, fsize - offset)
+            args_list.append(
+                (mpul, path, i + 1, len(offsets), offset, chunk_bytes))
+
+        if pool is None:
+            with self._upload_pool(len(args_list)) as pool:
+                _run_in_pool(pool, self._upload_part, args_list)
+        else:
+            _run_in_pool(pool, self._upload_part, args_list)
 
+    def _upload_part(self, mpul, path, part_num, num_parts,
+                     offset, chunk_bytes):
+        """Upload one part of a multipart upload, trying up to
+        ``_UPLOAD_PART_MAX_TRIES`` times."""
+        for num_tries in range(1, _UPLOAD_PART_MAX_TRIES + 1):
             log.debug("uploading %d/%d of %s" % (
-                part_num, len(offsets), path))
-            chunk_bytes = min(part_size, fsize - offset)
+                part_num, num_parts, path))
+            try:
+                with filechunkio.FileChunkIO(
+                        path, 'r', offset=offset, bytes=chunk_bytes) as fp:
+                    mpul.upload_part_from_file(fp, part_num)
+                return
+            except Exception as ex:
+                if num_tries >= _UPLOAD_PART_MAX_TRIES:
+                    raise
+                log.warning("error uploading %d/%d of %s, retrying: %r" % (
+                    part_num, num_parts, path, ex))
+
+    @contextlib.contextmanager
+    def _upload_pool(self, num_tasks=None):
+        """Yield a thread pool big enough for *num_tasks* uploads, but no
+        bigger than :mrjob-opt:`cloud_max_concurrent_uploads`, or ``None``
+        if we should upload one thing at a time."""
+        num_threads = self._opts['cloud_max_concurrent_uploads'] or 1
+        if num_tasks is not None:
+            num_threads = min(num_threads, num_tasks)
+
+        if num_threads <= 1:
+            yield None
+            return
 
-            with filechunkio.FileChunkIO(
-                    path, 'r', offset=offset, bytes=chunk_bytes) as fp:
-                mpul.upload_part_from_file(fp, part_num)
+        pool = ThreadPool(num_threads)
+        try:
+            yield pool
+        finally:
+            pool.close()
+            pool.join()
 
     def _get_upload_part_size(self):
         # part size is in MB, as the minimum is 5 MB
@@ -1977,6 +2068,9 @@ class EMRJobRunner(MRJobRunner, LogInterpretationMixin):
 
                 continue
 
+            # the step wrote its output and logs to S3 behind our back
+            self.fs._clear_cache()
+
             # we're done, will return at the end of this
             if step.status.state == 'COMPLETED':
                 log.info('  COMPLETED')
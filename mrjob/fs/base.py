@@ -44,9 +44,8 @@ class Filesystem(object):
 
     def cat(self, path_glob):
         """cat all files matching **path_glob**, decompressing if necessary"""
-        for filename in self.ls(path_glob):
-            for line in self._cat_file(filename):
-                yield line
+        for line in self._cat_files(self.ls(path_glob)):
+            yield line
 
     def du(self, path_glob):
         """Get the total size of files matching ``path_glob``
@@ -65,9 +64,24 @@ class Filesystem(object):
         """
         raise NotImplementedError
 
+    def _ls_metadata(self, path_glob):
+        """Like :py:meth:`ls`, but yield ``(path, size, md5sum)``. *size*
+        and *md5sum* are ``None`` unless the listing provides them for
+        free."""
+        for path in self.ls(path_glob):
+            yield path, None, None
+
     def _cat_file(self, path):
         raise NotImplementedError
 
+    def _cat_files(self, paths):
+        """Stream lines from each of *paths* in turn, decompressing if
+        necessary. Filesystems may override this to read ahead through
+        several files at once."""
+        for path in paths:
+            for line in self._cat_file(path):
+                yield line
+
     def exists(self, path_glob):
         """Does the given path/URI exist?
 
@@ -13,12 +13,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import logging
+import time
+from os.path import commonprefix
 
 from mrjob.fs.base import Filesystem
 
 
 log = logging.getLogger(__name__)
 
+# default maximum number of results to keep in the metadata cache
+_DEFAULT_CACHE_SIZE = 1000
+
 
 class CompositeFilesystem(Filesystem):
     """Combine multiple filesystem objects to allow access to a variety of
@@ -26,10 +31,41 @@ class CompositeFilesystem(Filesystem):
     SSH, or HDFS.
     """
 
-    def __init__(self, *filesystems):
+    def __init__(self, *filesystems, **kwargs):
+        """
+        :param filesystems: filesystem objects to try, in order
+        :param cache_secs: if set, cache the results of :py:meth:`ls`,
+                           :py:meth:`du`, :py:meth:`exists`, and
+                           :py:meth:`md5sum` for this many seconds.
+                           Sizes and md5 sums that come back with a
+                           listing are kept too, so :py:meth:`du`,
+                           :py:meth:`exists`, and :py:meth:`md5sum` of
+                           a listed file don't need another request.
+                           :py:meth:`rm`, :py:meth:`touchz`,
+                           :py:meth:`mkdir`, :py:meth:`put`, and
+                           :py:meth:`delete_keys` discard cached results
+                           for the paths they write to.
+        :param cache_size: keep roughly this many results in the cache,
+                           discarding the least recently used first
+
+        .. versionchanged:: 0.5.8
+
+           added *cache_secs* and *cache_size*
+        """
+        cache_secs = kwargs.pop('cache_secs', None)
+        cache_size = kwargs.pop('cache_size', _DEFAULT_CACHE_SIZE)
+        if kwargs:
+            raise TypeError('Unexpected keyword arguments: %s' %
+                            ', '.join(sorted(kwargs)))
+
         super(CompositeFilesystem, self).__init__()
         self.filesystems = filesystems
 
+        if cache_secs:
+            self._cache = _MetadataCache(cache_secs, cache_size)
+        else:
+            self._cache = None
+
     def __getattr__(self, name):
         # Forward through to children for backward compatibility
         for fs in self.filesystems:
@@ -62,30 +98,215 @@ class CompositeFilesystem(Filesystem):
         else:
             raise first_exception
 
+    def _cached_action(self, action, path_glob):
+        """Like :py:meth:`_do_action`, but use the metadata cache,
+        if enabled."""
+        if self._cache is None:
+            return self._do_action(action, path_glob)
+
+        key = (action, path_glob)
+        try:
+            return self._cache.get(key)
+        except KeyError:
+            pass
+
+        value = self._do_action(action, path_glob)
+        self._cache.put(key, value)
+        return value
+
+    def _cached_key(self, path):
+        """Return ``(size, md5sum)`` for *path* if it was in a cached
+        listing (either may be ``None``), or ``None`` if it wasn't."""
+        if self._cache is None:
+            return None
+
+        try:
+            return self._cache.get(('key', path))
+        except KeyError:
+            return None
+
+    def _clear_cache(self):
+        if self._cache is not None:
+            self._cache.clear()
+
+    def _invalidate_cache(self, path_glob):
+        """Discard cached results for any path that *path_glob* could
+        contain or be contained by."""
+        if self._cache is not None:
+            self._cache.invalidate(path_glob)
+
     def du(self, path_glob):
-        return self._do_action('du', path_glob)
+        size, _ = self._cached_key(path_glob) or (None, None)
+        if size is not None:
+            return size
+
+        return self._cached_action('du', path_glob)
 
     def ls(self, path_glob):
-        return self._do_action('ls', path_glob)
+        if self._cache is None:
+            return self._do_action('ls', path_glob)
+
+        key = ('ls', path_glob)
+        try:
+            paths = self._cache.get(key)
+        except KeyError:
+            # keep size and md5sum of each listed file, if the listing
+            # came with them
+            paths = []
+            for path, size, md5sum in self._do_action(
+                    '_ls_metadata', path_glob):
+                self._cache.put(('key', path), (size, md5sum))
+                paths.append(path)
+
+            self._cache.put(key, paths)
+
+        return iter(paths)
 
     def _cat_file(self, path):
         for line in self._do_action('_cat_file', path):
             yield line
 
+    def _cat_files(self, paths):
+        # if one filesystem can handle every path, let it read ahead
+        paths = list(paths)
+
+        if paths:
+            for fs in self.filesystems:
+                if all(fs.can_handle_path(path) for path in paths):
+                    return fs._cat_files(paths)
+
+        return super(CompositeFilesystem, self)._cat_files(paths)
+
     def mkdir(self, path):
+        self._invalidate_cache(path)
         return self._do_action('mkdir', path)
 
     def exists(self, path_glob):
-        return self._do_action('exists', path_glob)
+        if self._cached_key(path_glob):
+            return True
+
+        return self._cached_action('exists', path_glob)
 
     def join(self, path, *paths):
         return self._do_action('join', path, *paths)
 
     def rm(self, path_glob):
+        self._invalidate_cache(path_glob)
         return self._do_action('rm', path_glob)
 
     def touchz(self, path):
+        self._invalidate_cache(path)
         return self._do_action('touchz', path)
 
     def md5sum(self, path_glob):
-        return self._do_action('md5sum', path_glob)
+        _, md5sum = self._cached_key(path_glob) or (None, None)
+        if md5sum is not None:
+            return md5sum
+
+        return self._cached_action('md5sum', path_glob)
+
+    def delete_keys(self, s3_keys):
+        """Delete boto S3 keys in batches (see
+        :py:meth:`~mrjob.fs.s3.S3Filesystem.delete_keys`)."""
+        for fs in self.filesystems:
+            if hasattr(fs, 'delete_keys'):
+                break
+        else:
+            raise IOError("Can't delete S3 keys without an S3 filesystem")
+
+        if self._cache is not None:
+            s3_keys = list(s3_keys)
+
+            # invalidate everything under the prefix the keys share
+            try:
+                uris = ['s3://%s/%s' % (key.bucket.name, key.name)
+                        for key in s3_keys]
+            except AttributeError:
+                uris = ['']
+
+            if uris:
+                self._invalidate_cache(commonprefix(uris))
+
+        return fs.delete_keys(s3_keys)
+
+    def put(self, src_path, dest_uri):
+        """Upload a local file to *dest_uri*, using the first filesystem
+        that can handle it and has a ``put()`` method."""
+        self._invalidate_cache(dest_uri)
+
+        for fs in self.filesystems:
+            if hasattr(fs, 'put') and fs.can_handle_path(dest_uri):
+                return fs.put(src_path, dest_uri)
+
+        raise IOError("Can't put to path: %s" % dest_uri)
+
+
+def _path_prefix(path_glob):
+    """The part of *path_glob* before any wildcards, without its scheme
+    (so ``s3://`` and ``s3n://`` URIs for the same key match)."""
+    for i, c in enumerate(path_glob):
+        if c in '*?[':
+            path_glob = path_glob[:i]
+            break
+
+    return path_glob.split('://', 1)[-1]
+
+
+class _MetadataCache(object):
+    """Cache values for up to *ttl* seconds, keeping roughly the
+    *max_size* most recently used.
+
+    Keys are tuples whose last item is a path or glob.
+
+    Like :py:class:`~mrjob.protocol._DecodeCache`, entries are kept in
+    two generations of up to *max_size* / 2 entries each; once the newer
+    generation fills up, the older one is thrown away.
+    """
+
+    def __init__(self, ttl, max_size):
+        self._ttl = ttl
+        self._generation_size = max(max_size // 2, 1)
+
+        # map from key to (expiration time, value)
+        self._new = {}
+        self._old = {}
+
+    def get(self, key):
+        """Get a cached value, or raise :py:class:`KeyError`"""
+        if key in self._new:
+            entry = self._new[key]
+        else:
+            entry = self._old.pop(key)
+            self._add(key, entry)
+
+        if entry[0] <= time.time():
+            self._new.pop(key, None)
+            raise KeyError(key)
+
+        return entry[1]
+
+    def put(self, key, value):
+        self._old.pop(key, None)
+        self._add(key, (time.time() + self._ttl, value))
+
+    def _add(self, key, entry):
+        if key not in self._new and len(self._new) >= self._generation_size:
+            self._old = self._new
+            self._new = {}
+        self._new[key] = entry
+
+    def invalidate(self, path_glob):
+        """Discard every entry whose path or glob could overlap
+        *path_glob*."""
+        prefix = _path_prefix(path_glob)
+
+        for entries in self._new, self._old:
+            for key in list(entries):
+                key_prefix = _path_prefix(key[-1])
+                if (key_prefix.startswith(prefix) or
+                        prefix.startswith(key_prefix)):
+                    del entries[key]
+
+    def clear(self):
+        self._new.clear()
+        self._old.clear()
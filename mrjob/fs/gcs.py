@@ -15,13 +15,17 @@
 import fnmatch
 import logging
 import mimetypes
+import threading
+from functools import partial
 
 from mrjob.fs.base import Filesystem
 from mrjob.parse import urlparse
 from mrjob.runner import GLOB_RE
-from mrjob.util import read_file
+from mrjob.util import _read_ahead
+from mrjob.util import _read_files_ahead
 
 try:
+    import httplib2
     from oauth2client.client import GoogleCredentials
     from googleapiclient import discovery
     from googleapiclient import errors as google_errors
@@ -29,14 +33,13 @@ try:
 except ImportError:
     # don't require googleapiclient; MRJobs don't actually need it when running
     # inside hadoop streaming
+    httplib2 = None
     GoogleCredentials = None
     discovery = None
     google_errors = None
     google_http = None
 
 import io
-import os
-import tempfile
 import base64
 import binascii
 
@@ -48,6 +51,19 @@ _GCS_API_VERSION = 'v1'
 _BINARY_MIMETYPE = 'application/octet-stream'
 _LS_FIELDS_TO_RETURN = 'nextPageToken,items(name,size,timeCreated,md5Hash)'
 
+# when reading objects, fetch ranges of this many bytes...
+_CAT_RANGE_SIZE = 8 * 1024 * 1024
+
+# ...and prefetch up to this many ranges (possibly of several objects) at
+# once. Set this to 1 to fetch one range at a time, as it's needed
+_CAT_MAX_RANGES = 4
+
+# GCS allows up to this many calls in one batch request...
+_DELETE_BATCH_SIZE = 100
+
+# ...and we don't send more than this many batch requests at once
+_MAX_CONCURRENT_DELETES = 4
+
 
 def _base64_to_hex(base64_encoded):
     base64_decoded = base64.decodestring(base64_encoded)
@@ -83,6 +99,8 @@ class GCSFilesystem(Filesystem):
     """
     def __init__(self):
         self._api_client = None
+        # per-thread state for prefetching (see _thread_http())
+        self._local = threading.local()
 
     @property
     def api_client(self):
@@ -161,6 +179,10 @@ class GCSFilesystem(Filesystem):
             list_request = self.api_client.objects().list_next(
                 list_request, resp)
 
+    def _ls_metadata(self, path_glob):
+        for item in self._ls_detailed(path_glob):
+            yield item['_uri'], item['size'], _base64_to_hex(item['md5Hash'])
+
     def md5sum(self, path):
         object_list = list(self._ls_detailed(path))
         if len(object_list) != 1:
@@ -171,17 +193,66 @@ class GCSFilesystem(Filesystem):
         return _base64_to_hex(item['md5Hash'])
 
     def _cat_file(self, gcs_uri):
-        tmp_fd, tmp_path = tempfile.mkstemp()
+        return self._cat_files([gcs_uri])
+
+    def _cat_files(self, paths):
+        """Stream lines from each of the given objects, in order, as
+        they arrive (nothing is written to disk).
+
+        We fetch ranges of ``_CAT_RANGE_SIZE`` bytes, prefetching up to
+        ``_CAT_MAX_RANGES`` at once, including ranges of the next few
+        objects.
+        """
+        # only use threads if we're actually prefetching
+        prefetch = _CAT_MAX_RANGES > 1
+
+        def files():
+            for path in paths:
+                yield path, self._range_readers(path, prefetch)
+
+        return _read_files_ahead(files(), _CAT_MAX_RANGES)
 
-        with os.fdopen(tmp_fd, 'w+b') as tmp_fileobj:
-            self._download_io(gcs_uri, tmp_fileobj)
+    def _range_readers(self, gcs_uri, prefetch=False):
+        bucket_name, object_name = parse_gcs_uri(gcs_uri)
 
-            tmp_fileobj.seek(0)
+        item = self.api_client.objects().get(
+            bucket=bucket_name, object=object_name, fields='size').execute()
+        size = int(item['size'])
 
-            line_gen = read_file(
-                gcs_uri, fileobj=tmp_fileobj, yields_lines=False)
-            for current_line in line_gen:
-                yield current_line
+        for start in range(0, size, _CAT_RANGE_SIZE):
+            end = min(start + _CAT_RANGE_SIZE, size)
+            yield partial(self._read_range, gcs_uri, start, end, prefetch)
+
+    def _read_range(self, gcs_uri, start, end, prefetch=False):
+        """Return bytes *start* to *end* (exclusive) of the given object.
+
+        If *prefetch* is true, we're in a background thread, so use
+        :py:meth:`_thread_http`.
+        """
+        bucket_name, object_name = parse_gcs_uri(gcs_uri)
+
+        req = self.api_client.objects().get_media(
+            bucket=bucket_name, object=object_name)
+        req.headers['range'] = 'bytes=%d-%d' % (start, end - 1)
+
+        if prefetch:
+            return req.execute(http=self._thread_http())
+        else:
+            return req.execute()
+
+    def _thread_http(self):
+        """Return an HTTP object for the current thread to use.
+
+        :py:mod:`httplib2` isn't thread-safe, so each thread that
+        prefetches or deletes needs its own (authorized) HTTP object.
+        """
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            credentials = GoogleCredentials.get_application_default()
+            http = credentials.authorize(httplib2.Http())
+            self._local.http = http
+
+        return http
 
     def mkdir(self, dest):
         """Make a directory. This does nothing on GCS because there are
@@ -204,14 +275,62 @@ class GCSFilesystem(Filesystem):
         return any(paths)
 
     def rm(self, path_glob):
-        """Remove all files matching the given glob."""
+        """Remove all files matching the given glob.
+
+        .. versionchanged:: 0.5.8
+
+           deletes up to ``_DELETE_BATCH_SIZE`` objects per batch request,
+           with up to ``_MAX_CONCURRENT_DELETES`` requests running at once
+        """
         bucket_name, base_name = _path_glob_to_parsed_gcs_uri(path_glob)
 
-        for item in self._ls_detailed(path_glob):
-            req = self.api_client.objects().delete(
-                bucket=bucket_name, object=item['name'])
-            log.debug("deleting " + item['_uri'])
-            req.execute()
+        # only use threads if we're actually running requests concurrently
+        concurrent = _MAX_CONCURRENT_DELETES > 1
+
+        def batch_deleters():
+            batch = []
+
+            for item in self._ls_detailed(path_glob):
+                if len(batch) >= _DELETE_BATCH_SIZE:
+                    yield partial(self._delete_batch,
+                                  bucket_name, batch, concurrent)
+                    batch = []
+
+                log.debug("deleting " + item['_uri'])
+                batch.append(item['name'])
+
+            if batch:
+                yield partial(self._delete_batch,
+                              bucket_name, batch, concurrent)
+
+        for _ in _read_ahead(batch_deleters(), _MAX_CONCURRENT_DELETES):
+            pass
+
+    def _delete_batch(self, bucket_name, object_names, concurrent=False):
+        """Delete the given objects with a single batch request, and
+        re-raise the first error, if any.
+
+        If *concurrent* is true, we're in a background thread, so use
+        :py:meth:`_thread_http`.
+        """
+        errors = []
+
+        def callback(request_id, response, exception):
+            if exception is not None:
+                errors.append(exception)
+
+        batch = self.api_client.new_batch_http_request(callback=callback)
+        for object_name in object_names:
+            batch.add(self.api_client.objects().delete(
+                bucket=bucket_name, object=object_name))
+
+        if concurrent:
+            batch.execute(http=self._thread_http())
+        else:
+            batch.execute()
+
+        if errors:
+            raise errors[0]
 
     def touchz(self, dest_uri):
         with io.BytesIO() as io_obj:
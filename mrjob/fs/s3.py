@@ -14,6 +14,7 @@
 import fnmatch
 import logging
 import socket
+from functools import partial
 
 try:
     import boto
@@ -30,7 +31,8 @@ from mrjob.parse import parse_s3_uri
 from mrjob.parse import urlparse
 from mrjob.retry import RetryWrapper
 from mrjob.runner import GLOB_RE
-from mrjob.util import read_file
+from mrjob.util import _read_ahead
+from mrjob.util import _read_files_ahead
 
 
 log = logging.getLogger(__name__)
@@ -40,12 +42,46 @@ _EMR_BACKOFF = 20
 _EMR_BACKOFF_MULTIPLIER = 1.5
 _EMR_MAX_TRIES = 20  # this takes about a day before we run out of tries
 
+# when reading keys, fetch ranges of this many bytes...
+_READ_AHEAD_RANGE_SIZE = 8 * 1024 * 1024
+
+# ...and fetch up to this many ranges (possibly of several keys) at once
+_READ_AHEAD_MAX_RANGES = 4
+
+# S3 won't delete more than this many keys in one request...
+_DELETE_BATCH_SIZE = 1000
+
+# ...and we don't send more than this many delete requests at once
+_MAX_CONCURRENT_DELETES = 4
+
 
 def s3_key_to_uri(s3_key):
     """Convert a boto Key object into an ``s3://`` URI"""
     return 's3://%s/%s' % (s3_key.bucket.name, s3_key.name)
 
 
+def _read_s3_key_range(s3_key, start, end):
+    """Return bytes *start* to *end* (exclusive) of *s3_key*."""
+    # use a fresh Key object for each request, since boto Keys keep track
+    # of their current response
+    range_key = s3_key.bucket.new_key(s3_key.name)
+    return range_key.get_contents_as_string(
+        headers={'Range': 'bytes=%d-%d' % (start, end - 1)})
+
+
+def _delete_s3_key_batch(s3_keys):
+    """Delete keys (which must all be in the same bucket) with a single
+    multi-object delete request."""
+    bucket = s3_keys[0].bucket
+
+    result = bucket.delete_keys([k.name for k in s3_keys], quiet=True)
+
+    if result.errors:
+        error = result.errors[0]
+        raise IOError('Failed to delete %d key(s) from %s (e.g. %s: %s)' % (
+            len(result.errors), bucket.name, error.key, error.message))
+
+
 def wrap_aws_conn(raw_conn):
     """Wrap a given boto Connection object so that it can retry when
     throttled."""
@@ -95,7 +131,8 @@ class S3Filesystem(Filesystem):
 
     def du(self, path_glob):
         """Get the size of all files matching path_glob."""
-        return sum(self.get_s3_key(uri).size for uri in self.ls(path_glob))
+        # use sizes from the listing, rather than looking up each key
+        return sum(key.size for _, key in self._ls_keys(path_glob))
 
     def ls(self, path_glob):
         """Recursively list files on S3.
@@ -110,7 +147,12 @@ class S3Filesystem(Filesystem):
             both ``ls('s3://b/dir')`` and `ls('s3://b/dir/')` will list
             all keys starting with ``dir/``.
         """
+        for uri, _ in self._ls_keys(path_glob):
+            yield uri
 
+    def _ls_keys(self, path_glob):
+        """Like :py:meth:`ls`, but yield ``(uri, key)``, where *key* is
+        the boto Key object from the listing."""
         # clean up the  base uri to ensure we have an equal uri to boto (s3://)
         # just in case we get passed s3n://
         scheme = urlparse(path_glob).scheme
@@ -142,18 +184,42 @@ class S3Filesystem(Filesystem):
                     fnmatch.fnmatchcase(uri, dir_glob)):
                 continue
 
-            yield uri
+            yield uri, key
+
+    def _ls_metadata(self, path_glob):
+        for uri, key in self._ls_keys(path_glob):
+            yield uri, key.size, key.etag.strip('"')
 
     def md5sum(self, path):
         k = self.get_s3_key(path)
         return k.etag.strip('"')
 
     def _cat_file(self, filename):
-        # stream lines from the s3 key
-        s3_key = self.get_s3_key(filename)
-        # yields_lines=False: warn read_file that s3_key yields chunks of bytes
-        return read_file(
-            s3_key_to_uri(s3_key), fileobj=s3_key, yields_lines=False)
+        return self._cat_files([filename])
+
+    def _cat_files(self, paths):
+        """Stream lines from each of the given keys, in order.
+
+        Rather than reading one key through one connection, we fetch
+        ranges of ``_READ_AHEAD_RANGE_SIZE`` bytes, up to
+        ``_READ_AHEAD_MAX_RANGES`` at once. Read-ahead continues into the
+        next few keys, so many small keys are also fetched concurrently.
+        """
+        def files():
+            for path in paths:
+                s3_key = self.get_s3_key(path)
+                if s3_key is None:
+                    raise IOError('Key %r does not exist' % (path,))
+
+                yield path, self._range_readers(s3_key)
+
+        return _read_files_ahead(files(), _READ_AHEAD_MAX_RANGES)
+
+    def _range_readers(self, s3_key):
+        size = s3_key.size
+        for start in range(0, size, _READ_AHEAD_RANGE_SIZE):
+            end = min(start + _READ_AHEAD_RANGE_SIZE, size)
+            yield partial(_read_s3_key_range, s3_key, start, end)
 
     def mkdir(self, dest):
         """Make a directory. This does nothing on S3 because there are
@@ -175,12 +241,41 @@ class S3Filesystem(Filesystem):
         return any(paths)
 
     def rm(self, path_glob):
-        """Remove all files matching the given glob."""
-        for uri in self.ls(path_glob):
-            key = self.get_s3_key(uri)
-            if key:
-                log.debug('deleting ' + uri)
-                key.delete()
+        """Remove all files matching the given glob.
+
+        .. versionchanged:: 0.5.8
+
+           deletes keys in batches (see :py:meth:`delete_keys`)
+        """
+        self.delete_keys(key for _, key in self._ls_keys(path_glob))
+
+    def delete_keys(self, s3_keys):
+        """Delete the given boto Key objects (e.g. from
+        :py:meth:`boto.s3.bucket.Bucket.list`), up to 1000 per request,
+        with several requests running at once.
+
+        Raises :py:class:`IOError` if S3 reports it couldn't delete
+        some keys.
+
+        .. versionadded:: 0.5.8
+        """
+        def batch_deleters():
+            batch = []
+
+            for s3_key in s3_keys:
+                if batch and (len(batch) >= _DELETE_BATCH_SIZE or
+                              s3_key.bucket.name != batch[0].bucket.name):
+                    yield partial(_delete_s3_key_batch, batch)
+                    batch = []
+
+                log.debug('deleting ' + s3_key_to_uri(s3_key))
+                batch.append(s3_key)
+
+            if batch:
+                yield partial(_delete_s3_key_batch, batch)
+
+        for _ in _read_ahead(batch_deleters(), _MAX_CONCURRENT_DELETES):
+            pass
 
     def touchz(self, dest):
         """Make an empty file in the given location. Raises an error if
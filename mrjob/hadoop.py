@@ -197,7 +197,8 @@ class HadoopJobRunner(MRJobRunner, LogInterpretationMixin):
         if self._fs is None:
             self._fs = CompositeFilesystem(
                 HadoopFilesystem(self._opts['hadoop_bin']),
-                LocalFilesystem())
+                LocalFilesystem(),
+                cache_secs=self._opts['fs_cache_secs'])
         return self._fs
 
     def get_hadoop_version(self):
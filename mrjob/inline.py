@@ -17,12 +17,28 @@
 process. Useful for debugging."""
 import logging
 import os
-from io import BytesIO
+import traceback
+from multiprocessing import Pool
 from shutil import copyfile
 
+from mrjob.cat import PartitionWriter
+from mrjob.cat import can_compress
+from mrjob.cat import compress
+from mrjob.cat import merge_sorted_files
+from mrjob.cat import read_split
+from mrjob.conf import combine_dicts
 from mrjob.job import MRJob
+from mrjob.options import _allowed_keys
+from mrjob.options import _combiners
+from mrjob.options import _deprecated_aliases
 from mrjob.parse import parse_mr_job_stderr
+from mrjob.protocol import _TypedBytesToLinesWriter
+from mrjob.protocol import _typedbytes_line_to_record
 from mrjob.sim import SimMRJobRunner
+from mrjob.sim import SimRunnerOptionStore
+from mrjob.sim import _pop_ready_task_result
+from mrjob.sort import SortAndCombineWriter
+from mrjob.util import read_input
 from mrjob.util import save_current_environment
 from mrjob.util import save_cwd
 
@@ -31,6 +47,19 @@ __author__ = 'Matthew Tai <taim@google.com>'
 log = logging.getLogger(__name__)
 
 
+class InlineRunnerOptionStore(SimRunnerOptionStore):
+    ALLOWED_KEYS = _allowed_keys('inline')
+    COMBINERS = _combiners('inline')
+    DEPRECATED_ALIASES = _deprecated_aliases('inline')
+
+    def default_options(self):
+        super_opts = super(InlineRunnerOptionStore, self).default_options()
+
+        return combine_dicts(super_opts, {
+            'inline_max_concurrent_tasks': 1,
+        })
+
+
 class InlineMRJobRunner(SimMRJobRunner):
     """Runs an :py:class:`~mrjob.job.MRJob` in the same process, so it's easy
     to attach a debugger.
@@ -45,9 +74,17 @@ class InlineMRJobRunner(SimMRJobRunner):
     To more accurately simulate your environment prior to running on
     Hadoop/EMR, use ``-r local`` (see
     :py:class:`~mrjob.local.LocalMRJobRunner`).
+
+    If you set :mrjob-opt:`inline_max_concurrent_tasks`, tasks are run in
+    a pool of worker processes (forked from this one, so your job class
+    need only be imported once). Exceptions are still re-raised as-is
+    and counters are still collected, but you can no longer attach a
+    debugger to your tasks.
     """
     alias = 'inline'
 
+    OPTION_STORE_CLASS = InlineRunnerOptionStore
+
     def __init__(self, mrjob_cls=None, **kwargs):
         """:py:class:`~mrjob.inline.InlineMRJobRunner` takes the same keyword
         args as :py:class:`~mrjob.runner.MRJobRunner`. However, please note:
@@ -60,12 +97,26 @@ class InlineMRJobRunner(SimMRJobRunner):
         * *python_bin*, *setup*, *setup_cmds*, *setup_scripts* and
           *steps_python_bin* are ignored because we don't invoke
           subprocesses.
+        * if *inline_max_concurrent_tasks* is more than 1, tasks run in
+          a pool of worker processes forked from this one, rather than in
+          this process.
         """
         super(InlineMRJobRunner, self).__init__(**kwargs)
         assert ((mrjob_cls) is None or issubclass(mrjob_cls, MRJob))
 
+        if self._opts['inline_max_concurrent_tasks'] < 1:
+            raise ValueError('inline_max_concurrent_tasks must be at least 1')
+
         self._mrjob_cls = mrjob_cls
 
+        # pool of worker processes, if inline_max_concurrent_tasks > 1.
+        # Only exists while the job is running
+        self._pool = None
+
+        # (step_num, output_path, AsyncResult) for tasks submitted to
+        # self._pool
+        self._task_results = []
+
     # options that we ignore because they involve running subprocesses
     _IGNORED_LOCAL_OPTS = [
         'bootstrap_mrjob',
@@ -111,63 +162,239 @@ class InlineMRJobRunner(SimMRJobRunner):
 
         return self._steps
 
-    def _run_step(self, step_num, step_type, input_path, output_path,
-                  working_dir, env, child_stdin=None):
-        step = self._get_step(step_num)
-
-        # if no mapper, just pass the data through (see #1141)
-        if step_type == 'mapper' and not step.get('mapper'):
-            copyfile(input_path, output_path)
-            return
-
-        # Passing local=False ensures the job uses proper names for file
-        # options (see issue #851 on github)
-        common_args = (['--step-num=%d' % step_num] +
-                       self._mr_job_extra_args(local=False))
-
-        if step_type == 'mapper':
-            child_args = (
-                ['--mapper'] + [input_path] + common_args)
-        elif step_type == 'reducer':
-            child_args = (
-                ['--reducer'] + [input_path] + common_args)
-        elif step_type == 'combiner':
-            child_args = ['--combiner'] + common_args + ['-']
-
-        has_combiner = (step_type == 'mapper' and 'combiner' in step)
+    def _run(self):
+        num_processes = self._opts['inline_max_concurrent_tasks']
+
+        if num_processes > 1:
+            # fork workers now, so they inherit our already-imported job class
+            self._pool = Pool(processes=num_processes,
+                              initializer=_init_worker,
+                              initargs=(self._mrjob_cls,))
 
         try:
-            # Use custom stdout
-            if has_combiner:
-                child_stdout = BytesIO()
-            else:
-                child_stdout = open(output_path, 'wb')
+            super(InlineMRJobRunner, self)._run()
+        finally:
+            if self._pool is not None:
+                self._pool.terminate()
+                self._pool.join()
+                self._pool = None
+
+    def _max_concurrent_tasks(self):
+        return self._opts['inline_max_concurrent_tasks']
 
-            with save_current_environment():
-                with save_cwd():
-                    os.environ.update(env)
-                    os.chdir(working_dir)
+    def _run_step(self, step_num, step_type, input_path, output_path,
+                  working_dir, env, input_start=None, input_length=None):
+        task_args = (self._get_step(step_num), step_num, step_type,
+                     input_path, output_path, working_dir, env,
+                     self._mr_job_extra_args(local=False),
+                     self._map_sort_buffer_size(step_num),
+                     input_start, input_length,
+                     self._task_partition_paths(step_num, step_type,
+                                                output_path),
+                     self._task_shuffles_typedbytes(step_num, step_type))
 
-                    child_instance = self._mrjob_cls(args=child_args)
-                    child_instance.sandbox(stdin=child_stdin,
-                                           stdout=child_stdout)
-                    child_instance.execute()
+        if self._pool is None:
+            stderrs = []
+            try:
+                _run_task(self._mrjob_cls, *task_args, stderrs=stderrs)
+            finally:
+                # keep counters from failed tasks too
+                self._parse_task_stderr(step_num, b''.join(stderrs))
+            self._finished_tasks.append(output_path)
+        else:
+            self._task_results.append((
+                step_num, output_path,
+                self._pool.apply_async(_run_task_in_worker, task_args)))
 
-            if has_combiner:
-                sorted_lines = sorted(child_stdout.getvalue().splitlines())
-                combiner_stdin = BytesIO(b'\n'.join(sorted_lines))
-            else:
-                child_stdout.flush()
-        finally:
-            child_stdout.close()
+    def _wait_for_any_task(self):
+        step_num, output_path, task_result = _pop_ready_task_result(
+            self._task_results)
+
+        stderr, error, tb = task_result.get()
+        self._parse_task_stderr(step_num, stderr)
 
+        if error is not None:
+            # the exception we re-raise doesn't have the worker's traceback
+            for line in tb.splitlines():
+                log.error(line)
+            raise error
+
+        self._finished_tasks.append(output_path)
+
+    def _parse_task_stderr(self, step_num, stderr):
         while len(self._counters) <= step_num:
             self._counters.append({})
-        parse_mr_job_stderr(child_instance.stderr.getvalue(),
-                            counters=self._counters[step_num])
+        parse_mr_job_stderr(stderr, counters=self._counters[step_num])
+
+
+# the job class used by tasks in worker processes (see _init_worker())
+_worker_mrjob_cls = None
+
+
+def _init_worker(mrjob_cls):
+    """Initializer for worker processes in
+    :py:class:`~mrjob.inline.InlineMRJobRunner`'s pool."""
+    global _worker_mrjob_cls
+    _worker_mrjob_cls = mrjob_cls
+
+
+def _run_task_in_worker(*args):
+    """Run a task (see :py:func:`_run_task`) in a worker process.
+
+    Returns ``(stderr, error, tb)``, where *stderr* is the task's stderr
+    (even if it failed), and if the task raised an exception, *error* is
+    the exception and *tb* is its formatted traceback (which wouldn't
+    survive the trip back to the parent process on Python 2).
+    """
+    stderrs = []
+
+    try:
+        _run_task(_worker_mrjob_cls, *args, stderrs=stderrs)
+    except Exception as e:
+        return b''.join(stderrs), e, traceback.format_exc()
+
+    return b''.join(stderrs), None, None
+
+
+def _run_task(mrjob_cls, step, step_num, step_type, input_path, output_path,
+              working_dir, env, extra_args, sort_buffer_size,
+              input_start=None, input_length=None, partition_paths=None,
+              typedbytes_shuffle=False, stderrs=None):
+    """Run a mapper (and its combiner, if any) or reducer in this process,
+    using a new instance of *mrjob_cls*.
+
+    If *input_start* and *input_length* are set, the task only reads
+    that split of *input_path* (see :py:func:`~mrjob.cat.read_split`).
+    Reducers merge the sorted partitions in *input_path*, a list (see
+    :py:func:`~mrjob.cat.merge_sorted_files`).
+
+    Mapper output is sorted and combined *sort_buffer_size* bytes at a time
+    as the mapper writes it (see :py:class:`~mrjob.sort.SortAndCombineWriter`).
+    If *partition_paths* is set, mapper output is always sorted, and split
+    by key into one file for each path (see
+    :py:class:`~mrjob.cat.PartitionWriter`), rather than written to
+    *output_path*.
+
+    If *typedbytes_shuffle* is true, the mapper writes (or the reducer
+    reads) typed bytes records, which we convert to and from lines (see
+    :py:func:`~mrjob.protocol._typedbytes_record_to_line`).
+
+    Returns the task's stderr, as bytes, so that the runner can pick
+    counters out of it. If *stderrs* is set, the stderr of each instance
+    of *mrjob_cls* is also appended to it as soon as that instance is
+    done, so that it's available even if the task fails.
+    """
+    if stderrs is None:
+        stderrs = []
+
+    if step_type == 'reducer':
+        lines = merge_sorted_files(input_path)
+        if typedbytes_shuffle:
+            lines = (_typedbytes_line_to_record(line[:-1]) for line in lines)
+
+        _run_task_on_lines(
+            mrjob_cls, step, step_num, step_type, '-', lines, output_path,
+            working_dir, env, extra_args, sort_buffer_size, partition_paths,
+            stderrs)
+    elif input_length is None:
+        _run_task_on_lines(
+            mrjob_cls, step, step_num, step_type, input_path, None,
+            output_path, working_dir, env, extra_args, sort_buffer_size,
+            partition_paths, stderrs, typedbytes_shuffle)
+    else:
+        with open(input_path, 'rb') as input_file:
+            _run_task_on_lines(
+                mrjob_cls, step, step_num, step_type, '-',
+                read_split(input_file, input_start, input_length, input_path),
+                output_path, working_dir, env, extra_args, sort_buffer_size,
+                partition_paths, stderrs, typedbytes_shuffle)
+
+    return b''.join(stderrs)
+
+
+def _run_task_on_lines(mrjob_cls, step, step_num, step_type, input_path,
+                       stdin, output_path, working_dir, env, extra_args,
+                       sort_buffer_size, partition_paths, stderrs,
+                       typedbytes_output=False):
+    """Helper for :py:func:`_run_task`. Reads from *stdin* if *input_path*
+    is ``'-'``, and appends the stderr of each instance of *mrjob_cls* it
+    runs to *stderrs*. If *typedbytes_output* is true, converts the
+    mapper's typed bytes output to lines.
+
+    Output is compressed based on *output_path*'s extension (see
+    :py:func:`~mrjob.cat.compress`), or on the extensions of
+    *partition_paths*, if set."""
+    # if no mapper, just pass the data through (see #1141)
+    pass_through = (step_type == 'mapper' and not step.get('mapper'))
+
+    if (pass_through and partition_paths is None and stdin is None and
+            not can_compress(output_path)):
+        copyfile(input_path, output_path)
+        return
+
+    tmp_dir = os.path.dirname(output_path)
+
+    # Passing local=False ensures the job uses proper names for file
+    # options (see issue #851 on github)
+    common_args = ['--step-num=%d' % step_num] + extra_args
+
+    def run(output_file):
+        if pass_through:
+            for line in (stdin or read_input(input_path)):
+                output_file.write(line)
+        else:
+            child_args = ['--' + step_type, input_path] + common_args
+            if typedbytes_output:
+                with _TypedBytesToLinesWriter(output_file) as lines_file:
+                    _execute(mrjob_cls, child_args, stdin, lines_file,
+                             working_dir, env, stderrs)
+            else:
+                _execute(mrjob_cls, child_args, stdin, output_file,
+                         working_dir, env, stderrs)
+
+    def combine(lines, combiner_output_file):
+        combiner_args = ['--combiner', '-'] + common_args
+        _execute(mrjob_cls, combiner_args, lines, combiner_output_file,
+                 working_dir, env, stderrs)
+
+    def run_and_combine(output_file):
+        if step_type == 'mapper' and 'combiner' in step:
+            with SortAndCombineWriter(output_file, combine, tmp_dir,
+                                      sort_buffer_size) as combiner_file:
+                run(combiner_file)
+        else:
+            run(output_file)
+
+    if partition_paths is not None:
+        # combiner output isn't necessarily sorted, so sort after it
+        with PartitionWriter(partition_paths) as partition_file:
+            with SortAndCombineWriter(partition_file, None, tmp_dir,
+                                      sort_buffer_size) as sorted_file:
+                run_and_combine(sorted_file)
+    else:
+        with open(output_path, 'wb') as f:
+            with compress(f, output_path) as output_file:
+                run_and_combine(output_file)
+
+
+def _execute(mrjob_cls, args, stdin, stdout, working_dir, env, stderrs):
+    """Run a new instance of *mrjob_cls* with the given *args* in
+    *working_dir*, with *env* added to the environment, reading from *stdin*
+    (if not ``None``) and writing output to *stdout*.
+
+    Appends the instance's stderr, as bytes, to *stderrs*, even if it
+    raises an exception.
+    """
+    with save_current_environment():
+        with save_cwd():
+            os.environ.update(env)
+            os.chdir(working_dir)
 
-        if has_combiner:
-            self._run_step(step_num, 'combiner', None, output_path,
-                           working_dir, env, child_stdin=combiner_stdin)
+            child_instance = mrjob_cls(args=args)
+            child_instance.sandbox(stdin=stdin, stdout=stdout)
+            try:
+                child_instance.execute()
+            finally:
+                stderrs.append(child_instance.stderr.getvalue())
 
-            combiner_stdin.close()
+    stdout.flush()
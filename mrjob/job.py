@@ -16,15 +16,25 @@ for more information."""
 
 # don't add imports here that aren't part of the standard Python library,
 # since MRJobs need to run in Amazon's generic EMR environment
+import contextlib
 import inspect
 import itertools
 import json
 import logging
 import os.path
 import sys
+import time
+from operator import itemgetter
 from optparse import OptionGroup
 
+try:
+    import numpy
+    numpy  # quiet "redefinition of unused ..." warning from pyflakes
+except ImportError:
+    numpy = None
+
 # don't use relative imports, to allow this script to be invoked as __main__
+from mrjob.compat import jobconf_from_env
 from mrjob.conf import combine_dicts
 from mrjob.conf import combine_lists
 from mrjob.launch import MRJobLauncher
@@ -33,6 +43,11 @@ from mrjob.options import _add_step_options
 from mrjob.options import _print_help_for_steps
 from mrjob.protocol import JSONProtocol
 from mrjob.protocol import RawValueProtocol
+from mrjob.protocol import TypedBytesProtocol
+from mrjob.protocol import TypedBytesValueProtocol
+from mrjob.protocol import _read_typedbytes_records
+from mrjob.protocol import _typedbytes_line_to_record
+from mrjob.protocol import _typedbytes_record_to_line
 from mrjob.py2 import integer_types
 from mrjob.py2 import string_types
 from mrjob.step import MRStep
@@ -44,6 +59,211 @@ from mrjob.util import read_input
 
 log = logging.getLogger(__name__)
 
+# how many lines to decode (or records to pass to mapper_batch(), etc.) at once
+_PROTOCOL_BATCH_SIZE = 1000
+
+# jobconf variables that tell Hadoop Streaming what format (e.g.
+# ``'typedbytes'``) each type of task reads and writes. Combiners use the
+# same settings as reducers.
+_STREAM_INPUT_JOBCONF = {
+    'mapper': 'stream.map.input',
+    'combiner': 'stream.reduce.input',
+    'reducer': 'stream.reduce.input',
+}
+
+_STREAM_OUTPUT_JOBCONF = {
+    'mapper': 'stream.map.output',
+    'combiner': 'stream.reduce.output',
+    'reducer': 'stream.reduce.output',
+}
+
+# protocols that can be passed between mapper and reducer as typed bytes
+_TYPEDBYTES_PROTOCOLS = (TypedBytesProtocol, TypedBytesValueProtocol)
+
+
+def _protocol_method(method, name):
+    """If *method* is a bound method of a protocol (e.g. its ``read()``),
+    return the protocol's method called *name* (e.g. ``read_many()``), or
+    ``None`` if it doesn't have one (or *method* isn't bound to a
+    protocol)."""
+    protocol = getattr(method, '__self__', None)
+    if protocol is None:
+        return None
+
+    return getattr(protocol, name, None)
+
+
+def _key_value_batches(pairs, batch_size):
+    """Split an iterable of ``(key, value)`` pairs into a list of keys
+    and a list of values, *batch_size* pairs at a time."""
+    pairs = iter(pairs)
+
+    while True:
+        batch = list(itertools.islice(pairs, batch_size))
+        if not batch:
+            return
+
+        yield [k for k, v in batch], [v for k, v in batch]
+
+
+def _key_value_chunks(pairs, batch_size):
+    """Split an iterable of ``(key, value)`` pairs, sorted by key, into
+    ``(key, values)``, where *values* is a list of up to *batch_size* values
+    for *key*. A key with many values may be split across several
+    chunks."""
+    values = []
+    key = None
+
+    for k, v in pairs:
+        if not values:
+            key = k
+        elif k != key or len(values) >= batch_size:
+            yield key, values
+            values = []
+            key = k
+
+        values.append(v)
+
+    if values:
+        yield key, values
+
+
+def _to_list(column):
+    """Convert a column of output (e.g. a NumPy array) to a list."""
+    tolist = getattr(column, 'tolist', None)
+    if tolist is not None:
+        return tolist()
+    else:
+        return list(column)
+
+
+def _batch_pairs(keys, values):
+    """Convert columns of keys and values (see
+    :py:meth:`MRJob.mapper_batch`) to a list of ``(key, value)`` pairs."""
+    keys = _to_list(keys)
+    values = _to_list(values)
+    if len(keys) != len(values):
+        raise ValueError(
+            'Got %d keys but %d values' % (len(keys), len(values)))
+
+    return list(zip(keys, values))
+
+
+class _MapperAggregator(object):
+    """Combine values with the same key using *aggregate* (see
+    :py:meth:`MRJob.mapper_aggregate`), and pass the results to
+    *write_line*.
+
+    To keep memory bounded, we hold on to at most *size* keys. Keys live in
+    two generations; when the new generation fills up, keys in the old
+    generation that haven't been seen since are written out (spilled), and
+    the new generation becomes the old one. This approximates evicting the
+    least recently used keys without having to keep them in order.
+
+    Keys are stored along with their type, so that (for example) ``1``,
+    ``1.0``, and ``True`` aren't combined. Unhashable keys (e.g. lists) are
+    written out immediately.
+    """
+    def __init__(self, aggregate, write_line, size):
+        self._aggregate = aggregate
+        self._write_line = write_line
+        self._generation_size = max(size // 2, 1)
+
+        self._new = {}
+        self._old = {}
+
+    def add(self, key, value):
+        try:
+            type_and_key = (type(key), key)
+            hash(type_and_key)
+        except TypeError:
+            self._write_line(key, value)
+            return
+
+        new = self._new
+
+        if type_and_key in new:
+            new[type_and_key] = self._aggregate(new[type_and_key], value)
+            return
+
+        if type_and_key in self._old:
+            value = self._aggregate(self._old.pop(type_and_key), value)
+
+        new[type_and_key] = value
+
+        if len(new) >= self._generation_size:
+            self._spill(self._old)
+            self._old = new
+            self._new = {}
+
+    def add_batch(self, keys, values):
+        for key, value in _batch_pairs(keys, values):
+            self.add(key, value)
+
+    def flush(self):
+        """Write out everything we're holding on to."""
+        self._spill(self._old)
+        self._spill(self._new)
+
+    def _spill(self, generation):
+        for (_, key), value in generation.items():
+            self._write_line(key, value)
+
+        generation.clear()
+
+
+class _OutputBuffer(object):
+    """Hold on to encoded output, and write it to *stream* in blocks of
+    at least *size* bytes, with one ``write()`` call per block.
+
+    Keeps track of how many bytes and records have been written so far
+    in :py:attr:`bytes_written` and :py:attr:`records_written`.
+    """
+    def __init__(self, stream, size):
+        self._stream = stream
+        self._size = size
+
+        # output we haven't written yet
+        self._chunks = []
+        self._num_bytes = 0
+        self._num_records = 0
+
+        self.bytes_written = 0
+        self.records_written = 0
+
+    def write(self, data, num_records=1):
+        """Buffer *data*, which contains *num_records* encoded records,
+        writing out the buffer if it's full."""
+        self._chunks.append(data)
+        self._num_bytes += len(data)
+        self._num_records += num_records
+
+        if self._num_bytes >= self._size:
+            self.flush()
+
+    def flush(self):
+        """Write out everything in the buffer."""
+        if not self._chunks:
+            return
+
+        self._stream.write(b''.join(self._chunks))
+
+        self.bytes_written += self._num_bytes
+        self.records_written += self._num_records
+
+        del self._chunks[:]
+        self._num_bytes = 0
+        self._num_records = 0
+
+
+def _counter_line(group, counter, amount):
+    """Encode a line that tells Hadoop Streaming to increment a counter."""
+    line = 'reporter:counter:%s,%s,%d\n' % (group, counter, amount)
+    if not isinstance(line, bytes):
+        line = line.encode('utf_8')
+
+    return line
+
 
 def _im_func(f):
     """Wrapper to get at the underlying function belonging to a method.
@@ -86,6 +306,14 @@ class MRJob(MRJobLauncher):
         """
         super(MRJob, self).__init__(self.mr_job_script(), args)
 
+        # counter increments that haven't been written yet, while running
+        # a task (see _buffer_counters())
+        self._counters = None
+        self._counters_flushed = None
+
+        # task output that hasn't been written yet (see _wrap_protocols())
+        self._output_buffer = None
+
     @classmethod
     def _usage(cls):
         return "usage: %prog [options] [input files]"
@@ -297,6 +525,63 @@ class MRJob(MRJobLauncher):
         """
         raise NotImplementedError
 
+    def mapper_batch(self, keys, values):
+        """Re-define this instead of :py:meth:`mapper` to have your
+        mapper handle input a batch of records at a time (e.g. so that you
+        can use vectorized math).
+
+        Yields zero or more tuples of ``(out_keys, out_values)``, where
+        ``out_keys`` and ``out_values`` are sequences (lists, NumPy arrays,
+        etc.) of the same length.
+
+        :param keys: A list of keys parsed from input.
+        :param values: A list of values parsed from input (or a NumPy
+                       array, if :py:attr:`BATCH_ARRAYS` is set).
+
+        .. versionadded:: 0.5.8
+        """
+        raise NotImplementedError
+
+    def reducer_batch(self, key, value_batches):
+        """Re-define this instead of :py:meth:`reducer` to have your
+        reducer receive the values for each key a batch at a time.
+
+        Yields zero or more tuples of ``(out_keys, out_values)``, like
+        :py:meth:`mapper_batch`.
+
+        :param key: A key which was yielded by the mapper
+        :param value_batches: A generator which yields lists (or NumPy
+                              arrays, if :py:attr:`BATCH_ARRAYS` is set) of
+                              the values yielded by the mapper which
+                              correspond to ``key``.
+
+        .. versionadded:: 0.5.8
+        """
+        raise NotImplementedError
+
+    def mapper_aggregate(self, value1, value2):
+        """Re-define this to combine values that your mapper (and
+        :py:meth:`mapper_init`, :py:meth:`mapper_final`, etc.) yields
+        for the same key before they are written, rather than sorting them
+        and running a :py:meth:`combiner`. For example, for a word count::
+
+            def mapper_aggregate(self, count1, count2):
+                return count1 + count2
+
+        Partial results are held in memory, for up to
+        :py:attr:`MAPPER_AGGREGATE_SIZE` keys at a time; a key may be
+        written out more than once, so your reducer still needs to combine
+        values. Everything else is written out after
+        :py:meth:`mapper_final`. Don't modify values after you yield them.
+
+        :param value1: the value so far for some key
+        :param value2: another value yielded for that key
+        :return: the combined value
+
+        .. versionadded:: 0.5.8
+        """
+        raise NotImplementedError
+
     ### Defining one-step Spark jobs ###
 
     def spark(self, input_path, output_path):
@@ -377,6 +662,10 @@ class MRJob(MRJobLauncher):
 
         Commas in ``counter`` or ``group`` will be automatically replaced
         with semicolons (commas confuse Hadoop streaming).
+
+        While running a task, increments are summed in memory and written
+        out every :py:attr:`COUNTER_FLUSH_INTERVAL` seconds, and when the
+        task finishes.
         """
         # don't allow people to pass in floats
         if not isinstance(amount, integer_types):
@@ -396,12 +685,77 @@ class MRJob(MRJobLauncher):
         group = group.replace(',', ';')
         counter = counter.replace(',', ';')
 
-        line = 'reporter:counter:%s,%s,%d\n' % (group, counter, amount)
-        if not isinstance(line, bytes):
-            line = line.encode('utf_8')
+        if self._counters is None:
+            self.stderr.write(_counter_line(group, counter, amount))
+            self.stderr.flush()
+            return
+
+        key = (group, counter)
+        self._counters[key] = self._counters.get(key, 0) + amount
+
+        if (time.time() - self._counters_flushed >=
+                self.COUNTER_FLUSH_INTERVAL):
+            self._flush_counters()
+
+    def _flush_counters(self):
+        """Write out the counter increments that :py:meth:`increment_counter`
+        has been holding on to, summed by counter."""
+        if self._counters:
+            self.stderr.write(b''.join(
+                _counter_line(group, counter, amount)
+                for (group, counter), amount
+                in sorted(self._counters.items())))
+            self.stderr.flush()
+            self._counters.clear()
+
+        self._counters_flushed = time.time()
+
+    @contextlib.contextmanager
+    def _run_task(self):
+        """Context manager for running a task.
+
+        While running a task, have :py:meth:`increment_counter` hold
+        on to counter increments, and write them out every
+        :py:attr:`COUNTER_FLUSH_INTERVAL` seconds.
+
+        When the task is done (even if it fails), write out any output
+        still in the buffer (see :py:meth:`_wrap_protocols`), and then any
+        counter increments.
+        """
+        buffer_counters = (self.COUNTER_FLUSH_INTERVAL and
+                           self._counters is None)
+        if buffer_counters:
+            self._counters = {}
+            self._counters_flushed = time.time()
 
-        self.stderr.write(line)
-        self.stderr.flush()
+        try:
+            yield
+        finally:
+            try:
+                if self._output_buffer is not None:
+                    self._output_buffer.flush()
+            finally:
+                if buffer_counters:
+                    try:
+                        self._flush_counters()
+                    finally:
+                        self._counters = None
+
+    def output_stats(self):
+        """How much output the current (or most recent) task has written,
+        as a dictionary with the keys ``bytes`` and ``records``. Output
+        still in the output buffer (see :py:attr:`OUTPUT_BUFFER_SIZE`)
+        isn't counted until it's written.
+
+        Returns an empty dictionary if this job hasn't run a task.
+
+        .. versionadded:: 0.5.8
+        """
+        if self._output_buffer is None:
+            return {}
+
+        return dict(bytes=self._output_buffer.bytes_written,
+                    records=self._output_buffer.records_written)
 
     def set_status(self, msg):
         """Set the job status in hadoop streaming by printing to stderr.
@@ -482,6 +836,12 @@ class MRJob(MRJobLauncher):
             return InlineMRJobRunner(mrjob_cls=self.__class__,
                                      **self.inline_job_runner_kwargs())
 
+        # the local runner can also run tasks in-process (in workers)
+        if self.options.runner == 'local':
+            from mrjob.local import LocalMRJobRunner
+            return LocalMRJobRunner(mrjob_cls=self.__class__,
+                                    **self.local_job_runner_kwargs())
+
         return super(MRJob, self).make_runner()
 
     def _get_step(self, step_num, expected_type):
@@ -508,27 +868,54 @@ class MRJob(MRJobLauncher):
         Called from :py:meth:`run`. You'd probably only want to call this
         directly from automated tests.
         """
-        step = self._get_step(step_num, MRStep)
-
-        mapper = step['mapper']
-        mapper_init = step['mapper_init']
-        mapper_final = step['mapper_final']
-
-        # pick input and output protocol
-        read_lines, write_line = self._wrap_protocols(step_num, 'mapper')
+        with self._run_task():
+            step = self._get_step(step_num, MRStep)
+
+            mapper = step['mapper']
+            mapper_batch = step['mapper_batch']
+            mapper_aggregate = step['mapper_aggregate']
+            mapper_init = step['mapper_init']
+            mapper_final = step['mapper_final']
+
+            # pick input and output protocol
+            read_lines, _, write_line, write_batch, flush = (
+                self._wrap_protocols(step_num, 'mapper'))
+
+            # combine output with the same key before writing it
+            aggregator = None
+            if mapper_aggregate:
+                aggregator = _MapperAggregator(
+                    mapper_aggregate, write_line, self.MAPPER_AGGREGATE_SIZE)
+                write_line = aggregator.add
+                write_batch = aggregator.add_batch
+
+            if mapper_init:
+                for out_key, out_value in mapper_init() or ():
+                    write_line(out_key, out_value)
+
+            if mapper_batch:
+                # run the mapper on each batch of lines
+                for keys, values in _key_value_batches(
+                        read_lines(), _PROTOCOL_BATCH_SIZE):
+                    for out_keys, out_values in mapper_batch(
+                            keys, self._batch_values(values)) or ():
+                        write_batch(out_keys, out_values)
+            else:
+                # run the mapper on each line
+                for key, value in read_lines():
+                    for out_key, out_value in mapper(key, value) or ():
+                        write_line(out_key, out_value)
 
-        if mapper_init:
-            for out_key, out_value in mapper_init() or ():
-                write_line(out_key, out_value)
+            if mapper_final:
+                # in case mapper_final() writes to self.stdout directly
+                flush()
+                for out_key, out_value in mapper_final() or ():
+                    write_line(out_key, out_value)
 
-        # run the mapper on each line
-        for key, value in read_lines():
-            for out_key, out_value in mapper(key, value) or ():
-                write_line(out_key, out_value)
+            if aggregator is not None:
+                aggregator.flush()
 
-        if mapper_final:
-            for out_key, out_value in mapper_final() or ():
-                write_line(out_key, out_value)
+            flush()
 
     def run_reducer(self, step_num=0):
         """Run the reducer for the given step.
@@ -544,34 +931,60 @@ class MRJob(MRJobLauncher):
         Called from :py:meth:`run`. You'd probably only want to call this
         directly from automated tests.
         """
-        step = self._get_step(step_num, MRStep)
-
-        reducer = step['reducer']
-        reducer_init = step['reducer_init']
-        reducer_final = step['reducer_final']
-        if reducer is None:
-            raise ValueError('No reducer in step %d' % step_num)
-
-        # pick input and output protocol
-        read_lines, write_line = self._wrap_protocols(step_num, 'reducer')
-
-        if reducer_init:
-            for out_key, out_value in reducer_init() or ():
-                write_line(out_key, out_value)
-
-        # group all values of the same key together, and pass to the reducer
-        #
-        # be careful to use generators for everything, to allow for
-        # very large groupings of values
-        for key, kv_pairs in itertools.groupby(read_lines(),
-                                               key=lambda k_v: k_v[0]):
-            values = (v for k, v in kv_pairs)
-            for out_key, out_value in reducer(key, values) or ():
-                write_line(out_key, out_value)
-
-        if reducer_final:
-            for out_key, out_value in reducer_final() or ():
-                write_line(out_key, out_value)
+        with self._run_task():
+            step = self._get_step(step_num, MRStep)
+
+            reducer = step['reducer']
+            reducer_batch = step['reducer_batch']
+            reducer_init = step['reducer_init']
+            reducer_final = step['reducer_final']
+            if reducer is None:
+                raise ValueError('No reducer in step %d' % step_num)
+
+            # pick input and output protocol
+            (read_lines, read_groups, write_line, write_batch,
+             flush) = self._wrap_protocols(step_num, 'reducer')
+
+            if reducer_init:
+                for out_key, out_value in reducer_init() or ():
+                    write_line(out_key, out_value)
+
+            if reducer_batch:
+                # group values of the same key into batches, and pass all the
+                # batches for each key to the reducer
+                for key, chunks in itertools.groupby(
+                        _key_value_chunks(read_lines(), _PROTOCOL_BATCH_SIZE),
+                        key=itemgetter(0)):
+                    value_batches = (self._batch_values(values)
+                                     for _, values in chunks)
+                    for out_keys, out_values in reducer_batch(
+                            key, value_batches) or ():
+                        write_batch(out_keys, out_values)
+            elif self.sort_values() and read_groups is not None:
+                # values are sorted, so the reducer may only want the first
+                # few. Decode each value only if the reducer asks for it
+                for key, values in read_groups():
+                    for out_key, out_value in reducer(key, values) or ():
+                        write_line(out_key, out_value)
+            else:
+                # group all values of the same key together, and pass to the
+                # reducer
+                #
+                # be careful to use generators for everything, to allow for
+                # very large groupings of values
+                for key, kv_pairs in itertools.groupby(read_lines(),
+                                                       key=lambda k_v: k_v[0]):
+                    values = (v for k, v in kv_pairs)
+                    for out_key, out_value in reducer(key, values) or ():
+                        write_line(out_key, out_value)
+
+            if reducer_final:
+                # in case reducer_final() writes to self.stdout directly
+                flush()
+                for out_key, out_value in reducer_final() or ():
+                    write_line(out_key, out_value)
+
+            flush()
 
     def run_combiner(self, step_num=0):
         """Run the combiner for the given step.
@@ -587,34 +1000,41 @@ class MRJob(MRJobLauncher):
         Called from :py:meth:`run`. You'd probably only want to call this
         directly from automated tests.
         """
-        step = self._get_step(step_num, MRStep)
-
-        combiner = step['combiner']
-        combiner_init = step['combiner_init']
-        combiner_final = step['combiner_final']
-        if combiner is None:
-            raise ValueError('No combiner in step %d' % step_num)
-
-        # pick input and output protocol
-        read_lines, write_line = self._wrap_protocols(step_num, 'combiner')
-
-        if combiner_init:
-            for out_key, out_value in combiner_init() or ():
-                write_line(out_key, out_value)
-
-        # group all values of the same key together, and pass to the combiner
-        #
-        # be careful to use generators for everything, to allow for
-        # very large groupings of values
-        for key, kv_pairs in itertools.groupby(read_lines(),
-                                               key=lambda k_v1: k_v1[0]):
-            values = (v for k, v in kv_pairs)
-            for out_key, out_value in combiner(key, values) or ():
-                write_line(out_key, out_value)
-
-        if combiner_final:
-            for out_key, out_value in combiner_final() or ():
-                write_line(out_key, out_value)
+        with self._run_task():
+            step = self._get_step(step_num, MRStep)
+
+            combiner = step['combiner']
+            combiner_init = step['combiner_init']
+            combiner_final = step['combiner_final']
+            if combiner is None:
+                raise ValueError('No combiner in step %d' % step_num)
+
+            # pick input and output protocol
+            read_lines, _, write_line, _, flush = self._wrap_protocols(
+                step_num, 'combiner')
+
+            if combiner_init:
+                for out_key, out_value in combiner_init() or ():
+                    write_line(out_key, out_value)
+
+            # group all values of the same key together, and pass to the
+            # combiner
+            #
+            # be careful to use generators for everything, to allow for
+            # very large groupings of values
+            for key, kv_pairs in itertools.groupby(read_lines(),
+                                                   key=lambda k_v1: k_v1[0]):
+                values = (v for k, v in kv_pairs)
+                for out_key, out_value in combiner(key, values) or ():
+                    write_line(out_key, out_value)
+
+            if combiner_final:
+                # in case combiner_final() writes to self.stdout directly
+                flush()
+                for out_key, out_value in combiner_final() or ():
+                    write_line(out_key, out_value)
+
+            flush()
 
     def run_spark(self, step_num):
         """Run the Spark code for the given step.
@@ -655,8 +1075,47 @@ class MRJob(MRJobLauncher):
         step_descs = []
         for step_num, step in enumerate(self.steps()):
             step_descs.append(step.description(step_num))
+
+        step_map = self._script_step_mapping(step_descs)
+        for step_num, step_desc in enumerate(step_descs):
+            if self._can_shuffle_typedbytes(step_num, step_desc, step_map):
+                step_desc['shuffle_io'] = 'typedbytes'
+
         return step_descs
 
+    def _can_shuffle_typedbytes(self, step_num, step_desc, step_map):
+        """Can Hadoop Streaming pass data from the given step's mapper
+        to its reducer as typed bytes?
+
+        Only if both are script substeps that use typed bytes protocols
+        (see :py:data:`_TYPEDBYTES_PROTOCOLS`), and there's no combiner
+        (Hadoop would read its output as if it came from the reducer),
+        no reducer pre-filter, and no secondary sort (which partitions on
+        tab-separated fields).
+        """
+        if not (step_desc.get('mapper', {}).get('type') == 'script' and
+                step_desc.get('reducer', {}).get('type') == 'script'):
+            return False
+
+        if 'combiner' in step_desc or 'pre_filter' in step_desc['reducer']:
+            return False
+
+        if self.sort_values():
+            return False
+
+        # we can't predict what protocols a custom pick_protocols() uses
+        if (_im_func(self.pick_protocols) is not
+                _im_func(MRJob.pick_protocols)):
+            return False
+
+        _, mapper_write = self._protocol_instances_for_step(
+            step_num, 'mapper', step_map)
+        reducer_read, _ = self._protocol_instances_for_step(
+            step_num, 'reducer', step_map)
+
+        return (isinstance(mapper_write, _TYPEDBYTES_PROTOCOLS) and
+                isinstance(reducer_read, _TYPEDBYTES_PROTOCOLS))
+
     @classmethod
     def mr_job_script(cls):
         """Path of this script. This returns the file containing
@@ -669,6 +1128,18 @@ class MRJob(MRJobLauncher):
 
     ### Other useful utilities ###
 
+    def _batch_values(self, values):
+        """Convert a list of values to pass to :py:meth:`mapper_batch` or
+        :py:meth:`reducer_batch` into a NumPy array, if
+        :py:attr:`BATCH_ARRAYS` is set."""
+        if not self.BATCH_ARRAYS:
+            return values
+
+        if numpy is None:
+            raise ImportError('BATCH_ARRAYS requires numpy')
+
+        return numpy.asarray(values)
+
     def _read_input(self):
         """Read from stdin, or one more files, or directories.
         Yield one line at time.
@@ -683,18 +1154,54 @@ class MRJob(MRJobLauncher):
             for line in read_input(path, stdin=self.stdin):
                 yield line
 
+    def _read_typedbytes_input(self):
+        """Like :py:meth:`_read_input`, except that input is in typed bytes
+        format, so we yield ``(key, value)`` records (each a typed bytes
+        object, as bytes) rather than lines."""
+        return _read_typedbytes_records(self._read_input())
+
     def _wrap_protocols(self, step_num, step_type):
         """Pick the protocol classes to use for reading and writing
         for the given step, and wrap them so that bad input and output
         trigger a counter rather than an exception unless --strict-protocols
         is set.
 
-        Returns a tuple of ``(read_lines, write_line)``
+        Returns a tuple of
+        ``(read_lines, read_groups, write_line, write_batch, flush)``
 
         ``read_lines()`` is a function that reads lines from input, decodes
             them, and yields key, value pairs.
+        ``read_groups()`` is a function that reads lines from input, and
+            yields ``(key, values)`` for each run of lines with the same
+            key, where ``values`` is a generator that only decodes each
+            value when asked for it; the rest of the run is skipped
+            without decoding values. This is ``None`` unless the input
+            protocol has ``read_key()`` and ``read_value()`` methods.
         ``write_line()`` is a function that takes key and value as args,
             encodes them, and writes a line to output.
+        ``write_batch()`` is like ``write_line()``, but takes a sequence
+            of keys and a sequence of values (see :py:meth:`mapper_batch`),
+            and encodes them with the output protocol's ``write_many()``
+            method, if it has one.
+        ``flush()`` is a function that writes any lines that
+            ``write_line()`` and ``write_batch()`` are still holding on to.
+
+        If the input protocol has a ``read_many()`` method, lines are
+        decoded :py:data:`_PROTOCOL_BATCH_SIZE` at a time.
+
+        Output goes through a buffer of :py:attr:`OUTPUT_BUFFER_SIZE`
+        bytes (which we also keep in ``self._output_buffer``, so that
+        :py:meth:`_run_task` can flush it and :py:meth:`output_stats` can
+        read it).
+
+        Once input runs out, if the input protocol has a decode cache, we
+        report its hits and misses in the ``Protocol decode cache`` counter
+        group.
+
+        If Hadoop Streaming is passing input or output as typed bytes (see
+        :py:data:`_STREAM_INPUT_JOBCONF`), we translate records to and from
+        the lines that :py:class:`~mrjob.protocol.TypedBytesProtocol` reads
+        and writes.
 
         :param step_num: which step to run (e.g. 0)
         :param step_type: ``'mapper'``, ``'reducer'``, or ``'combiner'`` from
@@ -702,24 +1209,112 @@ class MRJob(MRJobLauncher):
         """
         read, write = self.pick_protocols(step_num, step_type)
 
+        read_many = _protocol_method(read, 'read_many')
+        read_key = _protocol_method(read, 'read_key')
+        read_value = _protocol_method(read, 'read_value')
+        write_many = _protocol_method(write, 'write_many')
+        decode_cache_stats = _protocol_method(read, 'decode_cache_stats')
+
+        typedbytes_input = jobconf_from_env(
+            _STREAM_INPUT_JOBCONF[step_type]) == 'typedbytes'
+        typedbytes_output = jobconf_from_env(
+            _STREAM_OUTPUT_JOBCONF[step_type]) == 'typedbytes'
+
+        def decode_line(line):
+            return safe_decode(read, line)
+
+        def safe_decode(decode, data):
+            # return a list containing the decoded data, or an empty list
+            # if it can't be decoded
+            try:
+                return [decode(data)]
+            except Exception as e:
+                # the strict_protocols option has to default to None
+                # because it's used by runners, so treat None as true
+                if self.options.strict_protocols is not False:
+                    raise
+                else:
+                    self.increment_counter(
+                        'Undecodable input', e.__class__.__name__)
+                    return []
+
+        def raw_lines():
+            if typedbytes_input:
+                return (_typedbytes_record_to_line(k, v)
+                        for k, v in self._read_typedbytes_input())
+            else:
+                return self._read_input()
+
         def read_lines():
-            for line in self._read_input():
+            for key, value in decode_lines(raw_lines()):
+                yield key, value
+
+            count_decode_cache_stats()
+
+        def count_decode_cache_stats():
+            if decode_cache_stats is not None:
+                for name, amount in sorted(decode_cache_stats().items()):
+                    if amount:
+                        self.increment_counter(
+                            'Protocol decode cache', name, amount)
+
+        def read_groups():
+            keys_and_raw_values = (
+                pair for line in raw_lines()
+                for pair in safe_decode(read_key, line.rstrip(b'\r\n')))
+
+            for key, pairs in itertools.groupby(keys_and_raw_values,
+                                                key=itemgetter(0)):
+                yield key, decode_values(pairs)
+
+            count_decode_cache_stats()
+
+        def decode_values(pairs):
+            for _, raw_value in pairs:
+                for value in safe_decode(read_value, raw_value):
+                    yield value
+
+        def decode_lines(lines):
+            if read_many is None:
+                for line in lines:
+                    for key, value in decode_line(line.rstrip(b'\r\n')):
+                        yield key, value
+                return
+
+            while True:
+                batch = [line.rstrip(b'\r\n') for line in
+                         itertools.islice(lines, _PROTOCOL_BATCH_SIZE)]
+                if not batch:
+                    return
+
                 try:
-                    key, value = read(line.rstrip(b'\r\n'))
+                    pairs = read_many(batch)
+                except Exception:
+                    # decode one by one, so we know which line was bad
+                    pairs = [pair for line in batch
+                             for pair in decode_line(line)]
+
+                for key, value in pairs:
                     yield key, value
-                except Exception as e:
-                    # the strict_protocols option has to default to None
-                    # because it's used by runners, so treat None as true
-                    if self.options.strict_protocols is not False:
-                        raise
-                    else:
-                        self.increment_counter(
-                            'Undecodable input', e.__class__.__name__)
+
+        # we encode each pair as soon as we get it, rather than saving them
+        # up for write_many(), because jobs may re-use mutable objects
+        # they've yielded
+        output_buffer = _OutputBuffer(self.stdout, self.OUTPUT_BUFFER_SIZE)
+        self._output_buffer = output_buffer
+        buffer_write = output_buffer.write
+
+        if typedbytes_output:
+            def encode(key, value):
+                return _typedbytes_line_to_record(write(key, value))
+        else:
+            def encode(key, value):
+                # adding the newline also checks that write() returned bytes
+                return write(key, value) + b'\n'
 
         def write_line(key, value):
             try:
-                self.stdout.write(write(key, value))
-                self.stdout.write(b'\n')
+                data = encode(key, value)
             except Exception as e:
                 # None counts as true, see above
                 if self.options.strict_protocols is not False:
@@ -727,8 +1322,31 @@ class MRJob(MRJobLauncher):
                 else:
                     self.increment_counter(
                         'Unencodable output', e.__class__.__name__)
+                return
+
+            buffer_write(data)
 
-        return read_lines, write_line
+        def write_batch(keys, values):
+            pairs = _batch_pairs(keys, values)
+
+            data = None
+            if write_many is not None and not typedbytes_output:
+                try:
+                    data = write_many(pairs)
+                except Exception:
+                    pass  # encode one by one, to count what went wrong
+
+            if data is None:
+                for key, value in pairs:
+                    write_line(key, value)
+            else:
+                buffer_write(data, len(pairs))
+
+        if read_key is None or read_value is None:
+            read_groups = None
+
+        return (read_lines, read_groups, write_line, write_batch,
+                output_buffer.flush)
 
     def _step_key(self, step_num, step_type):
         return '%d-%s' % (step_num, step_type)
@@ -772,6 +1390,12 @@ class MRJob(MRJobLauncher):
 
         step_map = self._script_step_mapping(steps_desc)
 
+        return self._protocol_instances_for_step(
+            step_num, step_type, step_map)
+
+    def _protocol_instances_for_step(self, step_num, step_type, step_map):
+        """Helper for :py:meth:`_pick_protocol_instances`, which takes
+        the mapping returned by :py:meth:`_script_step_mapping`."""
         # pick input protocol
 
         if step_type == 'combiner':
@@ -1178,7 +1802,17 @@ class MRJob(MRJobLauncher):
     #: See :py:meth:`jobconf()` and :py:meth:`partitioner()` for more about
     #: how this works.
     #:
+    #: If this is set and your internal protocol supports it (e.g.
+    #: :py:class:`~mrjob.protocol.JSONProtocol`), :py:meth:`reducer` decodes
+    #: each value only when you iterate to it, so a reducer that only wants
+    #: the first few values for each key can stop early without paying to
+    #: decode the rest.
+    #:
     #: .. versionadded:: 0.4.1
+    #:
+    #: .. versionchanged:: 0.5.8
+    #:
+    #:    values are decoded lazily
     SORT_VALUES = None
 
     def sort_values(self):
@@ -1188,6 +1822,48 @@ class MRJob(MRJobLauncher):
         secondary sort configurable."""
         return self.SORT_VALUES
 
+    ### Batches ###
+
+    #: Set this to ``True`` to have :py:meth:`mapper_batch` and
+    #: :py:meth:`reducer_batch` receive values as NumPy arrays (see
+    #: :py:func:`numpy.asarray`) rather than lists. This requires
+    #: :py:mod:`numpy`, and works best if your values are all numbers.
+    #:
+    #: .. versionadded:: 0.5.8
+    BATCH_ARRAYS = False
+
+    ### Mapper aggregation ###
+
+    #: How many keys :py:meth:`mapper_aggregate` can hold partial
+    #: results for before it starts writing out the ones that were least
+    #: recently seen.
+    #:
+    #: .. versionadded:: 0.5.8
+    MAPPER_AGGREGATE_SIZE = 10000
+
+    ### Counters ###
+
+    #: How often (in seconds) to write out counter increments while running
+    #: a task; see :py:meth:`increment_counter`. Hadoop Streaming counts
+    #: counter updates as progress, so keep this well under your task
+    #: timeout (``mapreduce.task.timeout``). Set this to ``0`` to write
+    #: every increment immediately.
+    #:
+    #: .. versionadded:: 0.5.8
+    COUNTER_FLUSH_INTERVAL = 10
+
+    ### Output ###
+
+    #: How many bytes of output to hold on to while running a task before
+    #: writing it out; output is written with one ``write()`` call per
+    #: block. Everything left is written when the task finishes (even if
+    #: it fails), and before :py:meth:`mapper_final`,
+    #: :py:meth:`combiner_final`, or :py:meth:`reducer_final` runs. Set
+    #: this to ``0`` to write each line as it's yielded.
+    #:
+    #: .. versionadded:: 0.5.8
+    OUTPUT_BUFFER_SIZE = 64 * 1024
+
 
 if __name__ == '__main__':
     MRJob.run()
@@ -291,7 +291,8 @@ class MRJobLauncher(object):
 
         _add_runner_options(
             self._local_opt_group,
-            _pick_runner_opts('local') - _pick_runner_opts('base'))
+            ((_pick_runner_opts('inline') | _pick_runner_opts('local')) -
+             _pick_runner_opts('base')))
 
         # options common to Hadoop and EMR
         self._hadoop_emr_opt_group = OptionGroup(
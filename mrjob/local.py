@@ -16,22 +16,38 @@
 """Run an MRJob locally by forking off a bunch of processes and piping
 them together. Useful for testing."""
 import logging
+import threading
+from multiprocessing import Pool
 from os.path import abspath
 from subprocess import CalledProcessError
 from subprocess import Popen
 from subprocess import PIPE
 
 import mrjob.cat
+import mrjob.sort
+from mrjob.conf import combine_dicts
 from mrjob.conf import combine_local_envs
+from mrjob.inline import _init_worker
+from mrjob.inline import _run_task_in_worker
 from mrjob.logs.counters import _format_counters
 from mrjob.parse import _find_python_traceback
 from mrjob.parse import parse_mr_job_stderr
 from mrjob.py2 import string_types
 from mrjob.sim import SimMRJobRunner
+from mrjob.sim import SimRunnerOptionStore
+from mrjob.sim import _cpu_count
+from mrjob.sim import _pop_ready_task_result
 from mrjob.step import StepFailedException
 from mrjob.util import cmd_line
 from mrjob.util import shlex_split
 
+try:
+    from queue import Empty
+    from queue import Queue
+except ImportError:
+    from Queue import Empty
+    from Queue import Queue
+
 
 log = logging.getLogger(__name__)
 
@@ -77,12 +93,47 @@ def _chain_procs(procs_args, **kwargs):
     return procs
 
 
+# how long to block waiting for a line of stderr before checking again
+# (so that on Python 2, we can still be interrupted), in seconds
+_STDERR_QUEUE_TIMEOUT = 1.0
+
+
+def _enqueue_lines(fileobj, proc_dict, queue):
+    """Read lines from *fileobj* (a process's stderr) until EOF, putting
+    ``(proc_dict, line)`` on *queue* for each one, and then
+    ``(proc_dict, None)``. Run in a background thread, so that a process
+    can't block on a full stderr pipe while we wait for other processes."""
+    # iter() rather than a for loop, so Python 2 doesn't read ahead
+    for line in iter(fileobj.readline, b''):
+        queue.put((proc_dict, line))
+
+    queue.put((proc_dict, None))
+
+
+class LocalRunnerOptionStore(SimRunnerOptionStore):
+
+    def default_options(self):
+        super_opts = super(LocalRunnerOptionStore, self).default_options()
+
+        return combine_dicts(super_opts, {
+            'local_max_concurrent_tasks': _cpu_count(),
+            'local_task_workers': False,
+        })
+
+
 class LocalMRJobRunner(SimMRJobRunner):
     """Runs an :py:class:`~mrjob.job.MRJob` locally, for testing purposes.
     Invoked when you run your job with ``-r local``.
 
     Unlike :py:class:`~mrjob.job.InlineMRJobRunner`, this actually spawns
-    multiple subprocesses for each task.
+    multiple subprocesses for each task. Up to
+    :mrjob-opt:`local_max_concurrent_tasks` tasks run at once; when one
+    finishes, we start the next.
+
+    If you set :mrjob-opt:`local_task_workers` (and your job can be run
+    in-process; see :py:meth:`_can_use_task_workers`), tasks instead run
+    in a pool of long-lived worker processes which only import your job
+    once.
 
     This is fairly inefficient and *not* a substitute for Hadoop; it's
     main purpose is to help you test out :mrjob-opt:`setup` commands.
@@ -93,7 +144,9 @@ class LocalMRJobRunner(SimMRJobRunner):
     """
     alias = 'local'
 
-    def __init__(self, **kwargs):
+    OPTION_STORE_CLASS = LocalRunnerOptionStore
+
+    def __init__(self, mrjob_cls=None, **kwargs):
         """Arguments to this constructor may also appear in :file:`mrjob.conf`
         under ``runners/local``.
 
@@ -104,6 +157,9 @@ class LocalMRJobRunner(SimMRJobRunner):
         * *cmdenv* is combined with :py:func:`~mrjob.conf.combine_local_envs`
         * *python_bin* defaults to ``sys.executable`` (the current python
           interpreter)
+        * *local_max_concurrent_tasks* defaults to the number of CPUs
+        * *local_task_workers* only works if *mrjob_cls* (the job's class)
+          is set; :py:meth:`~mrjob.job.MRJob.make_runner` does this for you
         * *hadoop_input_format*, *hadoop_output_format*,
           and *partitioner* are ignored because they
           require Java. If you need to test these, consider starting up a
@@ -111,7 +167,28 @@ class LocalMRJobRunner(SimMRJobRunner):
         """
         super(LocalMRJobRunner, self).__init__(**kwargs)
 
-        self._all_proc_dicts = []
+        if self._opts['local_max_concurrent_tasks'] < 1:
+            raise ValueError('local_max_concurrent_tasks must be at least 1')
+
+        self._mrjob_cls = mrjob_cls
+
+        # (step_num, output_path, list of proc dicts) for each task
+        # (mapper or reducer chain) that we've started but not yet
+        # waited for
+        self._running_tasks = []
+
+        # (proc dict, line) for each line of stderr from a running task,
+        # and (proc dict, None) when a process closes its stderr (see
+        # _enqueue_lines())
+        self._stderr_queue = Queue()
+
+        # pool of worker processes, if local_task_workers is set. Only
+        # exists while the job is running
+        self._pool = None
+
+        # (step_num, output_path, AsyncResult) for tasks submitted to
+        # self._pool
+        self._task_results = []
 
         # jobconf variables set by our own job (e.g. files "uploaded")
         #
@@ -120,13 +197,85 @@ class LocalMRJobRunner(SimMRJobRunner):
         # running the job)
         self._internal_jobconf = {}
 
+    def _max_concurrent_tasks(self):
+        return self._opts['local_max_concurrent_tasks']
+
+    def _can_use_task_workers(self):
+        """Can we run tasks in worker processes, rather than subprocesses?
+
+        We need the job's class, and every substep has to be a Python script
+        with no pre-filter. We also can't honor :mrjob-opt:`setup` or
+        :mrjob-opt:`python_bin`, since the workers are forked from this
+        process.
+        """
+        if self._mrjob_cls is None:
+            return False
+
+        if self._setup or self._opts['python_bin']:
+            return False
+
+        for step in self._get_steps():
+            for key in ('mapper', 'combiner', 'reducer'):
+                substep = step.get(key)
+                if substep and (substep['type'] != 'script' or
+                                'pre_filter' in substep):
+                    return False
+
+        return True
+
+    def _run(self):
+        if self._opts['local_task_workers']:
+            if self._can_use_task_workers():
+                # fork workers now, so they only import the job once
+                self._pool = Pool(
+                    processes=self._opts['local_max_concurrent_tasks'],
+                    initializer=_init_worker,
+                    initargs=(self._mrjob_cls,))
+            else:
+                log.warning(
+                    "can't run this job in task workers (needs a job class,"
+                    " no setup or python_bin, and script steps with no"
+                    " pre-filters); running tasks in subprocesses instead")
+
+        try:
+            super(LocalMRJobRunner, self)._run()
+        finally:
+            if self._pool is not None:
+                self._pool.terminate()
+                self._pool.join()
+                self._pool = None
+
     def _run_step(self, step_num, step_type, input_path, output_path,
-                  working_dir, env):
+                  working_dir, env, input_start=None, input_length=None):
+        if self._pool is not None:
+            self._task_results.append((
+                step_num, output_path, self._pool.apply_async(
+                    _run_task_in_worker,
+                    (self._get_step(step_num), step_num, step_type,
+                     input_path, output_path, working_dir, env,
+                     self._mr_job_extra_args(local=False),
+                     self._map_sort_buffer_size(step_num),
+                     input_start, input_length,
+                     self._task_partition_paths(
+                         step_num, step_type, output_path),
+                     self._task_shuffles_typedbytes(step_num, step_type)))))
+            return
+
         step = self._get_step(step_num)
 
         if step_type == 'mapper':
             procs_args = self._mapper_arg_chain(
-                step, step_num, input_path)
+                step, step_num, input_path, input_start, input_length)
+
+            # sort mapper output and split it into partitions (see
+            # _mapper_partition_paths())
+            partition_paths = self._mapper_partition_paths(
+                step_num, output_path)
+            if partition_paths is not None:
+                if self._task_shuffles_typedbytes(step_num, step_type):
+                    procs_args.append(self._typedbytes_args('--from'))
+                procs_args.append(self._sort_args(step_num))
+                procs_args.append(self._partition_args(partition_paths))
         elif step_type == 'reducer':
             procs_args = self._reducer_arg_chain(
                 step, step_num, input_path)
@@ -138,61 +287,194 @@ class LocalMRJobRunner(SimMRJobRunner):
         # to mrjob.cat and make it a standalone script
         env = combine_local_envs(env, {'PYTHONPATH': abspath('.')})
 
+        # don't start this task until there's room for it
+        while (len(self._running_tasks) >=
+               self._opts['local_max_concurrent_tasks']):
+            self._finish_task(self._pop_finished_task())
+
         proc_dicts = self._invoke_processes(
-            procs_args, output_path, working_dir, env)
-        self._all_proc_dicts.extend(proc_dicts)
+            procs_args, output_path, working_dir, env, step_num=step_num)
+        self._running_tasks.append((step_num, output_path, proc_dicts))
+
+    def _wait_for_any_task(self):
+        if self._task_results:
+            step_num, output_path, task_result = _pop_ready_task_result(
+                self._task_results)
+            self._wait_for_task_result(task_result, step_num)
+            self._finished_tasks.append(output_path)
+        else:
+            self._finish_task(self._pop_finished_task())
+
+    def _finish_task(self, task):
+        """Wait for a task from ``self._running_tasks`` to finish, and
+        add its output path to ``self._finished_tasks``."""
+        step_num, output_path, proc_dicts = task
+        self._wait_for_task(proc_dicts, step_num)
+        self._finished_tasks.append(output_path)
+
+    def _wait_for_task_result(self, task_result, step_num):
+        """Wait for a task running in a worker process, and parse counters
+        out of its stderr. If the task raised an exception, log its
+        traceback and raise :py:class:`~mrjob.step.StepFailedException`."""
+        stderr, error, tb = task_result.get()
+
+        parse_mr_job_stderr(stderr, counters=self._counters[step_num])
+
+        if error is not None:
+            counters = self._counters[step_num]
+            if counters:
+                log.info(_format_counters(counters))
 
-    def _per_step_runner_finish(self, step_num):
-        for proc_dict in self._all_proc_dicts:
-            self._wait_for_process(proc_dict, step_num)
+            for line in tb.splitlines():
+                log.error(line)
 
-        self._all_proc_dicts = []
+            raise StepFailedException(
+                reason=repr(error), step_num=step_num,
+                num_steps=len(self._get_steps()))
 
-    def _cat_args(self, input_path):
+    def _pop_finished_task(self):
+        """Remove a task whose processes have all closed their stderr
+        (which they do when they exit) from ``self._running_tasks`` and
+        return it, waiting for one if need be.
+
+        While we wait, handle stderr from every running task as it comes
+        in, so that counters and status messages show up in real time,
+        and tasks can finish in any order.
+        """
+        while True:
+            for i, (_, _, proc_dicts) in enumerate(self._running_tasks):
+                if all(pd['stderr_done'] for pd in proc_dicts):
+                    return self._running_tasks.pop(i)
+
+            try:
+                self._handle_stderr_line(*self._stderr_queue.get(
+                    timeout=_STDERR_QUEUE_TIMEOUT))
+
+                # handle anything else that's ready before checking tasks
+                while True:
+                    self._handle_stderr_line(
+                        *self._stderr_queue.get_nowait())
+            except Empty:
+                pass
+
+    def _handle_stderr_line(self, proc_dict, line):
+        """Handle a line of stderr from :py:attr:`_stderr_queue`. *line* is
+        ``None`` if the process closed its stderr."""
+        if line is None:
+            proc_dict['stderr_done'] = True
+        else:
+            # save lines that aren't counters or statuses, to look for
+            # tracebacks in
+            proc_dict['stderr_lines'].extend(
+                self._process_stderr_from_script(
+                    [line], step_num=proc_dict['step_num']))
+
+    def _wait_for_task(self, proc_dicts, step_num):
+        """Wait for every process in a task's chain to finish."""
+        for proc_dict in proc_dicts:
+            self._wait_for_process(proc_dict, step_num)
+
+    def _cat_args(self, input_path, input_start=None, input_length=None):
         """Return a command line that can call mrjob's internal "cat" script
-        from any working directory, without mrjob in PYTHONPATH"""
-        return self._python_bin() + [
+        from any working directory, without mrjob in PYTHONPATH
+
+        If *input_start* and *input_length* are set, only output the lines
+        in that split of the file (see :py:func:`mrjob.cat.read_split`).
+        """
+        args = self._python_bin() + [
             abspath(mrjob.cat.__file__),
             input_path
         ]
 
-    def _mapper_arg_chain(self, step_dict, step_num, input_path):
+        if input_length is not None:
+            args.extend([str(input_start), str(input_length)])
+
+        return args
+
+    def _merge_args(self, input_paths):
+        """Return a command line that merges the sorted files in
+        *input_paths* to stdout, using mrjob's internal "cat" script (see
+        :py:func:`mrjob.cat.merge_sorted_files`)."""
+        return self._python_bin() + [
+            abspath(mrjob.cat.__file__), '--merge'] + list(input_paths)
+
+    def _typedbytes_args(self, direction):
+        """Return a command line that converts typed bytes records on stdin
+        to lines (if *direction* is ``'--from'``) or lines to typed bytes
+        records (if it's ``'--to'``), using mrjob's internal "cat" script
+        (see :py:meth:`_task_shuffles_typedbytes`)."""
+        return self._python_bin() + [
+            abspath(mrjob.cat.__file__), direction + '-typedbytes']
+
+    def _partition_args(self, output_paths):
+        """Return a command line that splits stdin into one file for each
+        of *output_paths*, by key, using mrjob's internal "cat" script (see
+        :py:class:`mrjob.cat.PartitionWriter`)."""
+        return self._python_bin() + [
+            abspath(mrjob.cat.__file__), '--partition'] + list(output_paths)
+
+    def _mapper_arg_chain(self, step_dict, step_num, input_path,
+                          input_start=None, input_length=None):
         procs_args = []
 
-        procs_args.append(self._cat_args(input_path))
+        procs_args.append(
+            self._cat_args(input_path, input_start, input_length))
 
         if 'mapper' in step_dict:
             procs_args.append(shlex_split(
                 self._substep_cmd_line(step_num, 'mapper')))
 
         if 'combiner' in step_dict:
-            procs_args.append(['sort'])
-            # _substep_args may return more than one process
-            procs_args.append(shlex_split(
-                self._substep_cmd_line(step_num, 'combiner')))
+            procs_args.append(self._sort_and_combine_args(step_num))
 
         return procs_args
 
+    def _sort_and_combine_args(self, step_num):
+        """Return a command line that sorts mapper output and runs it through
+        the combiner, using mrjob's internal "sort" script (see
+        :py:func:`mrjob.sort.sort_and_combine`)."""
+        return self._sort_args(step_num) + shlex_split(
+            self._substep_cmd_line(step_num, 'combiner'))
+
+    def _sort_args(self, step_num):
+        """Return a command line that sorts mapper output, using mrjob's
+        internal "sort" script (see
+        :py:class:`mrjob.sort.SortAndCombineWriter`)."""
+        return self._python_bin() + [
+            abspath(mrjob.sort.__file__),
+            '--buffer-size', str(self._map_sort_buffer_size(step_num)),
+            '--tmp-dir', self._get_local_tmp_dir(),
+        ]
+
     def _reducer_arg_chain(self, step_dict, step_num, input_path):
         if 'reducer' not in step_dict:
             return []
 
         procs_args = []
 
-        procs_args.append(self._cat_args(input_path))
+        # merge sorted partitions from each mapper
+        procs_args.append(self._merge_args(input_path))
+        if self._task_shuffles_typedbytes(step_num, 'reducer'):
+            procs_args.append(self._typedbytes_args('--to'))
         procs_args.append(shlex_split(
             self._substep_cmd_line(step_num, 'reducer')))
 
         return procs_args
 
-    def _invoke_processes(self, procs_args, output_path, working_dir, env):
+    def _invoke_processes(self, procs_args, output_path, working_dir, env,
+                          step_num=0):
         """invoke the process described by *args* and write to *output_path*
 
-        :param combiner_args: If this mapper has a combiner, we need to do
-                              some extra shell wrangling, so pass the combiner
-                              arguments in separately.
+        Each process's stderr is read in a background thread, and put on
+        :py:attr:`_stderr_queue` (see :py:meth:`_pop_finished_task`).
 
-        :return: dict(proc=Popen, args=[process args], write_to=file)
+        :param step_num: which step the processes are part of (for counters)
+
+        :return: a list of dict(proc=Popen, args=[process args],
+                 write_to=file, step_num=step_num,
+                 stderr_lines=[stderr lines that weren't counters or
+                 statuses], stderr_done=whether stderr is closed,
+                 stderr_thread=Thread reading stderr), one for each process
         """
         log.debug('> %s > %s' % (' | '.join(
             args if isinstance(args, string_types) else cmd_line(args)
@@ -201,16 +483,32 @@ class LocalMRJobRunner(SimMRJobRunner):
         with open(output_path, 'wb') as write_to:
             procs = _chain_procs(procs_args, stdout=write_to, stderr=PIPE,
                                  cwd=working_dir, env=env)
-            return [{'args': a, 'proc': proc, 'write_to': write_to}
-                    for a, proc in zip(procs_args, procs)]
+
+        proc_dicts = []
+
+        for a, proc in zip(procs_args, procs):
+            proc_dict = {'args': a, 'proc': proc, 'write_to': write_to,
+                         'step_num': step_num, 'stderr_lines': [],
+                         'stderr_done': False}
+
+            proc_dict['stderr_thread'] = threading.Thread(
+                target=_enqueue_lines,
+                args=(proc.stderr, proc_dict, self._stderr_queue))
+            proc_dict['stderr_thread'].daemon = True
+            proc_dict['stderr_thread'].start()
+
+            proc_dicts.append(proc_dict)
+
+        return proc_dicts
 
     def _wait_for_process(self, proc_dict, step_num):
         # handle counters, status msgs, and other stuff on stderr
         proc = proc_dict['proc']
 
-        stderr_lines = self._process_stderr_from_script(
-            proc.stderr, step_num=step_num)
-        tb_lines = _find_python_traceback(stderr_lines)
+        # stderr has already been handled (see _pop_finished_task())
+        proc_dict['stderr_thread'].join()
+
+        tb_lines = _find_python_traceback(proc_dict['stderr_lines'])
 
         # proc.stdout isn't always defined
         if proc.stdout:
@@ -493,6 +493,18 @@ _RUNNER_OPTS = dict(
             )),
         ],
     ),
+    cloud_max_concurrent_uploads=dict(
+        cloud_role='launch',
+        runners=['emr'],
+        switches=[
+            (['--cloud-max-concurrent-uploads'], dict(
+                help=('Upload up to this many files (or parts of files)'
+                      ' to S3 at once. Default is 8. Set to 1 to upload'
+                      ' one thing at a time.'),
+                type='int',
+            )),
+        ],
+    ),
     cloud_upload_part_size=dict(
         cloud_role='launch',
         deprecated_aliases=['s3_upload_part_size'],
@@ -656,6 +668,16 @@ _RUNNER_OPTS = dict(
             )),
         ],
     ),
+    fs_cache_secs=dict(
+        switches=[
+            (['--fs-cache-secs'], dict(
+                help=('Cache file listings, sizes, and checksums from'
+                      ' remote filesystems for this many seconds (default'
+                      ' is not to cache them)'),
+                type='float',
+            )),
+        ],
+    ),
     gcp_project=dict(
         runners=['dataproc'],
         switches=[
@@ -787,6 +809,31 @@ _RUNNER_OPTS = dict(
             )),
         ],
     ),
+    index_gzip_input=dict(
+        runners=['inline', 'local'],
+        switches=[
+            (['--index-gzip-input'], dict(
+                action='store_true',
+                help=('Index gzipped input files (and cache the index next'
+                      ' to them) so that they can be split, if possible'),
+            )),
+            (['--no-index-gzip-input'], dict(
+                action='store_false',
+                help=("Don't index gzipped input files (the default)"),
+            )),
+        ],
+    ),
+    inline_max_concurrent_tasks=dict(
+        runners=['inline'],
+        switches=[
+            (['--inline-max-concurrent-tasks'], dict(
+                help=('Run up to this many tasks at once in a pool of'
+                      ' worker processes (default is 1, which runs tasks'
+                      ' in the same process as the runner)'),
+                type='int',
+            )),
+        ],
+    ),
     instance_type=dict(
         cloud_role='launch',
         deprecated_aliases=['ec2_instance_type'],
@@ -841,6 +888,30 @@ _RUNNER_OPTS = dict(
             )),
         ],
     ),
+    local_max_concurrent_tasks=dict(
+        runners=['local'],
+        switches=[
+            (['--local-max-concurrent-tasks'], dict(
+                help=('Maximum number of mapper/reducer tasks to run at'
+                      ' once (default is the number of CPUs)'),
+                type='int',
+            )),
+        ],
+    ),
+    local_task_workers=dict(
+        runners=['local'],
+        switches=[
+            (['--local-task-workers'], dict(
+                action='store_true',
+                help=('Run tasks in a pool of long-lived Python processes'
+                      ' rather than in subprocesses, if possible'),
+            )),
+            (['--no-local-task-workers'], dict(
+                action='store_false',
+                help='Run every task in its own subprocesses (the default)',
+            )),
+        ],
+    ),
     local_tmp_dir=dict(
         combiner=combine_paths,
         deprecated_aliases=['base_tmp_dir'],
@@ -938,6 +1009,21 @@ _RUNNER_OPTS = dict(
             )),
         ],
     ),
+    pipeline_steps=dict(
+        runners=['inline', 'local'],
+        switches=[
+            (['--pipeline-steps'], dict(
+                action='store_true',
+                help=("Start each step's mappers as soon as the tasks in the"
+                      " previous step that feed them finish"),
+            )),
+            (['--no-pipeline-steps'], dict(
+                action='store_false',
+                help=("Wait for each step to finish before starting the next"
+                      " (the default)"),
+            )),
+        ],
+    ),
     pool_clusters=dict(
         cloud_role='launch',
         deprecated_aliases=['pool_emr_job_flows'],
@@ -22,6 +22,10 @@ However, protocols with ``Value`` in their name ignore
 keys and simply read/write values (with key read in as ``None``), allowing
 you to read and write data in arbitrary formats.
 
+Protocols may also define ``read_many()`` and ``write_many()``, which
+decode and encode many records per call; jobs use these when they're
+available. Most of the built-in protocols have them.
+
 For more information, see :ref:`job-protocols` and :ref:`writing-protocols`.
 """
 # This is one of the few places where efficiency really matters; to that end,
@@ -31,6 +35,8 @@ For more information, see :ref:`job-protocols` and :ref:`writing-protocols`.
 # don't add imports here that aren't part of the standard Python library,
 # since MRJobs need to run in Amazon's generic EMR environment
 import json
+import re
+import struct
 
 try:
     import cPickle as pickle  # Python 2 only
@@ -38,9 +44,17 @@ except ImportError:
     import pickle
 
 from mrjob.py2 import PY2
+from mrjob.py2 import integer_types
 from mrjob.util import safeeval
 
 
+try:
+    import msgpack
+    msgpack  # quiet "redefinition of unused ..." warning from pyflakes
+except ImportError:
+    msgpack = None
+
+
 try:
     import simplejson
     simplejson  # quiet "redefinition of unused ..." warning from pyflakes
@@ -54,9 +68,118 @@ except ImportError:
     ujson = None
 
 
+def _join_lines(lines):
+    """Join encoded lines (bytes) into a single bytestring, following
+    each one with a newline, as ``write_many()`` should."""
+    if not lines:
+        return b''
+
+    return b'\n'.join(lines) + b'\n'
+
+
+# escape sequences for binary data, so it doesn't contain tabs or newlines
+# (see _escape() and _unescape())
+_ESCAPES = [
+    (b'\\', b'\\\\'),
+    (b'\t', b'\\t'),
+    (b'\n', b'\\n'),
+    (b'\r', b'\\r'),
+]
+
+_UNESCAPES = dict((escaped[1:], raw) for raw, escaped in _ESCAPES)
+
+_ESCAPE_SEQUENCE_RE = re.compile(b'\\\\(.)', re.DOTALL)
+
+
+def _escape(data):
+    """Backslash-escape tabs, newlines, carriage returns, and backslashes
+    in *data* (bytes), so that it can be part of a line of Hadoop Streaming
+    input or output."""
+    for raw, escaped in _ESCAPES:
+        if raw in data:
+            data = data.replace(raw, escaped)
+    return data
+
+
+def _unescape(data):
+    """Reverse :py:func:`_escape`."""
+    if b'\\' not in data:
+        return data
+
+    return _ESCAPE_SEQUENCE_RE.sub(
+        lambda m: _UNESCAPES[m.group(1)], data)
+
+
+def _decode_lines(lines):
+    """UTF-8 decode *lines* (bytes) all at once, returning a list of
+    unicode strings, or ``None`` if that doesn't work (in which case,
+    decode them one by one)."""
+    if not lines:
+        return []
+
+    try:
+        text_lines = b'\n'.join(lines).decode('utf_8').split(u'\n')
+    except UnicodeDecodeError:
+        return None
+
+    # lines shouldn't have newlines in them, but check
+    if len(text_lines) != len(lines):
+        return None
+
+    return text_lines
+
+
+# returned by dict.get() when a key is missing
+_MISSING = object()
+
+
+class _DecodeCache(object):
+    """Bounded cache of decoded keys and values, keyed on their encoding.
+
+    Entries are kept in two generations of up to *size* / 2 entries each;
+    once the newer generation fills up, the older one is thrown away. This
+    approximates a least-recently-used cache without doing any bookkeeping
+    on hits.
+
+    *hits* and *misses* count lookups.
+    """
+    def __init__(self, loads, size):
+        self._loads = loads
+        self._generation_size = max(size // 2, 1)
+        self._new = {}
+        self._old = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def loads(self, data):
+        """Decode *data*, or return the cached result of doing so."""
+        value = self._new.get(data, _MISSING)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+
+        value = self._old.get(data, _MISSING)
+        if value is _MISSING:
+            value = self._loads(data)
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        if len(self._new) >= self._generation_size:
+            self._old = self._new
+            self._new = {}
+        self._new[data] = value
+
+        return value
+
+
 class _KeyCachingProtocol(object):
     """Protocol that caches the last decoded key.
 
+    If *decode_cache_size* is set, also keep a cache of up to that many
+    decoded keys and values (see :py:meth:`decode_cache_stats`).
+
     We're not currently exposing this class; inheriting from this class
     will result in almost as much code as simply writing your own read/write
     methods. You should probably cache keys, but in a way that makes sense for
@@ -65,6 +188,23 @@ class _KeyCachingProtocol(object):
     _last_key_encoded = None
     _last_key_decoded = None
 
+    _decode_cache = None
+
+    def __init__(self, decode_cache_size=0):
+        if decode_cache_size:
+            self._decode_cache = _DecodeCache(self._loads, decode_cache_size)
+            # read() and read_many() will now go through the cache
+            self._loads = self._decode_cache.loads
+
+    def decode_cache_stats(self):
+        """Return a dictionary with the number of ``hits`` and ``misses``
+        in this protocol's decode cache (empty if it has none)."""
+        if self._decode_cache is None:
+            return {}
+
+        return dict(hits=self._decode_cache.hits,
+                    misses=self._decode_cache.misses)
+
     def _loads(self, value):
         """Decode a single key/value, and return it."""
         raise NotImplementedError
@@ -88,6 +228,52 @@ class _KeyCachingProtocol(object):
             self._last_key_decoded = self._loads(raw_key)
         return (self._last_key_decoded, self._loads(raw_value))
 
+    def read_many(self, lines):
+        """Decode many lines of input at once.
+
+        :type lines: list of str
+        :param lines: Lines of raw input to the job, without trailing
+                      newlines.
+
+        :return: A list of ``(key, value)`` tuples."""
+        loads = self._loads
+        last_key_encoded = self._last_key_encoded
+        last_key_decoded = self._last_key_decoded
+
+        pairs = []
+        try:
+            for line in lines:
+                raw_key, raw_value = line.split(b'\t', 1)
+
+                if raw_key != last_key_encoded:
+                    last_key_encoded = raw_key
+                    last_key_decoded = loads(raw_key)
+                pairs.append((last_key_decoded, loads(raw_value)))
+        finally:
+            self._last_key_encoded = last_key_encoded
+            self._last_key_decoded = last_key_decoded
+
+        return pairs
+
+    def read_key(self, line):
+        """Decode only the key in a line of input.
+
+        :type line: str
+        :param line: A line of raw input to the job, without trailing newline.
+
+        :return: A tuple of ``(key, raw_value)``, where *raw_value* can
+                 be decoded with :py:meth:`read_value`."""
+        raw_key, raw_value = line.split(b'\t', 1)
+
+        if raw_key != self._last_key_encoded:
+            self._last_key_encoded = raw_key
+            self._last_key_decoded = self._loads(raw_key)
+        return (self._last_key_decoded, raw_value)
+
+    def read_value(self, raw_value):
+        """Decode a raw value returned by :py:meth:`read_key`."""
+        return self._loads(raw_value)
+
     def write(self, key, value):
         """Encode a key and value.
 
@@ -98,6 +284,17 @@ class _KeyCachingProtocol(object):
         :return: A line, without trailing newline."""
         return self._dumps(key) + b'\t' + self._dumps(value)
 
+    def write_many(self, pairs):
+        """Encode many keys and values at once.
+
+        :param pairs: A list of ``(key, value)`` tuples
+
+        :rtype: str
+        :return: Lines, each followed by a newline."""
+        dumps = self._dumps
+        return _join_lines(
+            [dumps(key) + b'\t' + dumps(value) for key, value in pairs])
+
 
 # JSONProtocol (below) is just an alias, but we treat it as a class for the
 # purpose of documentation. It encodes key and value as two JSONs separated
@@ -301,6 +498,604 @@ class PickleValueProtocol(object):
                 'latin_1').encode('unicode_escape')
 
 
+# MessagePack (see http://msgpack.org/) is a compact binary format with
+# length-prefixed strings and containers. We use the msgpack library if
+# it's installed, and otherwise fall back to the pure-Python encoder and
+# decoder below, which handle the same types (and produce the same bytes).
+
+_TEXT_TYPE = type(u'')
+
+_BYTE_VALUES = [struct.pack('>B', i) for i in range(256)]
+
+
+def _msgpack_dumps_pure(value):
+    """Encode *value* in MessagePack format, in pure Python."""
+    parts = []
+    _msgpack_pack(value, parts)
+    return b''.join(parts)
+
+
+def _msgpack_pack(value, parts):
+    """Helper for :py:func:`_msgpack_dumps_pure`. Appends encoded
+    data to *parts*."""
+    if value is None:
+        parts.append(b'\xc0')
+    elif value is True:
+        parts.append(b'\xc3')
+    elif value is False:
+        parts.append(b'\xc2')
+    elif isinstance(value, integer_types):
+        if 0 <= value < 0x80:
+            parts.append(_BYTE_VALUES[value])
+        elif -0x20 <= value < 0:
+            parts.append(_BYTE_VALUES[value & 0xff])
+        elif 0 <= value:
+            if value <= 0xff:
+                parts.append(b'\xcc' + struct.pack('>B', value))
+            elif value <= 0xffff:
+                parts.append(b'\xcd' + struct.pack('>H', value))
+            elif value <= 0xffffffff:
+                parts.append(b'\xce' + struct.pack('>I', value))
+            else:
+                parts.append(b'\xcf' + struct.pack('>Q', value))
+        else:
+            if value >= -0x80:
+                parts.append(b'\xd0' + struct.pack('>b', value))
+            elif value >= -0x8000:
+                parts.append(b'\xd1' + struct.pack('>h', value))
+            elif value >= -0x80000000:
+                parts.append(b'\xd2' + struct.pack('>i', value))
+            else:
+                parts.append(b'\xd3' + struct.pack('>q', value))
+    elif isinstance(value, float):
+        parts.append(b'\xcb' + struct.pack('>d', value))
+    elif isinstance(value, _TEXT_TYPE):
+        data = value.encode('utf_8')
+        n = len(data)
+        if n < 0x20:
+            parts.append(_BYTE_VALUES[0xa0 | n])
+        elif n <= 0xff:
+            parts.append(b'\xd9' + struct.pack('>B', n))
+        elif n <= 0xffff:
+            parts.append(b'\xda' + struct.pack('>H', n))
+        else:
+            parts.append(b'\xdb' + struct.pack('>I', n))
+        parts.append(data)
+    elif isinstance(value, bytes):
+        n = len(value)
+        if n <= 0xff:
+            parts.append(b'\xc4' + struct.pack('>B', n))
+        elif n <= 0xffff:
+            parts.append(b'\xc5' + struct.pack('>H', n))
+        else:
+            parts.append(b'\xc6' + struct.pack('>I', n))
+        parts.append(value)
+    elif isinstance(value, (list, tuple)):
+        n = len(value)
+        if n < 0x10:
+            parts.append(_BYTE_VALUES[0x90 | n])
+        elif n <= 0xffff:
+            parts.append(b'\xdc' + struct.pack('>H', n))
+        else:
+            parts.append(b'\xdd' + struct.pack('>I', n))
+        for item in value:
+            _msgpack_pack(item, parts)
+    elif isinstance(value, dict):
+        n = len(value)
+        if n < 0x10:
+            parts.append(_BYTE_VALUES[0x80 | n])
+        elif n <= 0xffff:
+            parts.append(b'\xde' + struct.pack('>H', n))
+        else:
+            parts.append(b'\xdf' + struct.pack('>I', n))
+        for k, v in value.items():
+            _msgpack_pack(k, parts)
+            _msgpack_pack(v, parts)
+    else:
+        raise TypeError("can't encode %r in MessagePack format" % (value,))
+
+
+# format and size of the length (or value) that follows each type code
+_MSGPACK_STRUCTS = {
+    0xc4: struct.Struct('>B'), 0xc5: struct.Struct('>H'),
+    0xc6: struct.Struct('>I'),
+    0xca: struct.Struct('>f'), 0xcb: struct.Struct('>d'),
+    0xcc: struct.Struct('>B'), 0xcd: struct.Struct('>H'),
+    0xce: struct.Struct('>I'), 0xcf: struct.Struct('>Q'),
+    0xd0: struct.Struct('>b'), 0xd1: struct.Struct('>h'),
+    0xd2: struct.Struct('>i'), 0xd3: struct.Struct('>q'),
+    0xd9: struct.Struct('>B'), 0xda: struct.Struct('>H'),
+    0xdb: struct.Struct('>I'),
+    0xdc: struct.Struct('>H'), 0xdd: struct.Struct('>I'),
+    0xde: struct.Struct('>H'), 0xdf: struct.Struct('>I'),
+}
+
+
+def _msgpack_loads_pure(data):
+    """Decode a single value in MessagePack format, in pure Python."""
+    buf = bytearray(data)
+    value, pos = _msgpack_unpack(buf, 0)
+    if pos != len(buf):
+        raise ValueError('extra data after MessagePack value')
+    return value
+
+
+def _msgpack_unpack(buf, pos):
+    """Helper for :py:func:`_msgpack_loads_pure`. Decode the value at
+    *pos* in *buf* (a :py:class:`bytearray`), and return
+    ``(value, end_pos)``."""
+    code = buf[pos]
+    pos += 1
+
+    # fixed-size types
+    if code < 0x80:
+        return code, pos
+    elif code >= 0xe0:
+        return code - 0x100, pos
+    elif code == 0xc0:
+        return None, pos
+    elif code == 0xc2:
+        return False, pos
+    elif code == 0xc3:
+        return True, pos
+
+    # types that have their length in the type code
+    if 0xa0 <= code <= 0xbf:
+        n = code & 0x1f
+        return bytes(buf[pos:pos + n]).decode('utf_8'), pos + n
+    elif 0x90 <= code <= 0x9f:
+        return _msgpack_unpack_array(buf, pos, code & 0x0f)
+    elif 0x80 <= code <= 0x8f:
+        return _msgpack_unpack_map(buf, pos, code & 0x0f)
+
+    # types followed by a length or value
+    s = _MSGPACK_STRUCTS.get(code)
+    if s is None:
+        raise ValueError('unknown MessagePack type code: 0x%02x' % code)
+
+    n = s.unpack_from(buf, pos)[0]
+    pos += s.size
+
+    if code <= 0xc6:
+        if pos + n > len(buf):
+            raise ValueError('truncated MessagePack data')
+        return bytes(buf[pos:pos + n]), pos + n
+    elif code <= 0xd3:
+        # number
+        return n, pos
+    elif code <= 0xdb:
+        if pos + n > len(buf):
+            raise ValueError('truncated MessagePack data')
+        return bytes(buf[pos:pos + n]).decode('utf_8'), pos + n
+    elif code <= 0xdd:
+        return _msgpack_unpack_array(buf, pos, n)
+    else:
+        return _msgpack_unpack_map(buf, pos, n)
+
+
+def _msgpack_unpack_array(buf, pos, n):
+    items = []
+    for _ in range(n):
+        item, pos = _msgpack_unpack(buf, pos)
+        items.append(item)
+    return items, pos
+
+
+def _msgpack_unpack_map(buf, pos, n):
+    d = {}
+    for _ in range(n):
+        k, pos = _msgpack_unpack(buf, pos)
+        v, pos = _msgpack_unpack(buf, pos)
+        d[k] = v
+    return d, pos
+
+
+if msgpack:
+    # decode strings as unicode, and (in msgpack 1.0+) allow map keys
+    # that aren't strings, like our pure-Python decoder does
+    if msgpack.version >= (1, 0):
+        _MSGPACK_UNPACKB_KWARGS = dict(raw=False, strict_map_key=False)
+    else:
+        _MSGPACK_UNPACKB_KWARGS = dict(raw=False)
+
+    def _msgpack_dumps(value):
+        return msgpack.packb(value, use_bin_type=True)
+
+    def _msgpack_loads(data):
+        return msgpack.unpackb(data, **_MSGPACK_UNPACKB_KWARGS)
+else:
+    _msgpack_dumps = _msgpack_dumps_pure
+    _msgpack_loads = _msgpack_loads_pure
+
+
+class MsgpackProtocol(_KeyCachingProtocol):
+    """Encode ``(key, value)`` in `MessagePack <http://msgpack.org/>`_
+    format, separated by a tab.
+
+    This is a compact binary format, good for communicating between steps
+    (as your job's :py:attr:`~mrjob.job.MRJob.INTERNAL_PROTOCOL`). It
+    handles the same types as JSON, plus bytes, and numbers don't have to be
+    converted to and from strings. Unlike JSON, dictionary keys need not be
+    strings (though they must be hashable once decoded).
+
+    Tabs, newlines, carriage returns and backslashes in the encoded data
+    are backslash-escaped, to keep Hadoop Streaming happy. This is a
+    deliberate limitation: Hadoop Streaming only frames data as lines or
+    typed bytes, not MessagePack, so each of those bytes (e.g. the integers
+    9, 10, 13, and 92) takes two bytes. At worst, this doubles the size of
+    the encoded data (making it about as big as compact JSON); for typical
+    data, the overhead is small, and the encoding is still smaller than
+    :py:class:`JSONProtocol`'s. If you need binary data to go through the
+    shuffle unescaped, use :py:class:`TypedBytesProtocol`.
+
+    Uses the :py:mod:`msgpack` library if it's installed, and a (slower)
+    pure-Python implementation otherwise; both produce the same encoding.
+
+    .. versionadded:: 0.5.8
+    """
+    def _loads(self, value):
+        # encoded data never contains tabs, so any tabs were added by Hadoop
+        return _msgpack_loads(_unescape(value.rstrip(b'\t')))
+
+    def _dumps(self, value):
+        return _escape(_msgpack_dumps(value))
+
+
+class MsgpackValueProtocol(object):
+    """Encode ``value`` in MessagePack format and discard ``key`` (``key``
+    is read in as ``None``).
+
+    See :py:class:`MsgpackProtocol` for details.
+
+    .. versionadded:: 0.5.8
+    """
+    def read(self, line):
+        return (None, _msgpack_loads(_unescape(line.rstrip(b'\t'))))
+
+    def write(self, key, value):
+        return _escape(_msgpack_dumps(value))
+
+
+# Typed bytes (see the org.apache.hadoop.typedbytes package) is the binary
+# format Hadoop Streaming speaks when stream.map.output, stream.reduce.input,
+# etc. are set to "typedbytes". Each object starts with a one-byte type code,
+# and strings and containers are length-prefixed, so records can be framed
+# without any escaping.
+
+_TYPEDBYTES_BYTES = 0
+_TYPEDBYTES_BYTE = 1
+_TYPEDBYTES_BOOL = 2
+_TYPEDBYTES_INT = 3
+_TYPEDBYTES_LONG = 4
+_TYPEDBYTES_FLOAT = 5
+_TYPEDBYTES_DOUBLE = 6
+_TYPEDBYTES_STRING = 7
+_TYPEDBYTES_VECTOR = 8
+_TYPEDBYTES_LIST = 9
+_TYPEDBYTES_MAP = 10
+_TYPEDBYTES_MARKER = 255
+
+# type codes 50-200 are application-specific; they're followed by a length
+# and that many bytes
+_TYPEDBYTES_MIN_APP_CODE = 50
+_TYPEDBYTES_MAX_APP_CODE = 200
+
+_TYPEDBYTES_LENGTH_STRUCT = struct.Struct('>i')
+
+# format of the value that follows each fixed-size type code
+_TYPEDBYTES_STRUCTS = {
+    _TYPEDBYTES_BYTE: struct.Struct('>b'),
+    _TYPEDBYTES_BOOL: struct.Struct('>?'),
+    _TYPEDBYTES_INT: struct.Struct('>i'),
+    _TYPEDBYTES_LONG: struct.Struct('>q'),
+    _TYPEDBYTES_FLOAT: struct.Struct('>f'),
+    _TYPEDBYTES_DOUBLE: struct.Struct('>d'),
+}
+
+
+def _typedbytes_dumps(value):
+    """Encode *value* as a single typed bytes object."""
+    parts = []
+    _typedbytes_pack(value, parts)
+    return b''.join(parts)
+
+
+def _typedbytes_pack(value, parts):
+    """Helper for :py:func:`_typedbytes_dumps`. Appends encoded
+    data to *parts*."""
+    if value is True:
+        parts.append(b'\x02\x01')
+    elif value is False:
+        parts.append(b'\x02\x00')
+    elif isinstance(value, integer_types):
+        if -0x80000000 <= value < 0x80000000:
+            parts.append(b'\x03' + struct.pack('>i', value))
+        elif -0x8000000000000000 <= value < 0x8000000000000000:
+            parts.append(b'\x04' + struct.pack('>q', value))
+        else:
+            raise ValueError('%r is too big for typed bytes' % (value,))
+    elif isinstance(value, float):
+        parts.append(b'\x06' + struct.pack('>d', value))
+    elif isinstance(value, _TEXT_TYPE):
+        data = value.encode('utf_8')
+        parts.append(b'\x07' + struct.pack('>i', len(data)))
+        parts.append(data)
+    elif isinstance(value, bytes):
+        parts.append(b'\x00' + struct.pack('>i', len(value)))
+        parts.append(value)
+    elif isinstance(value, (list, tuple)):
+        parts.append(b'\x08' + struct.pack('>i', len(value)))
+        for item in value:
+            _typedbytes_pack(item, parts)
+    elif isinstance(value, dict):
+        parts.append(b'\x0a' + struct.pack('>i', len(value)))
+        for k, v in value.items():
+            _typedbytes_pack(k, parts)
+            _typedbytes_pack(v, parts)
+    else:
+        # notably, typed bytes has no null type
+        raise TypeError("can't encode %r as typed bytes" % (value,))
+
+
+def _typedbytes_loads(data):
+    """Decode a single typed bytes object."""
+    buf = bytearray(data)
+    value, pos = _typedbytes_unpack(buf, 0)
+    if pos != len(buf):
+        raise ValueError('extra data after typed bytes object')
+    return value
+
+
+def _typedbytes_unpack(buf, pos):
+    """Helper for :py:func:`_typedbytes_loads`. Decode the object at
+    *pos* in *buf* (a :py:class:`bytearray`), and return
+    ``(value, end_pos)``."""
+    code = buf[pos]
+    pos += 1
+
+    s = _TYPEDBYTES_STRUCTS.get(code)
+    if s is not None:
+        return s.unpack_from(buf, pos)[0], pos + s.size
+
+    if code == _TYPEDBYTES_LIST:
+        items = []
+        while buf[pos] != _TYPEDBYTES_MARKER:
+            item, pos = _typedbytes_unpack(buf, pos)
+            items.append(item)
+        return items, pos + 1
+
+    n = _TYPEDBYTES_LENGTH_STRUCT.unpack_from(buf, pos)[0]
+    pos += _TYPEDBYTES_LENGTH_STRUCT.size
+
+    if code == _TYPEDBYTES_VECTOR:
+        items = []
+        for _ in range(n):
+            item, pos = _typedbytes_unpack(buf, pos)
+            items.append(item)
+        return items, pos
+    elif code == _TYPEDBYTES_MAP:
+        d = {}
+        for _ in range(n):
+            k, pos = _typedbytes_unpack(buf, pos)
+            v, pos = _typedbytes_unpack(buf, pos)
+            d[k] = v
+        return d, pos
+
+    if pos + n > len(buf):
+        raise ValueError('truncated typed bytes data')
+
+    if code == _TYPEDBYTES_STRING:
+        return bytes(buf[pos:pos + n]).decode('utf_8'), pos + n
+    elif (code == _TYPEDBYTES_BYTES or
+          _TYPEDBYTES_MIN_APP_CODE <= code <= _TYPEDBYTES_MAX_APP_CODE):
+        return bytes(buf[pos:pos + n]), pos + n
+    else:
+        raise ValueError('unknown typed bytes type code: %d' % code)
+
+
+def _typedbytes_skip(buf, pos):
+    """Return the position just after the typed bytes object at *pos*
+    in *buf* (a :py:class:`bytearray`), without decoding it.
+
+    If *buf* is cut off partway through the object, this either raises
+    :py:class:`IndexError` or :py:class:`struct.error`, or returns a
+    position past the end of *buf*."""
+    code = buf[pos]
+    pos += 1
+
+    s = _TYPEDBYTES_STRUCTS.get(code)
+    if s is not None:
+        return pos + s.size
+
+    if code == _TYPEDBYTES_LIST:
+        while buf[pos] != _TYPEDBYTES_MARKER:
+            pos = _typedbytes_skip(buf, pos)
+        return pos + 1
+
+    n = _TYPEDBYTES_LENGTH_STRUCT.unpack_from(buf, pos)[0]
+    pos += _TYPEDBYTES_LENGTH_STRUCT.size
+
+    if code == _TYPEDBYTES_VECTOR:
+        for _ in range(n):
+            pos = _typedbytes_skip(buf, pos)
+        return pos
+    elif code == _TYPEDBYTES_MAP:
+        for _ in range(2 * n):
+            pos = _typedbytes_skip(buf, pos)
+        return pos
+    elif (code in (_TYPEDBYTES_BYTES, _TYPEDBYTES_STRING) or
+          _TYPEDBYTES_MIN_APP_CODE <= code <= _TYPEDBYTES_MAX_APP_CODE):
+        return pos + n
+    else:
+        raise ValueError('unknown typed bytes type code: %d' % code)
+
+
+def _pop_typedbytes_records(buf):
+    """Remove all complete ``(key, value)`` records from the start of *buf*
+    (a :py:class:`bytearray`), and return them as a list of pairs of
+    encoded objects (bytes)."""
+    records = []
+    pos = 0
+
+    while pos < len(buf):
+        try:
+            middle = _typedbytes_skip(buf, pos)
+            end = _typedbytes_skip(buf, middle)
+        except (IndexError, struct.error):
+            break
+
+        if end > len(buf):
+            break
+
+        records.append((bytes(buf[pos:middle]), bytes(buf[middle:end])))
+        pos = end
+
+    del buf[:pos]
+    return records
+
+
+def _read_typedbytes_records(chunks):
+    """Read ``(key, value)`` records in typed bytes format from *chunks*
+    (an iterable of bytes, split anywhere), yielding each as a pair of
+    encoded objects (bytes)."""
+    buf = bytearray()
+    # don't re-scan a partial record until we've at least doubled the
+    # buffer; otherwise large records would take quadratic time
+    wanted = 0
+
+    for chunk in chunks:
+        buf.extend(chunk)
+        if len(buf) >= wanted:
+            for record in _pop_typedbytes_records(buf):
+                yield record
+            wanted = 2 * len(buf)
+
+    for record in _pop_typedbytes_records(buf):
+        yield record
+
+    if buf:
+        raise ValueError('truncated typed bytes record')
+
+
+def _typedbytes_record_to_line(key, value):
+    """Convert a typed bytes record to a line that
+    :py:class:`TypedBytesProtocol` can read."""
+    return _escape(key) + b'\t' + _escape(value)
+
+
+def _typedbytes_line_to_record(line):
+    """Convert a line written by :py:class:`TypedBytesProtocol` (or
+    :py:class:`TypedBytesValueProtocol`) back to a typed bytes record."""
+    key, tab, value = line.partition(b'\t')
+    if not tab:
+        raise ValueError('line is not a typed bytes record: %r' % (line,))
+
+    return _unescape(key) + _unescape(value)
+
+
+class _TypedBytesToLinesWriter(object):
+    """File-like object that converts the typed bytes records written to
+    it (split anywhere) to lines (see :py:func:`_typedbytes_record_to_line`),
+    and writes them to *fileobj*. Call :py:meth:`close` when done."""
+
+    def __init__(self, fileobj):
+        self._fileobj = fileobj
+        self._buf = bytearray()
+        # see _read_typedbytes_records()
+        self._wanted = 0
+        self.closed = False
+
+    def write(self, data):
+        self._buf.extend(data)
+        if len(self._buf) >= self._wanted:
+            self._write_records()
+            self._wanted = 2 * len(self._buf)
+
+    def flush(self):
+        self._fileobj.flush()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+
+        self._write_records()
+        if self._buf:
+            raise ValueError('truncated typed bytes record')
+
+    def _write_records(self):
+        records = _pop_typedbytes_records(self._buf)
+        if records:
+            self._fileobj.write(b''.join(
+                _typedbytes_record_to_line(key, value) + b'\n'
+                for key, value in records))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+
+
+# typed bytes records need a key, even if our protocol ignores it
+_TYPEDBYTES_EMPTY_KEY = _typedbytes_dumps(b'')
+
+
+class TypedBytesProtocol(_KeyCachingProtocol):
+    """Encode ``(key, value)`` as Hadoop typed bytes (see the
+    ``org.apache.hadoop.typedbytes`` package), separated by a tab.
+
+    This is a compact binary format, good for communicating between steps
+    (as your job's :py:attr:`~mrjob.job.MRJob.INTERNAL_PROTOCOL`). It
+    handles bytes, strings, booleans, numbers (integers must fit in 64
+    bits), lists, and dictionaries. It *can't* encode ``None``.
+
+    When a step's mapper writes and its reducer reads this protocol, mrjob
+    tells Hadoop Streaming to pass data between them as typed bytes (with
+    ``-D stream.map.output=typedbytes -D stream.reduce.input=typedbytes``),
+    so binary data goes through the shuffle without any escaping. Steps with
+    combiners or reducer pre-filters, and steps that sort by value (see
+    :py:attr:`~mrjob.job.MRJob.SORT_VALUES`), are still run in text mode.
+
+    Otherwise, tabs, newlines, carriage returns and backslashes in the
+    encoded data are backslash-escaped, to keep Hadoop Streaming happy.
+
+    The inline and local runners set the same jobconf, but convert typed
+    bytes records to escaped lines to sort them, and back again for the
+    reducer.
+
+    .. versionadded:: 0.5.8
+    """
+    def _loads(self, value):
+        # encoded data never contains tabs, so any tabs were added by Hadoop
+        return _typedbytes_loads(_unescape(value.rstrip(b'\t')))
+
+    def _dumps(self, value):
+        return _escape(_typedbytes_dumps(value))
+
+
+class TypedBytesValueProtocol(object):
+    """Encode ``value`` as typed bytes and discard ``key`` (``key``
+    is read in as ``None``).
+
+    Since Hadoop Streaming needs a key for each typed bytes record, this
+    writes an empty bytestring as the key.
+
+    See :py:class:`TypedBytesProtocol` for details.
+
+    .. versionadded:: 0.5.8
+    """
+    def read(self, line):
+        # skip the key, if there is one
+        value = line.split(b'\t', 1)[-1].rstrip(b'\t')
+        return (None, _typedbytes_loads(_unescape(value)))
+
+    def write(self, key, value):
+        return (_TYPEDBYTES_EMPTY_KEY + b'\t' +
+                _escape(_typedbytes_dumps(value)))
+
+
 # RawValueProtocol (below) is just an alias, but we treat it as a class for the
 # purpose of documentation. All it does is output the value (key is read as
 # ``None``).
@@ -326,9 +1121,15 @@ class BytesProtocol(object):
 
         return tuple(key_value)
 
+    def read_many(self, lines):
+        return [self.read(line) for line in lines]
+
     def write(self, key, value):
         return b'\t'.join(x for x in (key, value) if x is not None)
 
+    def write_many(self, pairs):
+        return _join_lines([self.write(k, v) for k, v in pairs])
+
 
 class BytesValueProtocol(object):
     """Read line (without trailing newline) directly into ``value`` (``key``
@@ -347,9 +1148,15 @@ class BytesValueProtocol(object):
     def read(self, line):
         return (None, line)
 
+    def read_many(self, lines):
+        return [(None, line) for line in lines]
+
     def write(self, key, value):
         return value
 
+    def write_many(self, pairs):
+        return _join_lines([value for key, value in pairs])
+
 
 class TextProtocol(object):
     """UTF-8 encode ``key`` and ``value`` (unicode strings) and join them
@@ -376,10 +1183,28 @@ class TextProtocol(object):
 
         return tuple(key_value)
 
+    def read_many(self, lines):
+        text_lines = _decode_lines(lines)
+        if text_lines is None:
+            return [self.read(line) for line in lines]
+
+        pairs = []
+        for line in text_lines:
+            key_value = line.split(u'\t', 1)
+            if len(key_value) == 1:
+                pairs.append((line, None))
+            else:
+                pairs.append(tuple(key_value))
+
+        return pairs
+
     def write(self, key, value):
         return b'\t'.join(
             x.encode('utf_8') for x in (key, value) if x is not None)
 
+    def write_many(self, pairs):
+        return _join_lines([self.write(k, v) for k, v in pairs])
+
 
 class TextValueProtocol(object):
     """Attempt to UTF-8 decode line (without trailing newline) into ``value``,
@@ -408,9 +1233,24 @@ class TextValueProtocol(object):
         except UnicodeDecodeError:
             return (None, line.decode('latin_1'))
 
+    def read_many(self, lines):
+        text_lines = _decode_lines(lines)
+        if text_lines is None:
+            return [self.read(line) for line in lines]
+
+        return [(None, line) for line in text_lines]
+
     def write(self, key, value):
         return value.encode('utf_8')
 
+    def write_many(self, pairs):
+        # encode all the values at once
+        values = [value for key, value in pairs]
+        if not values:
+            return b''
+
+        return (u'\n'.join(values) + u'\n').encode('utf_8')
+
 
 # RawValueProtocol is the default way of reading input. Historically
 # (in Python 2), it's always read raw bytes, but Python 3 is pickier about
@@ -409,7 +409,8 @@ class MRJobRunner(object):
         self._steps = None
 
         # if this is True, we have to pipe input into the sort command
-        # rather than feed it multiple files
+        # rather than feed it multiple files (only used by the deprecated
+        # _invoke_sort() method)
         self._sort_is_windows_sort = None
 
         # this variable marks whether a cleanup has happened and this runner's
@@ -428,7 +429,8 @@ class MRJobRunner(object):
         if self._fs is None:
             # wrap LocalFilesystem in CompositeFilesystem to get IOError
             # on URIs (see #1185)
-            self._fs = CompositeFilesystem(LocalFilesystem())
+            self._fs = CompositeFilesystem(
+                LocalFilesystem(), cache_secs=self._opts['fs_cache_secs'])
         return self._fs
 
     def __getattr__(self, name):
@@ -505,12 +507,16 @@ class MRJobRunner(object):
 
                 path = base
 
-        # TODO - mtai @ davidmarin - why aren't we using self.fs.cat ?
+        # skip files like _SUCCESS and _logs/
+        paths = []
         for filename in self.fs.ls(output_dir):
             subpath = filename[len(output_dir):]
             if not any(name.startswith('_') for name in split_path(subpath)):
-                for line in self.fs._cat_file(filename):
-                    yield line
+                paths.append(filename)
+
+        # read all the files at once, so the filesystem can read ahead
+        for line in self.fs._cat_files(paths):
+            yield line
 
     def _cleanup_mode(self, mode=None):
         """Actual cleanup action to take based on various options"""
@@ -1307,7 +1313,8 @@ class MRJobRunner(object):
             args.extend(['-libjars', ','.join(libjar_paths)])
 
         # jobconf (-D)
-        jobconf = self._jobconf_for_step(step_num)
+        jobconf = combine_dicts(self._shuffle_io_jobconf_for_step(step_num),
+                                self._jobconf_for_step(step_num))
 
         for key, value in sorted(jobconf.items()):
             if value is not None:
@@ -1339,6 +1346,23 @@ class MRJobRunner(object):
 
         return jobconf
 
+    def _shuffle_io_jobconf_for_step(self, step_num):
+        """Jobconf telling Hadoop Streaming to pass data from the mapper
+        to the reducer in the format named by the step's ``shuffle_io``
+        field (e.g. ``'typedbytes'``), if any.
+
+        This isn't part of :py:meth:`_jobconf_for_step` because it isn't
+        the user's jobconf; it follows from the job's protocols.
+        """
+        shuffle_io = self._get_step(step_num).get('shuffle_io')
+        if not shuffle_io:
+            return {}
+
+        return {
+            'stream.map.output': shuffle_io,
+            'stream.reduce.input': shuffle_io,
+        }
+
     def _sort_values_jobconf(self):
         """Jobconf dictionary to enable sorting by value.
         """
@@ -1611,7 +1635,16 @@ class MRJobRunner(object):
         :param input_paths: paths of one or more input files
         :type output_path: str
         :param output_path: where to pipe sorted output into
+
+        .. deprecated:: 0.5.8
+
+           mrjob no longer uses the :command:`sort` command; the inline and
+           local runners sort in Python, so that sorting works the same
+           everywhere. Use :py:func:`mrjob.sort.sort_lines` instead.
         """
+        log.warning('_invoke_sort() is deprecated and will be removed in'
+                    ' v0.6.0. Use mrjob.sort.sort_lines() instead')
+
         if not input_paths:
             raise ValueError('Must specify at least one input path.')
 
@@ -15,15 +15,23 @@
 # limitations under the License.
 """Run an MRJob locally by forking off a bunch of processes and piping
 them together. Useful for testing."""
-import itertools
 import logging
+import math
+import multiprocessing
 import os
 import shutil
 import stat
 
+from mrjob.cat import _SPLITTABLE_EXTENSIONS
+from mrjob.cat import _compression_extension
+from mrjob.cat import can_compress
+from mrjob.cat import gzip_index_path
+from mrjob.cat import read_gzip_index
+from mrjob.cat import write_gzip_index
 from mrjob.compat import jobconf_from_dict
 from mrjob.compat import translate_jobconf
 from mrjob.compat import translate_jobconf_for_all_versions
+from mrjob.conf import combine_dicts
 from mrjob.conf import combine_local_envs
 from mrjob.logs.counters import _format_counters
 from mrjob.options import _allowed_keys
@@ -31,15 +39,35 @@ from mrjob.options import _combiners
 from mrjob.options import _deprecated_aliases
 from mrjob.runner import MRJobRunner
 from mrjob.runner import RunnerOptionStore
-from mrjob.util import read_input
 from mrjob.util import unarchive
 
 
 log = logging.getLogger(__name__)
 
+# how long to wait for a task in a pool before checking if other tasks
+# have finished, in seconds
+_TASK_POLL_INTERVAL = 0.1
+
+# the last split of a file may be up to this many times the split size,
+# rather than leaving a tiny split at the end (same as Hadoop's SPLIT_SLOP)
+_SPLIT_SLOP = 1.1
+
+# file extension to use for intermediate files for each Hadoop compression
+# codec (see mapreduce.map.output.compress.codec)
+_CODEC_TO_EXTENSION = {
+    'org.apache.hadoop.io.compress.BZip2Codec': '.bz2',
+    'org.apache.hadoop.io.compress.DefaultCodec': '.deflate',
+    'org.apache.hadoop.io.compress.GzipCodec': '.gz',
+    'org.apache.hadoop.io.compress.Lz4Codec': '.lz4',
+    'org.apache.hadoop.io.compress.ZStandardCodec': '.zst',
+}
+
+_DEFAULT_CODEC = 'org.apache.hadoop.io.compress.DefaultCodec'
+
 
 class SimRunnerOptionStore(RunnerOptionStore):
-    # these are the same for 'local' and 'inline' runners
+    # these are mostly the same for 'local' and 'inline' runners; each
+    # runner has a subclass for the options only it supports
     ALLOWED_KEYS = _allowed_keys('local')
     COMBINERS = _combiners('local')
     DEPRECATED_ALIASES = _deprecated_aliases('local')
@@ -73,6 +101,13 @@ class SimMRJobRunner(MRJobRunner):
     Your job can read these from the environment using
     :py:func:`~mrjob.compat.jobconf_from_env()`.
 
+    They also obey ``mapreduce.map.output.compress`` and
+    ``mapreduce.map.output.compress.codec``, compressing the sorted
+    partitions of mapper output that reducers read (``BZip2Codec``,
+    ``DefaultCodec``, ``GzipCodec``, and, if the :py:mod:`lz4` or
+    :py:mod:`zstandard` module is installed, ``Lz4Codec`` and
+    ``ZStandardCodec``).
+
     If you specify *hadoop_version*, we'll only simulate environment variables
     for that version of Hadoop.
     """
@@ -82,6 +117,9 @@ class SimMRJobRunner(MRJobRunner):
     _DEFAULT_MAP_TASKS = 2
     _DEFAULT_REDUCE_TASKS = 2
 
+    # default for mapreduce.task.io.sort.mb (same as Hadoop)
+    _DEFAULT_IO_SORT_MB = 100
+
     # keyword arguments that we ignore because they require real Hadoop.
     # We look directly at self._<kwarg_name> because they aren't in
     # self._opts
@@ -102,6 +140,14 @@ class SimMRJobRunner(MRJobRunner):
         self._prev_outfiles = []
         self._counters = []
 
+        # output paths of tasks that have finished, but that
+        # _run_tasks() hasn't dealt with yet
+        self._finished_tasks = []
+
+        # map from step_num to file extension for compressed mapper output
+        # (see _map_output_extension())
+        self._map_output_extensions = {}
+
     def _warn_ignored_opts(self):
         """ If the user has provided options that are not supported
         by the dev runners log warnings for each of the ignored options
@@ -175,27 +221,7 @@ class SimMRJobRunner(MRJobRunner):
         self._setup_output_dir()
 
         # run mapper, combiner, sort, reducer for each step
-        for step_num, step in enumerate(self._get_steps()):
-            log.info('Running step %d of %d...' % (
-                step_num + 1, self._num_steps()))
-
-            self._check_step_works_with_runner(step)
-            self._counters.append({})
-
-            self._invoke_step(step_num, 'mapper')
-
-            if 'reducer' in step:
-                # sort the output. Treat this as a mini-step for the purpose
-                # of self._prev_outfiles
-                sort_output_path = os.path.join(
-                    self._get_local_tmp_dir(),
-                    'step-%04d-mapper-sorted' % step_num)
-
-                self._invoke_sort(self._step_input_paths(), sort_output_path)
-                self._prev_outfiles = [sort_output_path]
-
-                # run the reducer
-                self._invoke_step(step_num, 'reducer')
+        self._run_tasks()
 
         # move final output to output directory
         for i, outfile in enumerate(self._prev_outfiles):
@@ -203,225 +229,428 @@ class SimMRJobRunner(MRJobRunner):
             log.debug('Moving %s -> %s' % (outfile, final_outfile))
             shutil.move(outfile, final_outfile)
 
-    def _invoke_step(self, step_num, step_type):
-        """Run the mapper or reducer for the given step.
+    def _run_tasks(self):
+        """Run every task in every step, starting each one as soon as its
+        input is ready.
+
+        Each step has a mapper phase and (optionally) a reducer phase. If
+        there's a reducer, each mapper sorts its output and splits it into
+        one sorted partition per reducer (see
+        :py:meth:`_mapper_partition_paths`); once every mapper in the step
+        has finished, each reducer merges its partitions.
+
+        Normally, a step's mappers start once the previous step has
+        finished, and split its output like any other input. If
+        :mrjob-opt:`pipeline_steps` is set, each task in the previous
+        step's last phase instead feeds one mapper with the same task
+        number, which starts as soon as that task finishes.
+
+        When we're done, ``self._prev_outfiles`` is the output of the
+        last step, ordered by task number.
         """
-        step = self._get_step(step_num)
+        steps = self._get_steps()
 
-        if step['type'] != 'streaming':
-            raise Exception("LocalMRJobRunner cannot run %s steps" %
-                            step['type'])
+        for step in steps:
+            if step['type'] != 'streaming':
+                raise Exception("LocalMRJobRunner cannot run %s steps" %
+                                step['type'])
 
-        jobconf = self._jobconf_for_step(step_num)
+        # (step_num, step_type) for each phase, in order
+        phases = []
+        for step_num, step in enumerate(steps):
+            phases.append((step_num, 'mapper'))
+            if 'reducer' in step:
+                phases.append((step_num, 'reducer'))
 
-        outfile_prefix = 'step-%04d-%s' % (step_num, step_type)
+        # for each phase: how many tasks it has (once we know),
+        # whether it's started, and the output path of each
+        # finished task, by task number
+        num_tasks = [None] * len(phases)
+        started = [False] * len(phases)
+        outputs = [{} for _ in phases]
 
-        # allow setting number of tasks from jobconf
-        if step_type == 'reducer':
-            num_tasks = int(jobconf_from_dict(
-                jobconf, 'mapreduce.job.reduces', self._DEFAULT_REDUCE_TASKS))
-        else:
-            num_tasks = int(jobconf_from_dict(
-                jobconf, 'mapreduce.job.maps', self._DEFAULT_MAP_TASKS))
+        # map output path of each unfinished task to (phase, task_num)
+        running = {}
 
-        # get file splits for mappers and reducers
-        keep_sorted = (step_type == 'reducer')
-        file_splits = self._get_file_splits(
-            self._step_input_paths(), num_tasks, keep_sorted=keep_sorted)
+        def is_done(phase):
+            return (num_tasks[phase] is not None and
+                    len(outputs[phase]) == num_tasks[phase])
 
-        # since we have grapped the files from the _prev_outfiles as input
-        # to this step reset _prev_outfiles
-        self._prev_outfiles = []
+        def output_paths(phase):
+            return [outputs[phase][task_num]
+                    for task_num in sorted(outputs[phase])]
+
+        def is_chained(phase):
+            # mappers after the first step can be fed by the previous
+            # phase's tasks, one to one
+            return (self._opts['pipeline_steps'] and phase > 0 and
+                    phases[phase][1] == 'mapper')
+
+        def start_phase(phase):
+            step_num, step_type = phases[phase]
+            started[phase] = True
 
-        # Start the tasks associated with the step:
-        # if we need to sort, then just sort all input files into one file
-        # otherwise, split the files needed for mappers and reducers
-        # and setup the task environment for each
-
-        # The correctly-ordered list of task_num, file_name pairs
-        file_tasks = sorted([
-            (t['task_num'], file_name) for file_name, t
-            in file_splits.items()], key=lambda t: t[0])
-
-        for task_num, input_path in file_tasks:
-            # make a new working_dir for each task
-            working_dir = os.path.join(
-                self._get_local_tmp_dir(),
-                'job_local_dir', str(step_num), step_type, str(task_num))
-            self._setup_working_dir(working_dir)
-
-            log.debug("File name %s" % input_path)
-            # setup environment variables
-            split_kwargs = {}
             if step_type == 'mapper':
-                # mappers have extra file split info
-                split_kwargs = dict(
-                    input_file=file_splits[input_path]['orig_name'],
-                    input_start=file_splits[input_path]['start'],
-                    input_length=file_splits[input_path]['length'])
+                log.info('Running step %d of %d...' % (
+                    step_num + 1, len(steps)))
+
+                self._check_step_works_with_runner(steps[step_num])
+                self._counters.append({})
+
+        def start_task(phase, task_num, input_path, split=None):
+            output_path = self._start_task(
+                phases[phase][0], phases[phase][1], task_num, input_path,
+                split)
+            running[output_path] = (phase, task_num)
+
+        def handle_finished_tasks():
+            while self._finished_tasks:
+                output_path = self._finished_tasks.pop(0)
+                phase, task_num = running.pop(output_path)
+                outputs[phase][task_num] = output_path
+
+                next_phase = phase + 1
+                if next_phase < len(phases) and is_chained(next_phase):
+                    if not started[next_phase]:
+                        start_phase(next_phase)
+                        num_tasks[next_phase] = num_tasks[phase]
+
+                    start_task(next_phase, task_num, output_path)
+
+                # log counters when each step finishes
+                step_num = phases[phase][0]
+                if is_done(phase) and (next_phase == len(phases) or
+                                       phases[next_phase][0] != step_num):
+                    self._log_counters(step_num)
+
+        for phase, (step_num, step_type) in enumerate(phases):
+            if started[phase]:
+                # chained mappers; we just have to wait for them
+                pass
+            elif step_type == 'mapper':
+                if phase == 0:
+                    input_paths = self._step_input_paths()
+                else:
+                    input_paths = output_paths(phase - 1)
 
-            env = self._subprocess_env(
-                step_num, step_type, task_num, working_dir, **split_kwargs)
+                start_phase(phase)
 
-            output_path = os.path.join(
-                self._get_local_tmp_dir(),
-                outfile_prefix + '_part-%05d' % task_num)
-            log.debug('Writing to %s' % output_path)
+                jobconf = self._jobconf_for_step(step_num)
+                splits = self._get_file_splits(input_paths, int(
+                    jobconf_from_dict(jobconf, 'mapreduce.job.maps',
+                                      self._DEFAULT_MAP_TASKS)))
 
-            self._run_step(step_num, step_type, input_path, output_path,
-                           working_dir, env)
+                num_tasks[phase] = len(splits)
 
-            self._prev_outfiles.append(output_path)
+                for split in splits:
+                    start_task(phase, split['task_num'], split['path'],
+                               split)
+                    handle_finished_tasks()
+            else:
+                # each reducer merges its partition from every mapper
+                start_phase(phase)
+
+                num_tasks[phase] = self._num_reducers(step_num)
+
+                partition_paths = [
+                    self._mapper_partition_paths(step_num, path)
+                    for path in output_paths(phase - 1)]
+
+                for task_num in range(num_tasks[phase]):
+                    start_task(phase, task_num,
+                               [paths[task_num] for paths in partition_paths])
+                    handle_finished_tasks()
+
+            # wait for this phase to finish; if the next phase is chained,
+            # that means starting its tasks as this phase's tasks finish
+            while not is_done(phase):
+                handle_finished_tasks()
+                if not is_done(phase):
+                    self._wait_for_any_task()
+
+        self._prev_outfiles = output_paths(len(phases) - 1)
+
+    def _start_task(self, step_num, step_type, task_num, input_path,
+                    split=None):
+        """Set up a working dir and environment for the given task, and
+        start it (see :py:meth:`_run_step`). *split* is the task's input
+        split, if it's a mapper that reads part of a file (see
+        :py:meth:`_get_file_splits`). For reducers, *input_path* is a list
+        of sorted partitions to merge.
+
+        Returns the path the task writes its output to.
+        """
+        # make a new working_dir for each task
+        working_dir = os.path.join(
+            self._get_local_tmp_dir(),
+            'job_local_dir', str(step_num), step_type, str(task_num))
+        self._setup_working_dir(working_dir)
+
+        log.debug("File name %s" % input_path)
+        # setup environment variables
+        split_kwargs = {}
+        run_kwargs = {}
+        if step_type == 'mapper':
+            # mappers have extra file split info
+            size = os.stat(input_path)[stat.ST_SIZE]
+            if split is None:
+                split = dict(path=input_path, start=0, length=size)
+
+            split_kwargs = dict(
+                input_file=split['path'],
+                input_start=split['start'],
+                input_length=split['length'])
+
+            # only read part of the file if we need to
+            if split['start'] or split['length'] < size:
+                run_kwargs = dict(
+                    input_start=split['start'],
+                    input_length=split['length'])
+
+        env = self._subprocess_env(
+            step_num, step_type, task_num, working_dir, **split_kwargs)
+
+        output_path = os.path.join(
+            self._get_local_tmp_dir(),
+            'step-%04d-%s_part-%05d' % (step_num, step_type, task_num))
+        log.debug('Writing to %s' % output_path)
 
-        self._per_step_runner_finish(step_num)
+        self._run_step(step_num, step_type, input_path, output_path,
+                       working_dir, env, **run_kwargs)
+
+        return output_path
+
+    def _log_counters(self, step_num):
         counters = self._counters[step_num]
         if counters:
             log.info(_format_counters(counters))
 
     def _run_step(self, step_num, step_type, input_path, output_path,
-                  working_dir, env):
+                  working_dir, env, input_start=None, input_length=None):
         """ Runner specific per step method
         Inline and local runners override this method
+
+        This may run the task to completion, or just start it. Either way,
+        once the task is done, add *output_path* to
+        ``self._finished_tasks``.
+
+        Mappers in steps with a reducer write sorted partitions instead of
+        *output_path* (see :py:meth:`_mapper_partition_paths`). Reducers
+        read from a list of sorted partitions (*input_path*), which they
+        merge (see :py:func:`mrjob.cat.merge_sorted_files`).
+
+        If *input_start* and *input_length* are set, the task should only
+        read that byte range of *input_path* (see
+        :py:func:`mrjob.cat.read_split`).
         """
         raise NotImplementedError("Subclass must implement this method")
 
-    def _per_step_runner_finish(self, step_num):
-        """ Runner specific method to be executed to mark the step completion.
-        Only the local runner implements this method
+    def _wait_for_any_task(self):
+        """Wait for at least one task started by :py:meth:`_run_step`
+        to finish, and add its output path to ``self._finished_tasks``.
+
+        Runners that start tasks in the background must override this.
         """
-        pass
+        raise NotImplementedError
 
-    def _get_file_splits(self, input_paths, num_splits, keep_sorted=False):
-        """ Split the input files into (roughly) *num_splits* files. Gzipped
-        files are not split, but each gzipped file counts as one split.
+    def _get_file_splits(self, input_paths, num_splits):
+        """ Split the input files into (roughly) *num_splits* byte ranges.
+        Files that can't be split (see :py:meth:`_is_splittable`) count as
+        one split.
+
+        Nothing is copied; tasks read their range straight from the original
+        file, starting at the first line that begins in the range, and
+        reading through the end of the last line that begins in it (see
+        :py:func:`mrjob.cat.read_split`).
 
         :param input_paths: Iterable of paths to be split
         :param num_splits: Number of splits to target
-        :param keep_sorted: If True, group lines by key
 
-        Returns a dictionary that maps split_file names to a dictionary of
-        properties:
+        Returns a list of dictionaries, one for each split, ordered by
+        task number, with the keys:
 
-        * *orig_name*: the original name of the file whose data is in
-                          the split
+        * *path*: the (absolute) path of the file the split is in
         * *start*: where the split starts
         * *length*: the length of the split
+        * *task_num*: which task reads the split
         """
-        # sanity check: if keep_sorted is True, we should only have one file
-        assert(not keep_sorted or len(input_paths) == 1)
-
-        file_names = {}
-        input_paths_to_split = []
+        splits = []
+        paths_to_split = []
 
-        # Each file is assigned a 'task number' as if coming from some previous
-        # task. The task number is used to choose the split file name, and
-        # sometimes the file name of the sorted split. This is done so that
-        # when the output files are combined after the final step, they are in
-        # sorted order due to already being lexicographically sorted.
+        def add_split(path, start, length):
+            splits.append({
+                'path': path,
+                'start': start,
+                'length': length,
+                'task_num': len(splits),
+            })
 
         for input_path in input_paths:
             for path in self.fs.ls(input_path):
-                if path.endswith('.gz'):
-                    # do not split compressed files
-                    absolute_path = os.path.abspath(path)
-                    file_names[absolute_path] = {
-                        'orig_name': absolute_path,
-                        'start': 0,
-                        'task_num': len(file_names),
-                        'length': os.stat(absolute_path)[stat.ST_SIZE],
-                    }
+                # use absolute paths; tasks run in their own working dirs
+                path = os.path.abspath(path)
+
+                # skip indexes we've written next to gzipped files
+                if (path.endswith('.gzi') and
+                        gzip_index_path(path[:-4]) == path and
+                        os.path.exists(path[:-4])):
+                    continue
+
+                if self._is_splittable(path):
+                    paths_to_split.append(path)
+                else:
+                    add_split(path, 0, os.stat(path)[stat.ST_SIZE])
                     # this counts as "one split"
                     num_splits -= 1
-                else:
-                    # do split uncompressed files
-                    input_paths_to_split.append(path)
 
-        # exit early if no uncompressed files given
-        if not input_paths_to_split:
-            return file_names
+        # exit early if no splittable files given
+        if not paths_to_split:
+            return splits
 
         # account for user giving fewer splits than there are compressed files
         num_splits = max(num_splits, 1)
 
         # determine the size of each file split
-        total_size = 0
-        for input_path in input_paths_to_split:
-            for path in self.fs.ls(input_path):
-                total_size += os.stat(path)[stat.ST_SIZE]
-        split_size = total_size / num_splits
-
-        # we want each file split to be as close to split_size as possible
-        # we also want different input files to be in different splits
-        tmp_directory = self._get_local_tmp_dir()
-
-        # Helper functions:
-        def create_outfile(orig_name='', start=''):
-            # create a new output file and initialize its properties dict
-            task_num = len(file_names)
-            outfile_name = os.path.join(tmp_directory,
-                                        'input_part-%05d' % task_num)
-            new_file = {
-                'orig_name': orig_name,
-                'start': start,
-                'task_num': task_num,
-            }
-            file_names[outfile_name] = new_file
-            return outfile_name
-
-        def line_group_generator(input_path):
-            # Generate lines from a given input_path, if keep_sorted is True,
-            # group lines by key; otherwise have one line per group
-            # concatenate all lines with the same key and yield them
-            # together
-            if keep_sorted:
-                def reducer_key(line):
-                    return line.split(b'\t')[0]
-
-                # assume that input is a collection of key <tab> value pairs
-                # match all non-tab characters
-                for _, lines in itertools.groupby(
-                        read_input(input_path), key=reducer_key):
-                    yield lines
-            else:
-                for line in read_input(input_path):
-                    yield (line,)
+        sizes = [os.stat(path)[stat.ST_SIZE] for path in paths_to_split]
+        split_size = max(int(math.ceil(sum(sizes) / float(num_splits))), 1)
+
+        # every file gets at least one split. Like Hadoop, don't leave a
+        # tiny split at the end of a file
+        for path, size in zip(paths_to_split, sizes):
+            start = 0
+            while size - start > split_size * _SPLIT_SLOP:
+                add_split(path, start, split_size)
+                start += split_size
 
-        for path in input_paths_to_split:
-            # create a new split file for each new path
+            add_split(path, start, size - start)
 
-            # initialize file and accumulators
-            outfile_name = create_outfile(path, 0)
-            bytes_written = 0
-            total_bytes = 0
-            outfile = None
+        return splits
 
+    def _is_splittable(self, path):
+        """Can tasks read byte ranges of the file at *path* (see
+        :py:func:`mrjob.cat.read_split`)?
+
+        Uncompressed and bzip2 files can always be split. Gzipped files
+        can be split if they're made of several gzip members and have an
+        up-to-date index (see :mrjob-opt:`index_gzip_input`). Other
+        compressed files (e.g. ``.deflate``) can't be split.
+        """
+        ext = _compression_extension(path)
+
+        if ext in _SPLITTABLE_EXTENSIONS:
+            return True
+        elif ext != '.gz':
+            return False
+
+        index = read_gzip_index(path)
+
+        if index is None and self._opts['index_gzip_input']:
+            log.info('Indexing %s' % path)
             try:
-                outfile = open(outfile_name, 'wb')
+                index = write_gzip_index(path)
+            except (IOError, OSError) as e:
+                log.warning("Can't index %s: %s" % (path, e))
+                return False
 
-                # write each line to a file as long as we are within the limit
-                # (split_size)
-                for line_group in line_group_generator(path):
-                    if bytes_written >= split_size:
-                        # new split file if we exceeded the limit
-                        file_names[outfile_name]['length'] = bytes_written
-                        total_bytes += bytes_written
+        return index is not None and len(index) > 1
 
-                        outfile_name = create_outfile(path, total_bytes)
-                        outfile.close()
-                        outfile = open(outfile_name, 'wb')
+    def _map_sort_buffer_size(self, step_num):
+        """How many bytes of mapper output to sort and combine in memory at
+        once, before spilling to disk. Set this with the
+        ``mapreduce.task.io.sort.mb`` jobconf variable."""
+        jobconf = self._jobconf_for_step(step_num)
 
-                        bytes_written = 0
+        return int(jobconf_from_dict(
+            jobconf, 'mapreduce.task.io.sort.mb',
+            self._DEFAULT_IO_SORT_MB)) * 1024 * 1024
+
+    def _map_output_extension(self, step_num):
+        """File extension for (compressed) mapper output for the given step,
+        or ``''`` if it's not compressed. Turn on compression with the
+        ``mapreduce.map.output.compress`` jobconf variable, and pick a codec
+        with ``mapreduce.map.output.compress.codec``."""
+        if step_num not in self._map_output_extensions:
+            jobconf = self._jobconf_for_step(step_num)
+
+            ext = ''
+            if str(jobconf_from_dict(
+                    jobconf, 'mapreduce.map.output.compress')).lower() == (
+                    'true'):
+                codec = jobconf_from_dict(
+                    jobconf, 'mapreduce.map.output.compress.codec',
+                    _DEFAULT_CODEC)
+                ext = _CODEC_TO_EXTENSION.get(codec, '')
+
+                if not can_compress('x' + ext):
+                    log.warning(
+                        "Can't compress map output with %s, using %s" %
+                        (codec, _DEFAULT_CODEC))
+                    ext = _CODEC_TO_EXTENSION[_DEFAULT_CODEC]
+
+            self._map_output_extensions[step_num] = ext
+
+        return self._map_output_extensions[step_num]
+
+    def _max_concurrent_tasks(self):
+        """How many tasks this runner may run at once. Subclasses that run
+        tasks in parallel should override this."""
+        return 1
+
+    def _num_reducers(self, step_num):
+        """How many reducers to run for the given step. Set this with the
+        ``mapreduce.job.reduces`` jobconf variable."""
+        jobconf = self._jobconf_for_step(step_num)
 
-                    for line in line_group:
-                        outfile.write(line)
-                        bytes_written += len(line)
+        return int(jobconf_from_dict(
+            jobconf, 'mapreduce.job.reduces', self._DEFAULT_REDUCE_TASKS))
 
-                file_names[outfile_name]['length'] = bytes_written
-            finally:
-                if outfile is not None:
-                    outfile.close()
+    def _mapper_partition_paths(self, step_num, output_path):
+        """If the given step has a reducer, return the paths of the sorted
+        partitions (one per reducer) that the mapper with the given
+        *output_path* writes, split by key (see
+        :py:class:`mrjob.cat.PartitionWriter`). Otherwise, return ``None``.
 
-        return file_names
+        Partitions are compressed based on their file extension (see
+        :py:meth:`_map_output_extension`).
+        """
+        if 'reducer' not in self._get_step(step_num):
+            return None
+
+        ext = self._map_output_extension(step_num)
+
+        return ['%s-%05d%s' % (output_path, task_num, ext)
+                for task_num in range(self._num_reducers(step_num))]
+
+    def _task_jobconf_for_step(self, step_num):
+        """The jobconf that tasks in the given step see: the user's jobconf
+        (see :py:meth:`_jobconf_for_step`), plus ``stream.map.output`` and
+        ``stream.reduce.input`` if the step shuffles typed bytes (see
+        :py:meth:`_shuffle_io_jobconf_for_step`)."""
+        return combine_dicts(self._shuffle_io_jobconf_for_step(step_num),
+                             self._jobconf_for_step(step_num))
+
+    def _task_shuffles_typedbytes(self, step_num, step_type):
+        """Does the given mapper write (or reducer read) typed bytes records
+        rather than lines? If so, we convert them to lines to sort them
+        (see :py:func:`mrjob.protocol._typedbytes_record_to_line`), and
+        back again for the reducer."""
+        jobconf = self._task_jobconf_for_step(step_num)
+
+        if step_type == 'mapper':
+            return jobconf.get('stream.map.output') == 'typedbytes'
+        elif step_type == 'reducer':
+            return jobconf.get('stream.reduce.input') == 'typedbytes'
+        else:
+            return False
+
+    def _task_partition_paths(self, step_num, step_type, output_path):
+        """Sorted partitions to write a task's output to, if it's a mapper
+        in a step with a reducer (see :py:meth:`_mapper_partition_paths`),
+        or ``None``."""
+        if step_type == 'mapper':
+            return self._mapper_partition_paths(step_num, output_path)
+        else:
+            return None
 
     def _subprocess_env(self, step_num, step_type, task_num, working_dir,
                         **split_kwargs):
@@ -434,13 +663,15 @@ class SimMRJobRunner(MRJobRunner):
           ``mapreduce.task.ismap`)
         * environment variables from **jobconf** options, translated to
           whatever version of Hadoop we're emulating
+        * ``stream.map.output`` and ``stream.reduce.input``, if the step
+          shuffles typed bytes (see :py:meth:`_shuffle_io_jobconf_for_step`)
         * the current environment
         * PYTHONPATH set to current working directory
 
         We use :py:func:`~mrjob.conf.combine_local_envs`, so ``PATH``
         environment variables are handled specially.
         """
-        user_jobconf = self._jobconf_for_step(step_num)
+        user_jobconf = self._task_jobconf_for_step(step_num)
 
         simulated_jobconf = self._simulate_jobconf_for_step(
             step_num, step_type, task_num, working_dir, **split_kwargs)
@@ -546,6 +777,26 @@ class SimMRJobRunner(MRJobRunner):
         return self._counters
 
 
+def _cpu_count():
+    """Number of CPUs on this machine, or 1 if we can't tell."""
+    try:
+        return multiprocessing.cpu_count()
+    except NotImplementedError:
+        return 1
+
+
+def _pop_ready_task_result(task_results):
+    """Remove and return an item from *task_results*, a list of tuples
+    ending with an :py:class:`~multiprocessing.pool.AsyncResult`, whose
+    result is ready, waiting for one if need be."""
+    while True:
+        for i, task_result in enumerate(task_results):
+            if task_result[-1].ready():
+                return task_results.pop(i)
+
+        task_results[0][-1].wait(_TASK_POLL_INTERVAL)
+
+
 def _error_on_bad_paths(fs, paths):
     """Raise an exception if there is not at least one valid path.
 
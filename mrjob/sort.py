@@ -0,0 +1,323 @@
+# Copyright 2017 Yelp
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""External merge sort for lines of bytes, used by the
+:py:mod:`inline <mrjob.inline>` and :py:mod:`local <mrjob.local>` runners
+in place of the :command:`sort` command.
+
+Lines are sorted the way :command:`sort` sorts them with ``LC_ALL=C``:
+bytewise, ignoring the trailing newline. Sorted lines always end with
+``\\n``.
+
+This can also be run as a script, to sort stdin and pipe it through a
+combiner command, if any (see :py:func:`_main`). Like ``cat.py``, it doesn't
+import anything from mrjob, so it works without mrjob in ``PYTHONPATH``.
+"""
+import heapq
+import os
+import subprocess
+import sys
+from optparse import OptionParser
+from tempfile import mkstemp
+
+# how many bytes of lines to hold in memory before sorting them and
+# spilling them to disk
+_DEFAULT_BUFFER_SIZE = 100 * 1024 * 1024
+
+
+def sort_lines(lines, tmp_dir, buffer_size=_DEFAULT_BUFFER_SIZE):
+    """Yield *lines* (bytes) in sorted order.
+
+    Up to *buffer_size* bytes of lines are sorted in memory at a time;
+    if there are more than that, we write sorted runs to temp files in
+    *tmp_dir* and merge them. Temp files are deleted once all lines
+    have been yielded.
+    """
+    run_paths = []
+    buf = []
+    buf_size = 0
+
+    try:
+        for line in lines:
+            if line.endswith(b'\n'):
+                line = line[:-1]
+
+            buf.append(line)
+            buf_size += len(line) + 1
+
+            if buf_size >= buffer_size:
+                run_paths.append(_spill(buf, tmp_dir))
+                buf = []
+                buf_size = 0
+
+        buf.sort()
+
+        if not run_paths:
+            for line in buf:
+                yield line + b'\n'
+            return
+
+        if buf:
+            run_paths.append(_spill(buf, tmp_dir))
+            buf = []
+
+        for line in _merge_runs(run_paths):
+            yield line + b'\n'
+    finally:
+        _remove_all(run_paths)
+
+
+def sort_and_combine(lines, output_file, combine, tmp_dir,
+                     buffer_size=_DEFAULT_BUFFER_SIZE):
+    """Sort *lines* (bytes), pass them through *combine*, and write the
+    result to *output_file*, using a :py:class:`SortAndCombineWriter`.
+    """
+    with SortAndCombineWriter(output_file, combine, tmp_dir,
+                              buffer_size) as writer:
+        for line in lines:
+            writer.write(line)
+
+
+class SortAndCombineWriter(object):
+    """File-like object that sorts and combines everything written to it,
+    buffering at most *buffer_size* bytes of lines in memory, like Hadoop's
+    ``io.sort.mb``. Pass it to a mapper as its output, and call
+    :py:meth:`close` when the mapper is done to write the result to
+    *output_file*.
+
+    *combine* is a function that takes an iterable of sorted lines and a
+    file object to write combined lines to. If *combine* is ``None``,
+    lines are just sorted.
+
+    If everything fits in the buffer, we call *combine* once. Otherwise,
+    every time the buffer fills up, we sort and combine it and spill the
+    (sorted) result to a temp file in *tmp_dir*; then we merge the spills
+    and combine them again. So *combine* may see its own output; as with
+    Hadoop, combiners must be able to handle that.
+    """
+    def __init__(self, output_file, combine, tmp_dir,
+                 buffer_size=_DEFAULT_BUFFER_SIZE):
+        self._output_file = output_file
+        self._combine = combine
+        self._tmp_dir = tmp_dir
+        self._buffer_size = buffer_size
+
+        # lines without trailing newlines
+        self._buf = []
+        self._buf_size = 0
+
+        # anything written after the last newline
+        self._partial_line = b''
+
+        # paths of sorted runs spilled to disk
+        self._run_paths = []
+
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            # don't combine partial output; just clean up
+            self.closed = True
+            _remove_all(self._run_paths)
+
+    def write(self, data):
+        """Buffer *data*, which may contain any number of lines (including
+        partial ones), spilling the buffer to disk if it's full."""
+        if self._partial_line:
+            data = self._partial_line + data
+
+        lines = data.split(b'\n')
+        self._partial_line = lines.pop()
+
+        self._buf.extend(lines)
+        self._buf_size += len(data) - len(self._partial_line)
+
+        if self._buf_size >= self._buffer_size:
+            self._spill_buf()
+
+    def flush(self):
+        """Does nothing; we can't write anything until we have all the
+        lines (see :py:meth:`close`)."""
+        pass
+
+    def close(self):
+        """Sort and combine everything written so far, write it to
+        *output_file*, and delete any temp files."""
+        if self.closed:
+            return
+        self.closed = True
+
+        try:
+            if self._partial_line:
+                self._buf.append(self._partial_line)
+                self._partial_line = b''
+
+            if self._run_paths:
+                if self._buf:
+                    self._spill_buf()
+
+                lines = _merge_runs(self._run_paths)
+            else:
+                # everything fit in memory
+                self._buf.sort()
+                lines = self._buf
+
+            self._combine_to(_add_newlines(lines), self._output_file)
+        finally:
+            self._buf = []
+            _remove_all(self._run_paths)
+
+    def _combine_to(self, lines, output_file):
+        """Run sorted *lines* through the combiner (if any) into
+        *output_file*."""
+        if self._combine is None:
+            for line in lines:
+                output_file.write(line)
+        else:
+            self._combine(lines, output_file)
+
+    def _spill_buf(self):
+        """Sort and combine the buffer, and spill it to a temp file."""
+        self._buf.sort()
+
+        if self._combine is None:
+            self._run_paths.append(_spill(self._buf, self._tmp_dir))
+        else:
+            self._run_paths.append(_combine_and_spill(
+                self._buf, self._combine, self._tmp_dir))
+
+        self._buf = []
+        self._buf_size = 0
+
+
+def _add_newlines(lines):
+    """Yield *lines* with trailing newlines added."""
+    for line in lines:
+        yield line + b'\n'
+
+
+def _spill(buf, tmp_dir):
+    """Sort *buf* (lines without trailing newlines) in place and write it to
+    a new temp file in *tmp_dir*. Return the path of the temp file."""
+    buf.sort()
+
+    fd, path = mkstemp(prefix='sort-run-', dir=tmp_dir)
+    with os.fdopen(fd, 'wb') as f:
+        for line in buf:
+            f.write(line)
+            f.write(b'\n')
+
+    return path
+
+
+def _combine_and_spill(buf, combine, tmp_dir):
+    """Sort *buf* (lines without trailing newlines), run it through
+    *combine*, and write the sorted result to a new temp file in *tmp_dir*.
+    Return the path of the temp file."""
+    buf.sort()
+
+    fd, combined_path = mkstemp(prefix='sort-combined-', dir=tmp_dir)
+    try:
+        with os.fdopen(fd, 'wb') as combined_file:
+            combine(_add_newlines(buf), combined_file)
+
+        with open(combined_path, 'rb') as combined_file:
+            combined = [line[:-1] if line.endswith(b'\n') else line
+                        for line in combined_file]
+    finally:
+        _remove_all([combined_path])
+
+    return _spill(combined, tmp_dir)
+
+
+def _merge_runs(run_paths):
+    """Merge the sorted runs in *run_paths*, yielding lines without
+    trailing newlines."""
+    run_files = []
+    try:
+        for path in run_paths:
+            run_files.append(open(path, 'rb'))
+
+        for line in heapq.merge(*[_read_run(f) for f in run_files]):
+            yield line
+    finally:
+        for f in run_files:
+            f.close()
+
+
+def _read_run(f):
+    """Yield lines from a sorted run, without trailing newlines."""
+    for line in f:
+        yield line[:-1]
+
+
+def _remove_all(paths):
+    """Delete the files in *paths*, if they exist."""
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _main():
+    """Sort stdin, pipe it through a combiner command (if any), and write
+    the result to stdout, using :py:class:`SortAndCombineWriter`. Used by
+    the local runner in place of ``sort | <combiner>``.
+
+    Usage: ``sort.py [--buffer-size BYTES] [--tmp-dir DIR] [COMBINER_CMD...]``
+    """
+    option_parser = OptionParser(
+        usage='%prog [options] [combiner_cmd [args...]]')
+    option_parser.disable_interspersed_args()
+    option_parser.add_option(
+        '--buffer-size', dest='buffer_size', type='int',
+        default=_DEFAULT_BUFFER_SIZE,
+        help='Max bytes of lines to sort and combine in memory at once')
+    option_parser.add_option(
+        '--tmp-dir', dest='tmp_dir', default=None,
+        help='Directory to spill sorted lines to')
+
+    options, combiner_args = option_parser.parse_args()
+
+    # we want to read and write bytes
+    stdin_buffer = getattr(sys.stdin, 'buffer', sys.stdin)
+    stdout_buffer = getattr(sys.stdout, 'buffer', sys.stdout)
+
+    def combine(lines, output_file):
+        output_file.flush()
+        proc = subprocess.Popen(
+            combiner_args, stdin=subprocess.PIPE, stdout=output_file)
+        try:
+            for line in lines:
+                proc.stdin.write(line)
+            proc.stdin.close()
+        except IOError:
+            # combiner quit early; wait() will tell us why
+            pass
+
+        returncode = proc.wait()
+        if returncode:
+            # combiner already wrote its error to stderr
+            sys.exit(returncode)
+
+    sort_and_combine(stdin_buffer, stdout_buffer,
+                     combine if combiner_args else None,
+                     options.tmp_dir, options.buffer_size)
+
+
+if __name__ == '__main__':
+    _main()
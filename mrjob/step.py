@@ -23,11 +23,11 @@ STEP_TYPES = ('jar', 'spark', 'spark_jar', 'spark_script', 'streaming')
 
 # Function names mapping to mapper, reducer, and combiner operations
 _MAPPER_FUNCS = ('mapper', 'mapper_init', 'mapper_final', 'mapper_cmd',
-                 'mapper_pre_filter')
+                 'mapper_pre_filter', 'mapper_batch', 'mapper_aggregate')
 _COMBINER_FUNCS = ('combiner', 'combiner_init', 'combiner_final',
                    'combiner_cmd', 'combiner_pre_filter')
 _REDUCER_FUNCS = ('reducer', 'reducer_init', 'reducer_final', 'reducer_cmd',
-                  'reducer_pre_filter')
+                  'reducer_pre_filter', 'reducer_batch')
 _HADOOP_OPTS = ('jobconf',)
 
 # params to specify how to run the step. need at least one of these
@@ -153,6 +153,16 @@ class MRStep(object):
     :param combiner_final: function with same function signature as
                            :py:meth:`~mrjob.job.MRJob.combiner_final`, or
                            ``None`` for no final combiner action.
+    :param mapper_batch: function with same function signature as
+                         :py:meth:`~mrjob.job.MRJob.mapper_batch`, to use
+                         instead of *mapper*.
+    :param reducer_batch: function with same function signature as
+                          :py:meth:`~mrjob.job.MRJob.reducer_batch`, to use
+                          instead of *reducer*.
+    :param mapper_aggregate: function with same function signature as
+                             :py:meth:`~mrjob.job.MRJob.mapper_aggregate`,
+                             to combine values in the mapper before they
+                             are written.
     :param jobconf: dictionary with custom jobconf arguments to pass to
                     hadoop.
     """
@@ -195,6 +205,11 @@ class MRStep(object):
         _check_cmd('combiner_cmd', _prefix_set('combiner'))
         _check_cmd('reducer_cmd', _prefix_set('reducer'))
 
+        for name in ('mapper', 'reducer'):
+            if steps[name] and steps[name + '_batch']:
+                raise ValueError("Can't specify both %s and %s_batch" % (
+                    name, name))
+
         self._steps = steps
 
     def __repr__(self):
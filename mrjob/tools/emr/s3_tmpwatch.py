@@ -91,18 +91,24 @@ def _s3_cleanup(glob_path, time_old, dry_run=False, **runner_kwargs):
     log.info('Deleting all files in %s that are older than %s' %
              (glob_path, time_old))
 
-    for path in runner.fs.ls(glob_path):
-        bucket_name, key_name = parse_s3_uri(path)
-        bucket = runner.fs.get_bucket(bucket_name)
-
-        for key in bucket.list(key_name):
-            last_modified = iso8601_to_datetime(key.last_modified)
-            age = datetime.utcnow() - last_modified
-            if age > time_old:
-                # Delete it
-                log.info('Deleting %s; is %s old' % (key.name, age))
-                if not dry_run:
-                    key.delete()
+    def old_keys():
+        for path in runner.fs.ls(glob_path):
+            bucket_name, key_name = parse_s3_uri(path)
+            bucket = runner.fs.get_bucket(bucket_name)
+
+            for key in bucket.list(key_name):
+                last_modified = iso8601_to_datetime(key.last_modified)
+                age = datetime.utcnow() - last_modified
+                if age > time_old:
+                    log.info('Deleting %s; is %s old' % (key.name, age))
+                    yield key
+
+    if dry_run:
+        for _ in old_keys():
+            pass
+    else:
+        # delete keys in batches
+        runner.fs.delete_keys(old_keys())
 
 
 def _runner_kwargs(options):
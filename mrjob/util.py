@@ -28,10 +28,13 @@ import shutil
 import sys
 import tarfile
 from collections import defaultdict
+from collections import deque
 from copy import deepcopy
 from datetime import timedelta
 from distutils.spawn import find_executable
+from functools import partial
 from logging import getLogger
+from multiprocessing.pool import ThreadPool
 from optparse import OptionParser
 from zipfile import ZIP_DEFLATED
 from zipfile import ZIP_STORED
@@ -191,7 +194,8 @@ def random_identifier():
     return '%016x' % random.randint(0, 2 ** 64 - 1)
 
 
-def read_file(path, fileobj=None, yields_lines=True, cleanup=None):
+def read_file(path, fileobj=None, yields_lines=True, cleanup=None,
+              background=False):
     """Yields lines from a file, possibly decompressing it based on file
     extension.
 
@@ -207,10 +211,13 @@ def read_file(path, fileobj=None, yields_lines=True, cleanup=None):
                          ``False`` (useful for :py:class:`boto.s3.Key`)
     :param cleanup: Optional callback to call with no arguments when EOF is
                     reached or an exception is thrown.
+    :param background: If true, decompress data in a background thread (see
+                       :py:func:`mrjob.cat.decompress`).
     """
     # sometimes values declared in the ``try`` block aren't accessible from the
     # ``finally`` block. not sure why.
     f = None
+    decompressed_f = None
     try:
         # open path if we need to
         if fileobj is None:
@@ -218,7 +225,7 @@ def read_file(path, fileobj=None, yields_lines=True, cleanup=None):
         else:
             f = fileobj
 
-        decompressed_f = decompress(f, path)
+        decompressed_f = decompress(f, path, background=background)
 
         if decompressed_f is f and yields_lines:
             # this could be important; iterating over to_lines(f) is about 8x
@@ -231,6 +238,11 @@ def read_file(path, fileobj=None, yields_lines=True, cleanup=None):
             yield line
     finally:
         try:
+            # stop any background thread (see decompress()) before closing f
+            if (decompressed_f is not None and decompressed_f is not f and
+                    hasattr(decompressed_f, 'close')):
+                decompressed_f.close()
+
             if f and f is not fileobj:
                 f.close()
         finally:
@@ -284,6 +296,120 @@ def read_input(path, stdin=None):
         yield line
 
 
+def _read_ahead(funcs, max_ahead):
+    """Call each function in *funcs* (with no arguments) in a pool of
+    *max_ahead* threads, and yield their return values in order.
+
+    At most *max_ahead* calls are pending or waiting to be yielded at once,
+    so this is a bounded read-ahead buffer for things like ranges of a file.
+    *funcs* is consumed lazily, from the calling thread. Exceptions are
+    re-raised when we reach the corresponding return value.
+    """
+    if max_ahead <= 1:
+        for func in funcs:
+            yield func()
+        return
+
+    pool = ThreadPool(max_ahead)
+    try:
+        pending = deque()
+
+        for func in funcs:
+            pending.append(pool.apply_async(func))
+
+            if len(pending) >= max_ahead:
+                yield pending.popleft().get()
+
+        while pending:
+            yield pending.popleft().get()
+    finally:
+        # don't start anything new if we stopped early
+        pool.terminate()
+
+
+def _read_files_ahead(files, max_ahead):
+    """Yield lines from several files in order, fetching chunks of them
+    with :py:func:`_read_ahead`.
+
+    *files* is a sequence of ``(path, readers)``, where *readers* is a
+    sequence of functions that return successive chunks of bytes from
+    *path*. Each file is decompressed according to its *path*, as with
+    :py:func:`read_file`. Both sequences are consumed lazily, so
+    read-ahead continues into the next few files.
+    """
+    def tagged_readers():
+        for file_num, (path, readers) in enumerate(files):
+            for reader in readers:
+                yield partial(_call_and_tag, (file_num, path), reader)
+
+    tagged_chunks = _read_ahead(tagged_readers(), max_ahead)
+
+    for (_, path), file_chunks in itertools.groupby(
+            tagged_chunks, lambda tagged_chunk: tagged_chunk[0]):
+        fileobj = _ChunkReader(chunk for _, chunk in file_chunks)
+        # yields_lines=False: warn read_file that fileobj yields chunks
+        for line in read_file(path, fileobj=fileobj, yields_lines=False):
+            yield line
+
+
+def _call_and_tag(tag, func):
+    return tag, func()
+
+
+class _ChunkReader(object):
+    """Minimal read-only file object that reads from an iterable of
+    chunks of bytes (see :py:func:`_read_files_ahead`). Iterating over
+    it yields the chunks themselves, like :py:class:`boto.s3.key.Key`, so
+    pass ``yields_lines=False`` to :py:func:`read_file`."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        # current chunk, and how much of it we've read
+        self._chunk = b''
+        self._pos = 0
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            pieces = [self._chunk[self._pos:]]
+            pieces.extend(self._chunks)
+            self._chunk = b''
+            self._pos = 0
+            return b''.join(pieces)
+
+        pieces = []
+        num_bytes = 0
+
+        while num_bytes < size:
+            if self._pos >= len(self._chunk):
+                try:
+                    self._chunk = next(self._chunks)
+                except StopIteration:
+                    break
+                self._pos = 0
+                continue
+
+            piece = self._chunk[self._pos:self._pos + size - num_bytes]
+            self._pos += len(piece)
+            num_bytes += len(piece)
+            pieces.append(piece)
+
+        return b''.join(pieces)
+
+    def __iter__(self):
+        if self._pos < len(self._chunk):
+            chunk = self._chunk[self._pos:]
+            self._chunk = b''
+            self._pos = 0
+            yield chunk
+
+        for chunk in self._chunks:
+            yield chunk
+
+    def close(self):
+        if hasattr(self._chunks, 'close'):
+            self._chunks.close()
+
+
 # Thanks to http://lybniz2.sourceforge.net/safeeval.html for
 # explaining how to do this!
 def safeeval(expr, globals=None, locals=None):
@@ -415,30 +541,40 @@ def to_lines(chunks):
 
     Optimizes for:
 
-    * chunks bigger than lines (e.g. reading test files)
+    * chunks much bigger than lines (e.g. decompressed data)
     * chunks that are lines (idempotency)
     """
-    # list of chunks with no final newline
+    # pieces of a line that hasn't ended yet
     leftovers = []
 
     for chunk in chunks:
-        start = 0
+        if not chunk:
+            continue
 
-        while start < len(chunk):
-            end = chunk.find(b'\n', start) + 1
+        if b'\r' in chunk:
+            # splitlines() would also break on \r
+            lines = chunk.split(b'\n')
+            partial_line = lines.pop()
+            lines = [line + b'\n' for line in lines]
+            if partial_line:
+                lines.append(partial_line)
+        else:
+            # splitlines() is much faster than splitting one line at a time
+            lines = chunk.splitlines(True)
 
-            if end == 0:  # no newlines found
-                leftovers.append(chunk[start:])
-                break
+        if leftovers:
+            leftovers.append(lines[0])
+            if not lines[0].endswith(b'\n'):
+                continue  # chunk had no newlines
 
-            if leftovers:
-                leftovers.append(chunk[start:end])
-                yield b''.join(leftovers)
-                leftovers = []
-            else:
-                yield chunk[start:end]
+            lines[0] = b''.join(leftovers)
+            leftovers = []
+
+        if not lines[-1].endswith(b'\n'):
+            leftovers.append(lines.pop())
 
-            start = end
+        for line in lines:
+            yield line
 
     if leftovers:
         yield b''.join(leftovers)
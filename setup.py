@@ -21,6 +21,8 @@ try:
     # arguments that distutils doesn't understand
     setuptools_kwargs = {
         'extras_require': {
+            # speeds up MsgpackProtocol
+            'msgpack': ['msgpack>=0.5.2'],
             # highly recommended, but requires a compiler
             'ujson': ['ujson'],
         },
@@ -14,6 +14,8 @@
 import os.path
 
 from mrjob.fs.base import Filesystem
+from mrjob.fs.composite import CompositeFilesystem
+from mrjob.fs.local import LocalFilesystem
 
 from tests.py2 import TestCase
 from tests.py2 import patch
@@ -68,3 +70,26 @@ class DeprecatedAliasesTestCase(TestCase):
                 fs.path_join('foo', 'bar')
 
             fs.join.assert_called_once_with('foo', 'bar')
+
+
+class CatFilesTestCase(SandboxedTestCase):
+
+    def test_cat_files(self):
+        foo_path = self.makefile('foo', b'foo\n')
+        bar_path = self.makefile('bar', b'bar\nbar\n')
+
+        fs = LocalFilesystem()
+
+        self.assertEqual(list(fs._cat_files([foo_path, bar_path])),
+                         [b'foo\n', b'bar\n', b'bar\n'])
+
+    def test_composite_passes_through_to_one_fs(self):
+        local_fs = LocalFilesystem()
+        fs = CompositeFilesystem(local_fs)
+
+        with patch.object(local_fs, '_cat_files',
+                          return_value=iter([b'foo\n'])):
+            self.assertEqual(list(fs._cat_files(['foo', 'bar'])),
+                             [b'foo\n'])
+
+            local_fs._cat_files.assert_called_once_with(['foo', 'bar'])
@@ -0,0 +1,179 @@
+# Copyright 2017 Yelp
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os.path
+
+from mrjob.fs.composite import CompositeFilesystem
+from mrjob.fs.local import LocalFilesystem
+
+from tests.py2 import Mock
+from tests.py2 import patch
+from tests.sandbox import SandboxedTestCase
+
+
+class MetadataCacheTestCase(SandboxedTestCase):
+
+    def setUp(self):
+        super(MetadataCacheTestCase, self).setUp()
+
+        self.local_fs = LocalFilesystem()
+        self.start(patch.object(self.local_fs, 'ls',
+                                wraps=self.local_fs.ls))
+        self.start(patch.object(self.local_fs, 'du',
+                                wraps=self.local_fs.du))
+
+        self.time = self.start(patch('time.time', return_value=1000.0))
+
+        self.foo_path = self.makefile('foo', b'foo\n')
+        self.tmp_glob = os.path.join(self.tmp_dir, '*')
+
+    def test_no_cache_by_default(self):
+        fs = CompositeFilesystem(self.local_fs)
+
+        self.assertEqual(list(fs.ls(self.tmp_glob)), [self.foo_path])
+        self.assertEqual(list(fs.ls(self.tmp_glob)), [self.foo_path])
+
+        self.assertEqual(self.local_fs.ls.call_count, 2)
+
+    def test_cache_ls(self):
+        fs = CompositeFilesystem(self.local_fs, cache_secs=60)
+
+        self.assertEqual(list(fs.ls(self.tmp_glob)), [self.foo_path])
+        self.assertEqual(list(fs.ls(self.tmp_glob)), [self.foo_path])
+
+        self.assertEqual(self.local_fs.ls.call_count, 1)
+
+    def test_cache_du(self):
+        fs = CompositeFilesystem(self.local_fs, cache_secs=60)
+
+        self.assertEqual(fs.du(self.foo_path), 4)
+        self.assertEqual(fs.du(self.foo_path), 4)
+
+        self.assertEqual(self.local_fs.du.call_count, 1)
+
+    def test_different_paths(self):
+        fs = CompositeFilesystem(self.local_fs, cache_secs=60)
+
+        self.assertEqual(list(fs.ls(self.tmp_glob)), [self.foo_path])
+        self.assertEqual(list(fs.ls(self.foo_path)), [self.foo_path])
+
+        self.assertEqual(self.local_fs.ls.call_count, 2)
+
+    def test_expiration(self):
+        fs = CompositeFilesystem(self.local_fs, cache_secs=60)
+
+        list(fs.ls(self.tmp_glob))
+
+        self.time.return_value = 1059.0
+        list(fs.ls(self.tmp_glob))
+        self.assertEqual(self.local_fs.ls.call_count, 1)
+
+        self.time.return_value = 1060.0
+        list(fs.ls(self.tmp_glob))
+        self.assertEqual(self.local_fs.ls.call_count, 2)
+
+    def test_touchz_clears_cache(self):
+        fs = CompositeFilesystem(self.local_fs, cache_secs=60)
+
+        self.assertEqual(list(fs.ls(self.tmp_glob)), [self.foo_path])
+
+        bar_path = os.path.join(self.tmp_dir, 'bar')
+        fs.touchz(bar_path)
+
+        self.assertEqual(sorted(fs.ls(self.tmp_glob)),
+                         [bar_path, self.foo_path])
+
+    def test_du_and_md5sum_of_listed_key(self):
+        s3_fs = Mock(spec=['can_handle_path', '_ls_metadata', 'du',
+                           'exists', 'md5sum'])
+        s3_fs.can_handle_path.return_value = True
+        s3_fs._ls_metadata.return_value = [('s3://walrus/data/foo', 4, 'f00')]
+        fs = CompositeFilesystem(s3_fs, cache_secs=60)
+
+        self.assertEqual(list(fs.ls('s3://walrus/data')),
+                         ['s3://walrus/data/foo'])
+
+        self.assertEqual(fs.du('s3://walrus/data/foo'), 4)
+        self.assertTrue(fs.exists('s3://walrus/data/foo'))
+        self.assertEqual(fs.md5sum('s3://walrus/data/foo'), 'f00')
+
+        self.assertFalse(s3_fs.du.called)
+        self.assertFalse(s3_fs.exists.called)
+        self.assertFalse(s3_fs.md5sum.called)
+
+    def test_writes_only_invalidate_their_paths(self):
+        fs = CompositeFilesystem(self.local_fs, cache_secs=60)
+
+        other_dir = self.makedirs('other')
+        other_glob = os.path.join(other_dir, '*')
+
+        fs.du(self.foo_path)
+        self.assertEqual(list(fs.ls(other_glob)), [])
+        ls_call_count = self.local_fs.ls.call_count
+
+        bar_path = os.path.join(other_dir, 'bar')
+        fs.touchz(bar_path)
+
+        fs.du(self.foo_path)
+        self.assertEqual(self.local_fs.du.call_count, 1)
+
+        self.assertEqual(list(fs.ls(other_glob)), [bar_path])
+        self.assertEqual(self.local_fs.ls.call_count, ls_call_count + 1)
+
+    def test_rm_clears_cache(self):
+        fs = CompositeFilesystem(self.local_fs, cache_secs=60)
+
+        self.assertTrue(fs.exists(self.foo_path))
+
+        fs.rm(self.foo_path)
+
+        self.assertFalse(fs.exists(self.foo_path))
+
+    def test_delete_keys_clears_cache(self):
+        s3_fs = Mock(spec=['can_handle_path', 'delete_keys'])
+        s3_fs.can_handle_path.return_value = False
+        fs = CompositeFilesystem(self.local_fs, s3_fs, cache_secs=60)
+
+        fs.du(self.foo_path)
+        fs.delete_keys(['fake key'])
+        fs.du(self.foo_path)
+
+        s3_fs.delete_keys.assert_called_once_with(['fake key'])
+        self.assertEqual(self.local_fs.du.call_count, 2)
+
+    def test_delete_keys_needs_s3_fs(self):
+        fs = CompositeFilesystem(self.local_fs)
+
+        self.assertRaises(IOError, fs.delete_keys, [])
+
+    def test_least_recently_used(self):
+        fs = CompositeFilesystem(self.local_fs, cache_secs=60, cache_size=2)
+
+        bar_path = self.makefile('bar', b'bar\n')
+        baz_path = self.makefile('baz', b'baz\n')
+
+        fs.du(self.foo_path)
+        fs.du(bar_path)
+        fs.du(self.foo_path)  # foo is more recently used than bar
+        fs.du(baz_path)  # bar gets discarded
+        self.assertEqual(self.local_fs.du.call_count, 3)
+
+        fs.du(self.foo_path)
+        self.assertEqual(self.local_fs.du.call_count, 3)
+
+        fs.du(bar_path)
+        self.assertEqual(self.local_fs.du.call_count, 4)
+
+    def test_bad_kwarg(self):
+        self.assertRaises(TypeError, CompositeFilesystem, self.local_fs,
+                          cache_sec=60)
@@ -34,7 +34,9 @@ except ImportError:
 from mrjob.fs.gcs import GCSFilesystem
 
 from tests.compress import gzip_compress
+from tests.mockgoogleapiclient import MockGCSClientObjects
 from tests.mockgoogleapiclient import MockGoogleAPITestCase
+from tests.mockgoogleapiclient import mock_google_error
 from tests.sandbox import PatcherTestCase
 
 
@@ -68,6 +70,70 @@ class GCSFSTestCase(MockGoogleAPITestCase):
         self.assertEqual(list(self.fs._cat_file('gs://walrus/data/foo.gz')),
                          [b'foo\n'] * 10000)
 
+    def test_cat_in_ranges(self):
+        self.put_gcs_multi({
+            'gs://walrus/data/foo': b'foo\n' * 100
+        })
+
+        with patch('mrjob.fs.gcs._CAT_RANGE_SIZE', 30):
+            with patch.object(self.fs, '_read_range',
+                              wraps=self.fs._read_range) as mock_read:
+                self.assertEqual(
+                    list(self.fs._cat_file('gs://walrus/data/foo')),
+                    [b'foo\n'] * 100)
+
+        # 400 bytes / 30 bytes per range
+        self.assertEqual(mock_read.call_count, 14)
+
+    def test_cat_gz_in_ranges(self):
+        self.put_gcs_multi({
+            'gs://walrus/data/foo.gz': gzip_compress(b'foo\n' * 10000)
+        })
+
+        with patch('mrjob.fs.gcs._CAT_RANGE_SIZE', 30):
+            self.assertEqual(
+                list(self.fs._cat_file('gs://walrus/data/foo.gz')),
+                [b'foo\n'] * 10000)
+
+    def test_cat_files(self):
+        self.put_gcs_multi({
+            'gs://walrus/data/bar': b'bar\n' * 10,
+            'gs://walrus/data/empty': b'',
+            'gs://walrus/data/foo.gz': gzip_compress(b'foo\n' * 10),
+            'gs://walrus/data/qux': b'qux',
+        })
+
+        paths = ['gs://walrus/data/qux',
+                 'gs://walrus/data/foo.gz',
+                 'gs://walrus/data/empty',
+                 'gs://walrus/data/bar']
+
+        with patch('mrjob.fs.gcs._CAT_RANGE_SIZE', 7):
+            self.assertEqual(
+                list(self.fs._cat_files(paths)),
+                [b'qux'] + [b'foo\n'] * 10 + [b'bar\n'] * 10)
+
+    def test_cat_without_prefetch(self):
+        self.put_gcs_multi({
+            'gs://walrus/data/foo': b'foo\n' * 10
+        })
+
+        with patch('mrjob.fs.gcs._CAT_MAX_RANGES', 1):
+            self.assertEqual(
+                list(self.fs._cat_file('gs://walrus/data/foo')),
+                [b'foo\n'] * 10)
+
+        # no threads, so no need for a separate HTTP object
+        self.assertFalse(self.fs._thread_http.called)
+
+    def test_cat_missing_object(self):
+        self.put_gcs_multi({
+            'gs://walrus/data/bar': b'bar\n'
+        })
+
+        self.assertRaises(google_errors.HttpError, list,
+                          self.fs._cat_file('gs://walrus/data/foo'))
+
     def test_ls_key(self):
         self.put_gcs_multi({
             'gs://walrus/data/foo': b''
@@ -162,6 +228,42 @@ class GCSFSTestCase(MockGoogleAPITestCase):
         self.assertEqual(self.fs.exists('gs://walrus/data/foo'), False)
         self.assertEqual(self.fs.exists('gs://walrus/data/bar/baz'), False)
 
+    def test_rm_in_batches(self):
+        self.put_gcs_multi(dict(
+            ('gs://walrus/data/part-%05d' % i, b'') for i in range(250)))
+
+        with patch.object(self._gcs_client, 'new_batch_http_request',
+                          wraps=self._gcs_client.new_batch_http_request
+                          ) as mock_new_batch:
+            self.fs.rm('gs://walrus/data')
+
+        self.assertEqual(list(self.fs.ls('gs://walrus/data')), [])
+        self.assertEqual(mock_new_batch.call_count, 3)
+
+    def test_rm_one_batch_at_a_time(self):
+        self.put_gcs_multi(dict(
+            ('gs://walrus/data/part-%05d' % i, b'') for i in range(5)))
+
+        with patch('mrjob.fs.gcs._DELETE_BATCH_SIZE', 2):
+            with patch('mrjob.fs.gcs._MAX_CONCURRENT_DELETES', 1):
+                self.fs.rm('gs://walrus/data')
+
+        self.assertEqual(list(self.fs.ls('gs://walrus/data')), [])
+        self.assertFalse(self.fs._thread_http.called)
+
+    def test_rm_error(self):
+        self.put_gcs_multi({
+            'gs://walrus/data/foo': b'',
+        })
+
+        delete_req = mock.MagicMock(google_http.HttpRequest)
+        delete_req.execute.side_effect = mock_google_error(403)
+
+        with patch.object(MockGCSClientObjects, 'delete',
+                          return_value=delete_req):
+            self.assertRaises(google_errors.HttpError,
+                              self.fs.rm, 'gs://walrus/data')
+
 
 def _http_exception(status_code):
     mock_resp = mock.Mock()
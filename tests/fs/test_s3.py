@@ -20,10 +20,14 @@ try:
 except ImportError:
     boto = None
 
+import mrjob.fs.s3
 from mrjob.fs.s3 import S3Filesystem
 
 from tests.compress import gzip_compress
 from tests.mockboto import MockBotoTestCase
+from tests.mockboto import MockBucket
+from tests.mockboto import MockEmrObject
+from tests.mockboto import MockMultiDeleteResult
 from tests.py2 import patch
 
 
@@ -54,6 +58,73 @@ class S3FSTestCase(MockBotoTestCase):
         self.assertEqual(list(self.fs._cat_file('s3://walrus/data/foo.gz')),
                          [b'foo\n'] * 10000)
 
+    def test_cat_in_ranges(self):
+        self.add_mock_s3_data(
+            {'walrus': {'data/foo': b'foo\n' * 100}})
+
+        with patch('mrjob.fs.s3._READ_AHEAD_RANGE_SIZE', 30):
+            with patch('mrjob.fs.s3._read_s3_key_range',
+                       wraps=mrjob.fs.s3._read_s3_key_range) as mock_read:
+                self.assertEqual(
+                    list(self.fs._cat_file('s3://walrus/data/foo')),
+                    [b'foo\n'] * 100)
+
+        # 400 bytes / 30 bytes per range
+        self.assertEqual(mock_read.call_count, 14)
+
+    def test_cat_gz_in_ranges(self):
+        self.add_mock_s3_data(
+            {'walrus': {'data/foo.gz': gzip_compress(b'foo\n' * 10000)}})
+
+        with patch('mrjob.fs.s3._READ_AHEAD_RANGE_SIZE', 30):
+            self.assertEqual(
+                list(self.fs._cat_file('s3://walrus/data/foo.gz')),
+                [b'foo\n'] * 10000)
+
+    def test_cat_files(self):
+        self.add_mock_s3_data(
+            {'walrus': {'data/bar': b'bar\n' * 10,
+                        'data/empty': b'',
+                        'data/foo.gz': gzip_compress(b'foo\n' * 10),
+                        'data/qux': b'qux'}})
+
+        paths = ['s3://walrus/data/qux',
+                 's3://walrus/data/foo.gz',
+                 's3://walrus/data/empty',
+                 's3://walrus/data/bar']
+
+        with patch('mrjob.fs.s3._READ_AHEAD_RANGE_SIZE', 7):
+            self.assertEqual(
+                list(self.fs._cat_files(paths)),
+                [b'qux'] + [b'foo\n'] * 10 + [b'bar\n'] * 10)
+
+    def test_cat_files_one_range_at_a_time(self):
+        self.add_mock_s3_data(
+            {'walrus': {'data/bar': b'bar\n' * 10,
+                        'data/foo': b'foo\n' * 10}})
+
+        paths = ['s3://walrus/data/foo', 's3://walrus/data/bar']
+
+        with patch('mrjob.fs.s3._READ_AHEAD_MAX_RANGES', 1):
+            self.assertEqual(
+                list(self.fs._cat_files(paths)),
+                [b'foo\n'] * 10 + [b'bar\n'] * 10)
+
+    def test_cat_missing_key(self):
+        self.add_mock_s3_data({'walrus': {}})
+
+        self.assertRaises(IOError, list,
+                          self.fs._cat_file('s3://walrus/data/foo'))
+
+    def test_cat_glob(self):
+        self.add_mock_s3_data(
+            {'walrus': {'data/bar': b'bar\n',
+                        'data/foo': b'foo\n',
+                        'qux': b'qux\n'}})
+
+        self.assertEqual(list(self.fs.cat('s3://walrus/data/*')),
+                         [b'bar\n', b'foo\n'])
+
     def test_ls_key(self):
         self.add_mock_s3_data(
             {'walrus': {'data/foo': b''}})
@@ -123,6 +194,24 @@ class S3FSTestCase(MockBotoTestCase):
         self.assertEqual(self.fs.du('s3://walrus/data/foo'), 5)
         self.assertEqual(self.fs.du('s3://walrus/data/bar/baz'), 3)
 
+    def test_du_uses_sizes_from_listing(self):
+        self.add_mock_s3_data({
+            'walrus': {'data/foo': b'abcde',
+                       'data/bar/baz': b'fgh'}})
+
+        with patch.object(self.fs, 'get_s3_key') as mock_get_s3_key:
+            self.assertEqual(self.fs.du('s3://walrus/'), 8)
+
+        self.assertFalse(mock_get_s3_key.called)
+
+    def test_ls_metadata(self):
+        self.add_mock_s3_data({'walrus': {'data/foo': b'abcd'}})
+
+        self.assertEqual(
+            list(self.fs._ls_metadata('s3://walrus/data')),
+            [('s3://walrus/data/foo', 4,
+              self.fs.md5sum('s3://walrus/data/foo'))])
+
     def test_exists(self):
         self.add_mock_s3_data({
             'walrus': {'data/foo': b'abcd'}})
@@ -148,6 +237,47 @@ class S3FSTestCase(MockBotoTestCase):
         self.assertEqual(self.fs.exists('s3://walrus/data/foo'), False)
         self.assertEqual(self.fs.exists('s3://walrus/data/bar/baz'), False)
 
+    def test_rm_in_batches(self):
+        self.add_mock_s3_data({
+            'walrus': dict(('data/part-%05d' % i, b'') for i in range(5))})
+
+        with patch('mrjob.fs.s3._DELETE_BATCH_SIZE', 2):
+            with patch.object(MockBucket, 'delete_keys',
+                              side_effect=MockBucket.delete_keys,
+                              autospec=True) as mock_delete_keys:
+                self.fs.rm('s3://walrus/data')
+
+        self.assertEqual(list(self.fs.ls('s3://walrus/')), [])
+
+        self.assertEqual(
+            sorted(len(call[0][1]) for call in
+                   mock_delete_keys.call_args_list),
+            [1, 2, 2])
+
+    def test_rm_one_batch_at_a_time(self):
+        self.add_mock_s3_data({
+            'walrus': dict(('data/part-%05d' % i, b'') for i in range(5))})
+
+        with patch('mrjob.fs.s3._DELETE_BATCH_SIZE', 2):
+            with patch('mrjob.fs.s3._MAX_CONCURRENT_DELETES', 1):
+                with patch('mrjob.util.ThreadPool') as mock_pool:
+                    self.fs.rm('s3://walrus/data')
+
+        self.assertEqual(list(self.fs.ls('s3://walrus/')), [])
+        self.assertFalse(mock_pool.called)
+
+    def test_rm_error(self):
+        self.add_mock_s3_data({
+            'walrus': {'data/foo': b'',
+                       'data/bar': b''}})
+
+        result = MockMultiDeleteResult()
+        result.errors.append(MockEmrObject(
+            key='data/bar', message='Access Denied'))
+
+        with patch.object(MockBucket, 'delete_keys', return_value=result):
+            self.assertRaises(IOError, self.fs.rm, 's3://walrus/data')
+
 
 class S3FSRegionTestCase(MockBotoTestCase):
 
@@ -426,6 +426,30 @@ class MockBucket(object):
         key = self.new_key(key_name)
         return MockMultiPartUpload(key)
 
+    def delete_keys(self, keys, quiet=False):
+        """Delete the keys with the given names. Like S3, deleting a key
+        that doesn't exist isn't an error."""
+        # boto allows up to 1000 keys per request
+        assert len(keys) <= 1000
+
+        result = MockMultiDeleteResult()
+
+        for key_name in keys:
+            self.mock_state().pop(key_name, None)
+            if not quiet:
+                result.deleted.append(key_name)
+
+        return result
+
+
+class MockMultiDeleteResult(object):
+    """Mock out boto.s3.multidelete.MultiDeleteResult"""
+
+    def __init__(self):
+        # real boto uses Deleted and Error objects, not key names
+        self.deleted = []
+        self.errors = []
+
 
 class MockKey(object):
     """Mock out boto.s3.Key"""
@@ -467,8 +491,15 @@ class MockKey(object):
         with open(path, 'rb') as f:
             self.write_mock_data(f.read())
 
-    def get_contents_as_string(self):
-        return self.read_mock_data()
+    def get_contents_as_string(self, headers=None):
+        data = self.read_mock_data()
+
+        # support Range headers of the form bytes=<start>-<end>
+        if headers and 'Range' in headers:
+            start, end = headers['Range'][len('bytes='):].split('-')
+            data = data[int(start):int(end) + 1]
+
+        return data
 
     def set_contents_from_string(self, string):
         self.write_mock_data(string)
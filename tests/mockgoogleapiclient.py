@@ -192,6 +192,10 @@ class MockGoogleAPITestCase(SandboxedTestCase):
         self.start(self.gcs_patch_download_io)
         self.start(self.gcs_patch_upload_io)
 
+        # prefetching threads just use the mock client
+        self.start(patch.object(GCSFilesystem, '_thread_http',
+                                return_value=None))
+
         self.start(patch('mrjob.dataproc._read_gcloud_config',
                          lambda: _GCLOUD_CONFIG))
 
@@ -272,6 +276,9 @@ class MockGCSClient(object):
     def objects(self):
         return self._client_objects
 
+    def new_batch_http_request(self, callback=None):
+        return MockBatchHttpRequest(callback=callback)
+
     def buckets(self):
         return self._client_buckets
 
@@ -374,15 +381,81 @@ class MockGCSClientObjects(object):
         bucket_dict = self._objects[bucket]
         del bucket_dict[object]
 
-    @mock_api
+    def get(self, bucket=None, object=None, fields=None):
+        """Emulate objects().get - returns all metadata (ignores fields)"""
+        object_dict = _get_deep(self._objects, [bucket, object])
+
+        mocked_req = mock.MagicMock(google_http.HttpRequest)
+        if object_dict is None:
+            mocked_req.execute.side_effect = mock_google_error(404)
+        else:
+            mocked_req.execute.return_value = dict(
+                (k, v) for k, v in object_dict.items()
+                if not k.startswith('_'))
+
+        return mocked_req
+
     def get_media(self, bucket=None, object=None):
-        raise NotImplementedError('See MockGCSClient.download_io')
+        """Emulate objects().get_media, including the range header"""
+        return MockGCSMediaRequest(
+            _get_deep(self._objects, [bucket, object]))
 
     @mock_api
     def insert(self, bucket=None, name=None, media_body=None):
         raise NotImplementedError('See MockGCSClient.upload_io')
 
 
+class MockBatchHttpRequest(object):
+    """Mock out googleapiclient.http.BatchHttpRequest"""
+
+    def __init__(self, callback=None):
+        self._callback = callback
+        self._requests = []
+
+    def add(self, request, callback=None, request_id=None):
+        # GCS allows up to 100 calls per batch
+        assert len(self._requests) < 100
+
+        if request_id is None:
+            request_id = str(len(self._requests) + 1)
+
+        self._requests.append((request_id, request, callback))
+
+    def execute(self, http=None):
+        for request_id, request, callback in self._requests:
+            callback = callback or self._callback
+
+            try:
+                response = request.execute()
+            except google_errors.HttpError as e:
+                if callback:
+                    callback(request_id, None, e)
+            else:
+                if callback:
+                    callback(request_id, response, None)
+
+
+class MockGCSMediaRequest(object):
+    """Mock out the HttpRequest returned by objects().get_media"""
+
+    def __init__(self, object_dict):
+        self._object_dict = object_dict
+        self.headers = {}
+
+    def execute(self, http=None):
+        if self._object_dict is None:
+            raise mock_google_error(404)
+
+        data = self._object_dict['_data']
+
+        # support range headers of the form bytes=<start>-<end>
+        if 'range' in self.headers:
+            start, end = self.headers['range'][len('bytes='):].split('-')
+            data = data[int(start):int(end) + 1]
+
+        return data
+
+
 class MockGCSClientBuckets(object):
     def __init__(self, client):
         assert isinstance(client, MockGCSClient)
@@ -0,0 +1,29 @@
+# Copyright 2017 Yelp
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Map-only job that outputs each line of input along with the start and
+length of the input split it came from."""
+from mrjob.compat import jobconf_from_env
+from mrjob.job import MRJob
+
+
+class MRInputSplitJob(MRJob):
+
+    def mapper(self, _, line):
+        yield ([int(jobconf_from_env('mapreduce.map.input.start')),
+                int(jobconf_from_env('mapreduce.map.input.length'))],
+               line)
+
+
+if __name__ == '__main__':
+    MRInputSplitJob.run()
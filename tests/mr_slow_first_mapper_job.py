@@ -0,0 +1,20 @@
+"""Job whose first mapper task takes a few seconds to start"""
+import time
+
+from mrjob.compat import jobconf_from_env
+from mrjob.job import MRJob
+
+
+class MRSlowFirstMapperJob(MRJob):
+
+    def mapper_init(self):
+        if jobconf_from_env('mapreduce.task.partition') == '0':
+            self.set_status('sleeping')
+            time.sleep(3)
+
+    def mapper(self, _, line):
+        yield None, line
+
+
+if __name__ == '__main__':
+    MRSlowFirstMapperJob.run()
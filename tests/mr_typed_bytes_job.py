@@ -0,0 +1,33 @@
+# Copyright 2017 Yelp
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Job that passes data from mapper to reducer as typed bytes."""
+from mrjob.job import MRJob
+from mrjob.protocol import TypedBytesProtocol
+
+
+class MRTypedBytesJob(MRJob):
+
+    INTERNAL_PROTOCOL = TypedBytesProtocol
+
+    def mapper(self, _, line):
+        # 9 and 10 encode as a tab and a newline
+        for word in line.split():
+            yield [word, 9], 10
+
+    def reducer(self, key, values):
+        yield key[0], (key[1], sum(values))
+
+
+if __name__ == '__main__':
+    MRTypedBytesJob.run()
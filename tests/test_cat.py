@@ -0,0 +1,364 @@
+# Copyright 2017 Yelp
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests of mrjob.cat"""
+import bz2
+import gzip
+import os
+import zlib
+from io import BytesIO
+
+from mrjob.cat import PartitionWriter
+from mrjob.cat import _partition_for_key
+from mrjob.cat import _read_decompressed_split
+from mrjob.cat import can_compress
+from mrjob.cat import compress
+from mrjob.cat import decompress
+from mrjob.cat import gzip_index_path
+from mrjob.cat import merge_sorted_files
+from mrjob.cat import read_gzip_index
+from mrjob.cat import read_split
+from mrjob.cat import write_gzip_index
+import mrjob.cat
+
+from tests.py2 import TestCase
+from tests.py2 import skipIf
+from tests.sandbox import SandboxedTestCase
+
+
+def _gzip(data):
+    f = BytesIO()
+    gz = gzip.GzipFile(fileobj=f, mode='wb')
+    gz.write(data)
+    gz.close()
+    return f.getvalue()
+
+
+class ReadSplitTestCase(TestCase):
+
+    DATA = b'foo\nbar\nbaz\nqux'
+
+    def read_split(self, start, length):
+        return list(read_split(BytesIO(self.DATA), start, length))
+
+    def test_whole_file(self):
+        self.assertEqual(self.read_split(0, len(self.DATA)),
+                         [b'foo\n', b'bar\n', b'baz\n', b'qux'])
+
+    def test_empty(self):
+        self.assertEqual(list(read_split(BytesIO(b''), 0, 0)), [])
+
+    def test_line_that_starts_in_split_belongs_to_it(self):
+        # 'bar\n' starts at offset 4
+        self.assertEqual(self.read_split(0, 5), [b'foo\n', b'bar\n'])
+        self.assertEqual(self.read_split(5, 11), [b'baz\n', b'qux'])
+
+    def test_split_on_line_boundary(self):
+        self.assertEqual(self.read_split(0, 4), [b'foo\n'])
+        self.assertEqual(self.read_split(4, 12),
+                         [b'bar\n', b'baz\n', b'qux'])
+
+    def test_split_with_no_line_starts(self):
+        self.assertEqual(self.read_split(1, 2), [])
+
+    def test_every_line_read_once(self):
+        for split_size in range(1, len(self.DATA) + 1):
+            lines = []
+            for start in range(0, len(self.DATA), split_size):
+                lines.extend(self.read_split(start, split_size))
+
+            self.assertEqual(lines, [b'foo\n', b'bar\n', b'baz\n', b'qux'])
+
+    def test_cant_split_other_compressed_files(self):
+        self.assertRaises(ValueError, read_split,
+                          BytesIO(zlib.compress(self.DATA)), 0, 10,
+                          'x.deflate')
+
+
+class DecompressTestCase(TestCase):
+
+    def test_concatenated_gz(self):
+        data = _gzip(b'foo\n') + _gzip(b'bar\n')
+        self.assertEqual(b''.join(decompress(BytesIO(data), 'x.gz')),
+                         b'foo\nbar\n')
+
+    def test_gz_with_zero_padding(self):
+        data = _gzip(b'foo\n') + b'\0' * 10
+        self.assertEqual(b''.join(decompress(BytesIO(data), 'x.gz')),
+                         b'foo\n')
+
+    def test_concatenated_bz2(self):
+        data = bz2.compress(b'foo\n') + bz2.compress(b'bar\n')
+        self.assertEqual(b''.join(decompress(BytesIO(data), 'x.bz2')),
+                         b'foo\nbar\n')
+
+
+class DecompressInBackgroundTestCase(TestCase):
+
+    def test_gz(self):
+        data = _gzip(b'foo\n') + _gzip(b'bar\n')
+        self.assertEqual(
+            b''.join(decompress(BytesIO(data), 'x.gz', background=True)),
+            b'foo\nbar\n')
+
+    def test_uncompressed(self):
+        # no need for a thread
+        f = BytesIO(b'foo\n')
+        self.assertEqual(decompress(f, 'x', background=True), f)
+
+    def test_chunks_in_order(self):
+        chunks = [('%d\n' % i).encode('ascii') for i in range(100)]
+
+        self.assertEqual(
+            list(mrjob.cat._decompress_in_background(iter(chunks), 2)),
+            chunks)
+
+    def test_error(self):
+        def chunks():
+            yield b'foo\n'
+            raise IOError('connection reset')
+
+        background_chunks = mrjob.cat._decompress_in_background(chunks())
+        self.assertEqual(next(background_chunks), b'foo\n')
+        self.assertRaises(IOError, next, background_chunks)
+
+    def test_stop_early(self):
+        read = []
+
+        def chunks():
+            for i in range(100):
+                read.append(i)
+                yield b'x'
+
+        background_chunks = mrjob.cat._decompress_in_background(chunks(), 2)
+        self.assertEqual(next(background_chunks), b'x')
+        background_chunks.close()
+
+        # the thread stopped soon after we did
+        self.assertLess(len(read), 10)
+
+
+class CompressTestCase(TestCase):
+
+    DATA = b''.join(('%d\n' % i).encode('ascii') for i in range(1000))
+
+    def round_trip(self, path):
+        f = BytesIO()
+        compressed = compress(f, path)
+        for i in range(0, len(self.DATA), 100):
+            compressed.write(self.DATA[i:i + 100])
+        compressed.close()
+
+        self.assertNotEqual(f.getvalue(), self.DATA)
+        self.assertEqual(b''.join(decompress(BytesIO(f.getvalue()), path)),
+                         self.DATA)
+
+        return f.getvalue()
+
+    def test_uncompressed(self):
+        f = BytesIO()
+        self.assertEqual(compress(f, 'x'), f)
+        self.assertFalse(can_compress('x'))
+
+    def test_deflate(self):
+        self.assertTrue(can_compress('x.deflate'))
+        self.round_trip('x.deflate')
+
+    def test_gz(self):
+        data = self.round_trip('x.gz')
+        self.assertEqual(gzip.GzipFile(fileobj=BytesIO(data)).read(),
+                         self.DATA)
+
+    def test_bz2(self):
+        data = self.round_trip('x.bz2')
+        self.assertEqual(bz2.decompress(data), self.DATA)
+
+    @skipIf(mrjob.cat.lz4_frame is None, 'lz4 module not installed')
+    def test_lz4(self):
+        self.round_trip('x.lz4')
+
+    @skipIf(mrjob.cat.zstandard is None, 'zstandard module not installed')
+    def test_zst(self):
+        self.round_trip('x.zst')
+
+    def test_context_manager(self):
+        f = BytesIO()
+        with compress(f, 'x.deflate') as compressed:
+            compressed.write(self.DATA)
+
+        self.assertFalse(f.closed)
+        self.assertEqual(
+            b''.join(decompress(BytesIO(f.getvalue()), 'x.deflate')),
+            self.DATA)
+
+
+class PartitionWriterTestCase(SandboxedTestCase):
+
+    def setUp(self):
+        super(PartitionWriterTestCase, self).setUp()
+        self.paths = [os.path.join(self.tmp_dir, 'part-%d.deflate' % i)
+                      for i in range(3)]
+
+    def read_partitions(self):
+        partitions = []
+        for path in self.paths:
+            with open(path, 'rb') as f:
+                partitions.append(b''.join(decompress(f, path)))
+        return partitions
+
+    def test_partition_by_key(self):
+        with PartitionWriter(self.paths) as writer:
+            # lines can be split across writes
+            writer.write(b'a\t1\nb\t2\nc')
+            writer.write(b'\t3\na\t4\nc')
+
+        # lines stay in order within each partition
+        expected = [b'', b'', b'']
+        for line in [b'a\t1\n', b'b\t2\n', b'c\t3\n', b'a\t4\n', b'c\n']:
+            expected[_partition_for_key(line[:1], 3)] += line
+
+        self.assertEqual(self.read_partitions(), expected)
+
+    def test_empty(self):
+        PartitionWriter(self.paths).close()
+
+        self.assertEqual(self.read_partitions(), [b'', b'', b''])
+
+
+class MergeSortedFilesTestCase(SandboxedTestCase):
+
+    def test_merge(self):
+        paths = [os.path.join(self.tmp_dir, name)
+                 for name in ('a', 'b.gz', 'c.deflate', 'd')]
+
+        for path, data in zip(paths, [b'a\nc\ne\n', b'b\nd', b'a\tb\n',
+                                      b'']):
+            with open(path, 'wb') as f:
+                with compress(f, path) as compressed:
+                    compressed.write(data)
+
+        # ignore newlines when comparing lines, like sort
+        self.assertEqual(list(merge_sorted_files(paths)),
+                         [b'a\n', b'a\tb\n', b'b\n', b'c\n', b'd\n',
+                          b'e\n'])
+
+    def test_no_files(self):
+        self.assertEqual(list(merge_sorted_files([])), [])
+
+
+class ReadDecompressedSplitTestCase(TestCase):
+
+    # "units" standing in for bzip2 blocks or gzip members, at offsets
+    # 0, 10, and 20
+    UNITS = [(0, b'foo\nba'), (10, b'r\nbaz\n'), (20, b'qux\n')]
+
+    def read_split(self, start, end):
+        units = [unit for unit in self.UNITS if unit[0] >= start]
+        return list(_read_decompressed_split(iter(units), end, 0))
+
+    def test_whole_file(self):
+        self.assertEqual(self.read_split(0, 30),
+                         [b'foo\n', b'bar\n', b'baz\n', b'qux\n'])
+
+    def test_finish_last_line(self):
+        self.assertEqual(self.read_split(0, 10), [b'foo\n', b'bar\n'])
+
+    def test_line_at_end_of_split_belongs_to_it(self):
+        # 'qux' starts right where the third unit starts
+        self.assertEqual(self.read_split(10, 20), [b'baz\n', b'qux\n'])
+        self.assertEqual(self.read_split(0, 20),
+                         [b'foo\n', b'bar\n', b'baz\n', b'qux\n'])
+        self.assertEqual(self.read_split(20, 30), [])
+
+    def test_no_units(self):
+        self.assertEqual(self.read_split(11, 20), [])
+        self.assertEqual(self.read_split(30, 40), [])
+
+
+class ReadBz2SplitTestCase(TestCase):
+
+    # with compresslevel=1, bzip2 blocks hold 100k of data each. Use
+    # two streams, like pbzip2 would
+    LINES = [('%d\n' % i).encode('ascii') for i in range(100000)]
+    DATA = (bz2.compress(b''.join(LINES[:50000]), 1) +
+            bz2.compress(b''.join(LINES[50000:]), 1))
+
+    def read_split(self, start, length):
+        return list(read_split(BytesIO(self.DATA), start, length, 'x.bz2'))
+
+    def test_whole_file(self):
+        self.assertEqual(self.read_split(0, len(self.DATA)), self.LINES)
+
+    def test_every_line_read_once(self):
+        for num_splits in (2, 3, 10, 100):
+            split_size = len(self.DATA) // num_splits + 1
+
+            lines = []
+            for start in range(0, len(self.DATA), split_size):
+                lines.extend(self.read_split(start, split_size))
+
+            self.assertEqual(lines, self.LINES)
+
+
+class GzipIndexTestCase(SandboxedTestCase):
+
+    def setUp(self):
+        super(GzipIndexTestCase, self).setUp()
+
+        self.lines = [('%d\n' % i).encode('ascii') for i in range(1000)]
+        self.path = os.path.join(self.tmp_dir, 'input.gz')
+
+        with open(self.path, 'wb') as f:
+            for i in range(0, 1000, 100):
+                f.write(_gzip(b''.join(self.lines[i:i + 100])))
+
+    def read_split(self, start, length):
+        with open(self.path, 'rb') as f:
+            return list(read_split(f, start, length, self.path))
+
+    def test_no_index(self):
+        self.assertIsNone(read_gzip_index(self.path))
+        self.assertRaises(ValueError, self.read_split, 0, 100)
+
+    def test_write_index(self):
+        index = write_gzip_index(self.path)
+        self.assertTrue(os.path.exists(gzip_index_path(self.path)))
+
+        self.assertEqual(len(index), 10)
+        self.assertEqual(index[0], (0, 0))
+        self.assertEqual([u for c, u in index],
+                         [len(b''.join(self.lines[:i]))
+                          for i in range(0, 1000, 100)])
+
+        self.assertEqual(read_gzip_index(self.path), index)
+
+    def test_stale_index(self):
+        write_gzip_index(self.path)
+
+        mtime = os.path.getmtime(self.path)
+        os.utime(gzip_index_path(self.path), (mtime - 1, mtime - 1))
+
+        self.assertIsNone(read_gzip_index(self.path))
+
+    def test_every_line_read_once(self):
+        write_gzip_index(self.path)
+        size = os.path.getsize(self.path)
+
+        for num_splits in (1, 2, 3, 10, 100):
+            split_size = size // num_splits + 1
+
+            lines = []
+            for start in range(0, size, split_size):
+                lines.extend(self.read_split(start, split_size))
+
+            self.assertEqual(lines, self.lines)
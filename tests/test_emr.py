@@ -35,6 +35,7 @@ from mrjob.emr import _4_X_COMMAND_RUNNER_JAR
 from mrjob.emr import _DEFAULT_IMAGE_VERSION
 from mrjob.emr import _MAX_HOURS_IDLE_BOOTSTRAP_ACTION_PATH
 from mrjob.emr import _PRE_4_X_STREAMING_JAR
+from mrjob.emr import _UPLOAD_PART_MAX_TRIES
 from mrjob.emr import _attempt_to_acquire_lock
 from mrjob.emr import _decode_configurations_from_api
 from mrjob.emr import _lock_acquire_step_1
@@ -61,6 +62,7 @@ from tests.mockboto import DEFAULT_MAX_STEPS_RETURNED
 from tests.mockboto import MockBotoTestCase
 from tests.mockboto import MockEmrConnection
 from tests.mockboto import MockEmrObject
+from tests.mockboto import MockMultiPartUpload
 from tests.mockssh import mock_ssh_dir
 from tests.mockssh import mock_ssh_file
 from tests.mr_hadoop_format_job import MRHadoopFormatJob
@@ -4060,6 +4062,138 @@ class MultiPartUploadTestCase(MockBotoTestCase):
             s3_key = runner.fs.get_s3_key(self.TEST_S3_URI)
             self.assertTrue(s3_key.mock_multipart_upload_was_cancelled())
 
+    @skipIf(filechunkio is None, 'need filechunkio')
+    def test_upload_parts_in_pool(self):
+        runner = EMRJobRunner(cloud_upload_part_size=self.PART_SIZE_IN_MB)
+
+        data = b'Mew' * 40  # 3 parts
+
+        with patch('mrjob.emr.ThreadPool',
+                   wraps=mrjob.emr.ThreadPool) as mock_pool:
+            self.assert_upload_succeeds(runner, data, expect_multipart=True)
+
+        mock_pool.assert_called_once_with(3)
+
+    @skipIf(filechunkio is None, 'need filechunkio')
+    def test_upload_parts_one_at_a_time(self):
+        runner = EMRJobRunner(cloud_max_concurrent_uploads=1,
+                              cloud_upload_part_size=self.PART_SIZE_IN_MB)
+
+        data = b'Mew' * 40
+
+        with patch('mrjob.emr.ThreadPool') as mock_pool:
+            self.assert_upload_succeeds(runner, data, expect_multipart=True)
+
+        self.assertFalse(mock_pool.called)
+
+    @skipIf(filechunkio is None, 'need filechunkio')
+    def test_retry_parts(self):
+        runner = EMRJobRunner(cloud_upload_part_size=self.PART_SIZE_IN_MB)
+
+        data = b'Mew' * 40
+
+        real_upload_part_from_file = MockMultiPartUpload.upload_part_from_file
+        failed_parts = set()
+
+        def flaky_upload_part_from_file(mpul, fp, part_num):
+            if part_num not in failed_parts:
+                failed_parts.add(part_num)
+                raise IOError
+
+            return real_upload_part_from_file(mpul, fp, part_num)
+
+        with patch.object(MockMultiPartUpload, 'upload_part_from_file',
+                          flaky_upload_part_from_file):
+            with logger_disabled('mrjob.emr'):
+                self.assert_upload_succeeds(runner, data,
+                                            expect_multipart=True)
+
+        self.assertEqual(failed_parts, set([1, 2, 3]))
+
+    @skipIf(filechunkio is None, 'need filechunkio')
+    def test_part_fails_too_many_times(self):
+        runner = EMRJobRunner(cloud_upload_part_size=self.PART_SIZE_IN_MB)
+
+        data = b'Mew' * 40
+
+        with patch.object(MockMultiPartUpload, 'upload_part_from_file',
+                          side_effect=IOError) as mock_upload_part:
+            with logger_disabled('mrjob.emr'):
+                self.assertRaises(IOError, self.upload_data, runner, data)
+
+        # every part is tried, even though all of them fail
+        self.assertEqual(mock_upload_part.call_count,
+                         3 * _UPLOAD_PART_MAX_TRIES)
+
+        s3_key = runner.fs.get_s3_key(self.TEST_S3_URI)
+        self.assertTrue(s3_key.mock_multipart_upload_was_cancelled())
+
+    def test_upload_many_files(self):
+        runner = EMRJobRunner(cloud_upload_part_size=self.PART_SIZE_IN_MB)
+
+        path_to_data = {}
+        for i in range(10):
+            path = self.makefile('%d.dat' % i, b'Mew' * 10 * i)
+            runner._upload_mgr.add(path)
+            path_to_data[path] = b'Mew' * 10 * i
+
+        with patch('mrjob.emr.ThreadPool',
+                   wraps=mrjob.emr.ThreadPool) as mock_pool:
+            runner._upload_local_files_to_s3()
+
+        # one pool for files, one shared by parts of large files
+        self.assertEqual(mock_pool.call_count, 2)
+
+        for path, data in path_to_data.items():
+            s3_key = runner.fs.get_s3_key(runner._upload_mgr.uri(path))
+            self.assertEqual(s3_key.get_contents_as_string(), data)
+
+
+class FSCacheTestCase(MockBotoTestCase):
+
+    def test_no_cache_by_default(self):
+        runner = EMRJobRunner()
+        self.assertIsNone(runner.fs._cache)
+
+    def test_fs_cache_secs(self):
+        self.add_mock_s3_data({'walrus': {'data/foo': b'foo\n'}})
+
+        runner = EMRJobRunner(fs_cache_secs=60)
+        self.assertIsNotNone(runner.fs._cache)
+
+        self.assertEqual(list(runner.fs.ls('s3://walrus/data')),
+                         ['s3://walrus/data/foo'])
+
+        s3_fs = runner.fs.filesystems[0]
+
+        with patch.object(s3_fs, 'ls') as mock_ls:
+            self.assertEqual(list(runner.fs.ls('s3://walrus/data')),
+                             ['s3://walrus/data/foo'])
+            self.assertFalse(mock_ls.called)
+
+    def test_uploads_invalidate_cache(self):
+        runner = EMRJobRunner(fs_cache_secs=60)
+
+        path = self.makefile('foo.dat', b'foo\n')
+        runner._upload_mgr.add(path)
+        s3_uri = runner._upload_mgr.uri(path)
+
+        runner._create_s3_tmp_bucket_if_needed()
+        self.assertFalse(runner.fs.exists(s3_uri))
+
+        runner._upload_local_files_to_s3()
+
+        self.assertTrue(runner.fs.exists(s3_uri))
+
+    def test_each_finished_step_clears_cache(self):
+        with self.make_runner('--fs-cache-secs', '60') as runner:
+            with patch.object(runner.fs, '_clear_cache',
+                              wraps=runner.fs._clear_cache) as mock_clear:
+                runner.run()
+
+            # MRTwoStepJob has two steps
+            self.assertEqual(mock_clear.call_count, 2)
+
 
 class SecurityTokenTestCase(MockBotoTestCase):
 
@@ -20,6 +20,7 @@
 import gzip
 import os
 import os.path
+import zlib
 from io import BytesIO
 
 from mrjob import conf
@@ -27,13 +28,18 @@ from mrjob.fs.base import Filesystem
 from mrjob.inline import InlineMRJobRunner
 from mrjob.job import MRJob
 from mrjob.protocol import JSONValueProtocol
+from mrjob.protocol import MsgpackProtocol
+from mrjob.protocol import _TypedBytesToLinesWriter
+from mrjob.protocol import _typedbytes_line_to_record
 from mrjob.sim import _error_on_bad_paths
 from mrjob.step import MRStep
+from tests.mr_input_split_job import MRInputSplitJob
 from tests.mr_no_mapper import MRNoMapper
 from tests.mr_test_cmdenv import MRTestCmdenv
 from tests.mr_test_jobconf import MRTestJobConf
 from tests.mr_test_per_step_jobconf import MRTestPerStepJobConf
 from tests.mr_two_step_job import MRTwoStepJob
+from tests.mr_typed_bytes_job import MRTypedBytesJob
 from tests.mr_word_count import MRWordCount
 from tests.py2 import TestCase
 from tests.py2 import mock
@@ -81,11 +87,319 @@ class InlineMRJobRunnerEndToEndTestCase(SandboxedTestCase):
         self.assertEqual(sorted(results),
                          [(1, 'qux'), (2, 'bar'), (2, 'foo'), (5, None)])
 
+    def test_dont_split_deflate(self):
+        input_deflate_path = os.path.join(self.tmp_dir, 'input.deflate')
+        with open(input_deflate_path, 'wb') as f:
+            f.write(zlib.compress(b''.join(
+                ('%05d foo\n' % i).encode('ascii') for i in range(20000))))
+
+        mr_job = MRWordCount(['-r', 'inline',
+                              '--jobconf=mapred.map.tasks=8',
+                              input_deflate_path])
+        mr_job.sandbox()
+
+        with mr_job.make_runner() as runner:
+            runner.run()
+
+            self.assertEqual(
+                [mr_job.parse_output_line(line)
+                 for line in runner.stream_output()],
+                [(input_deflate_path, 40000)])
+
     def test_missing_input(self):
         runner = InlineMRJobRunner(input_paths=['/some/bogus/file/path'])
         self.assertRaises(Exception, runner._run)
 
 
+class MRPidJob(MRJob):
+    """Report which processes our mapper and reducer tasks ran in."""
+
+    def mapper(self, _, value):
+        self.increment_counter('lines', 'mapped')
+        yield 'mapper', os.getpid()
+
+    def reducer(self, key, pids):
+        for pid in set(pids):
+            yield key, pid
+        yield 'reducer', os.getpid()
+
+
+class MRBadReducerJob(MRJob):
+
+    def reducer(self, key, values):
+        self.increment_counter('reducer', 'keys')
+        raise ValueError('no reducing allowed')
+
+
+class InlineMaxConcurrentTasksTestCase(SandboxedTestCase):
+
+    def run_pid_job(self, *args):
+        mr_job = MRPidJob(['-r', 'inline',
+                           '--jobconf=mapred.map.tasks=3',
+                           '--jobconf=mapred.reduce.tasks=2',
+                           '-'] + list(args))
+        mr_job.sandbox(stdin=BytesIO(b'a\nb\nc\nd\ne\nf\n'))
+
+        pids = {}
+
+        with mr_job.make_runner() as runner:
+            runner.run()
+
+            for line in runner.stream_output():
+                key, pid = mr_job.parse_output_line(line)
+                pids.setdefault(key, set()).add(pid)
+
+            self.assertEqual(runner.counters(),
+                             [{'lines': {'mapped': 6}}])
+            self.assertEqual(runner._pool, None)
+
+        return pids
+
+    def test_default_is_one_process(self):
+        pids = self.run_pid_job()
+
+        self.assertEqual(pids, {'mapper': set([os.getpid()]),
+                                'reducer': set([os.getpid()])})
+
+    def test_worker_processes(self):
+        pids = self.run_pid_job('--inline-max-concurrent-tasks', '2')
+
+        self.assertNotIn(os.getpid(), pids['mapper'])
+        self.assertNotIn(os.getpid(), pids['reducer'])
+        self.assertLessEqual(len(pids['mapper'] | pids['reducer']), 2)
+
+    def test_exceptions_are_reraised(self):
+        mr_job = MRBadReducerJob(['-r', 'inline',
+                                  '--inline-max-concurrent-tasks', '2', '-'])
+        mr_job.sandbox(stdin=BytesIO(b'a\nb\n'))
+
+        with mr_job.make_runner() as runner:
+            self.assertRaises(ValueError, runner.run)
+            self.assertEqual(runner._pool, None)
+
+    def test_log_traceback_and_keep_counters(self):
+        mr_job = MRBadReducerJob(['-r', 'inline',
+                                  '--inline-max-concurrent-tasks', '2', '-'])
+        mr_job.sandbox(stdin=BytesIO(b'a\nb\n'))
+
+        log = self.start(patch('mrjob.inline.log'))
+
+        with mr_job.make_runner() as runner:
+            self.assertRaises(ValueError, runner.run)
+
+            self.assertEqual(runner.counters(),
+                             [{'reducer': {'keys': 1}}])
+
+        logged = '\n'.join(args[0] for args, _ in log.error.call_args_list)
+        self.assertIn('Traceback', logged)
+        self.assertIn("raise ValueError('no reducing allowed')", logged)
+
+    def test_must_be_positive(self):
+        self.assertRaises(ValueError, InlineMRJobRunner,
+                          conf_paths=[], inline_max_concurrent_tasks=0)
+
+
+class InlineMapSortBufferTestCase(SandboxedTestCase):
+
+    # this class is also used to test local mode
+    RUNNER = 'inline'
+
+    def run_word_count(self, *args):
+        input_path = os.path.join(self.tmp_dir, 'input')
+        with open(input_path, 'wb') as input_file:
+            input_file.write(b'one two three four five\n' * 20)
+
+        mr_job = MRWordCount(['-r', self.RUNNER,
+                              '--jobconf=mapred.map.tasks=2',
+                              input_path] + list(args))
+        mr_job.sandbox()
+
+        with mr_job.make_runner() as runner:
+            runner.run()
+
+            results = [mr_job.parse_output_line(line)
+                       for line in runner.stream_output()]
+
+            self.assertEqual(results, [(input_path, 100)])
+
+            return runner.counters()[0]['count']['combiners']
+
+    def test_combine_once_per_task(self):
+        self.assertEqual(self.run_word_count(), 2)
+
+    def test_spill(self):
+        self.start(patch('mrjob.sim.SimMRJobRunner._map_sort_buffer_size',
+                         return_value=200))
+
+        # combiner runs on each spill, and again on the merged spills
+        self.assertGreater(self.run_word_count(), 2)
+
+    def test_io_sort_mb(self):
+        mr_job = MRWordCount(['-r', self.RUNNER,
+                              '--jobconf', 'mapreduce.task.io.sort.mb=7'])
+        mr_job.sandbox()
+
+        with mr_job.make_runner() as runner:
+            self.assertEqual(runner._map_sort_buffer_size(0), 7 * 1024 * 1024)
+
+    def test_default_io_sort_mb(self):
+        mr_job = MRWordCount(['-r', self.RUNNER])
+        mr_job.sandbox()
+
+        with mr_job.make_runner() as runner:
+            self.assertEqual(runner._map_sort_buffer_size(0),
+                             100 * 1024 * 1024)
+
+
+class InlinePipelineStepsTestCase(SandboxedTestCase):
+
+    # this class is also used to test local mode
+    RUNNER = 'inline'
+
+    def run_two_step_job(self, *args):
+        input_path = os.path.join(self.tmp_dir, 'input')
+        with open(input_path, 'wb') as input_file:
+            input_file.write(b'bar\nqux\nfoo\nbar\nqux\nfoo\n')
+
+        mr_job = MRTwoStepJob(['-r', self.RUNNER,
+                               '--jobconf=mapred.reduce.tasks=3',
+                               input_path] + list(args))
+        mr_job.sandbox()
+
+        with mr_job.make_runner() as runner:
+            # record which tasks start, in order
+            self.tasks_started = []
+            real_run_step = runner._run_step
+
+            def run_step(step_num, step_type, *args, **kwargs):
+                self.tasks_started.append((step_num, step_type))
+                return real_run_step(step_num, step_type, *args, **kwargs)
+
+            runner._run_step = run_step
+
+            runner.run()
+
+            results = [mr_job.parse_output_line(line)
+                       for line in runner.stream_output()]
+
+            return results, runner.counters()
+
+    def test_same_output_and_counters(self):
+        self.assertEqual(self.run_two_step_job('--pipeline-steps'),
+                         self.run_two_step_job())
+
+    def test_one_mapper_per_reducer(self):
+        self.run_two_step_job('--pipeline-steps',
+                              '--jobconf=mapred.map.tasks=10')
+        self.assertEqual(self.tasks_started.count((1, 'mapper')), 3)
+
+        # without pipelining, we split step 1's output normally
+        self.run_two_step_job('--jobconf=mapred.map.tasks=10')
+        self.assertGreater(self.tasks_started.count((1, 'mapper')), 3)
+
+
+class InlineMapOutputCompressionTestCase(SandboxedTestCase):
+
+    # this class is also used to test local mode
+    RUNNER = 'inline'
+
+    def run_word_count(self, *args):
+        input_path = os.path.join(self.tmp_dir, 'input')
+        with open(input_path, 'wb') as input_file:
+            input_file.write(b'one two three four five\n' * 20)
+
+        mr_job = MRWordCount(['-r', self.RUNNER,
+                              '--jobconf=mapred.map.tasks=2',
+                              input_path] + list(args))
+        mr_job.sandbox()
+
+        with mr_job.make_runner() as runner:
+            # record where tasks write their output, and the sorted
+            # partitions of mapper output that reducers read
+            self.output_paths = []
+            self.partition_paths = []
+            real_run_step = runner._run_step
+
+            def run_step(step_num, step_type, input_path, output_path,
+                         *args, **kwargs):
+                self.output_paths.append(output_path)
+                if step_type == 'reducer':
+                    self.partition_paths.extend(input_path)
+                return real_run_step(step_num, step_type, input_path,
+                                     output_path, *args, **kwargs)
+
+            runner._run_step = run_step
+
+            runner.run()
+
+            results = [mr_job.parse_output_line(line)
+                       for line in runner.stream_output()]
+
+            self.assertEqual(results, [(input_path, 100)])
+
+    def test_not_compressed_by_default(self):
+        self.run_word_count()
+        self.assertFalse(any(path.endswith('.deflate')
+                             for path in self.partition_paths))
+
+    def test_default_codec(self):
+        self.run_word_count(
+            '--jobconf', 'mapreduce.map.output.compress=true')
+
+        # partitions of mapper output are compressed, not final output
+        self.assertEqual(
+            [os.path.splitext(path)[1] for path in self.partition_paths],
+            ['.deflate'] * 4)
+        self.assertEqual(
+            [os.path.splitext(path)[1] for path in self.output_paths],
+            [''] * 4)
+
+    def test_gzip_codec(self):
+        self.run_word_count(
+            '--jobconf', 'mapred.compress.map.output=true',
+            '--jobconf', 'mapred.map.output.compression.codec='
+            'org.apache.hadoop.io.compress.GzipCodec')
+
+        self.assertTrue(self.partition_paths[0].endswith('.gz'))
+
+    def test_unknown_codec(self):
+        log = self.start(patch('mrjob.sim.log'))
+
+        self.run_word_count(
+            '--jobconf', 'mapreduce.map.output.compress=true',
+            '--jobconf', 'mapreduce.map.output.compress.codec=foo.BarCodec')
+
+        self.assertTrue(self.partition_paths[0].endswith('.deflate'))
+        self.assertEqual(log.warning.call_count, 1)
+
+
+class InlinePipelineStepsOrderTestCase(SandboxedTestCase):
+
+    def test_start_mappers_as_reducers_finish(self):
+        mr_job = MRTwoStepJob(['-r', 'inline', '--pipeline-steps',
+                               '--jobconf=mapred.reduce.tasks=2'])
+        mr_job.sandbox(stdin=BytesIO(b'foo\nbar\n'))
+
+        with mr_job.make_runner() as runner:
+            tasks_started = []
+            real_run_step = runner._run_step
+
+            def run_step(step_num, step_type, *args, **kwargs):
+                tasks_started.append((step_num, step_type))
+                return real_run_step(step_num, step_type, *args, **kwargs)
+
+            runner._run_step = run_step
+
+            runner.run()
+
+        # tasks in the inline runner finish as soon as they start
+        self.assertEqual(tasks_started, [
+            (0, 'mapper'), (0, 'mapper'),
+            (0, 'reducer'), (1, 'mapper'),
+            (0, 'reducer'), (1, 'mapper'),
+        ])
+
+
 class InlineMRJobRunnerCmdenvTest(EmptyMrjobConfTestCase):
 
     def test_cmdenv(self):
@@ -188,6 +502,119 @@ class InlineRunnerStepsTestCase(EmptyMrjobConfTestCase):
             self.assertEqual(output, [2, 3, 4])
 
 
+class MRMsgpackJob(MRJob):
+
+    INTERNAL_PROTOCOL = MsgpackProtocol
+
+    def mapper(self, _, line):
+        # 9 and 10 encode as a tab and a newline
+        for word in line.split():
+            yield [word, 9], 10
+
+    def reducer(self, key, values):
+        yield key[0], (key[1], sum(values))
+
+
+class InlineMsgpackProtocolTestCase(SandboxedTestCase):
+
+    def test_internal_protocol(self):
+        mr_job = MRMsgpackJob(['-r', 'inline',
+                               '--jobconf=mapred.reduce.tasks=2'])
+        mr_job.sandbox(stdin=BytesIO(b'foo bar\nfoo\n'))
+
+        with mr_job.make_runner() as runner:
+            runner.run()
+
+            self.assertEqual(
+                sorted(mr_job.parse_output_line(line)
+                       for line in runner.stream_output()),
+                [('bar', [9, 10]), ('foo', [9, 20])])
+
+
+class InlineTypedBytesProtocolTestCase(SandboxedTestCase):
+
+    # this class is also used to test local mode
+    RUNNER = 'inline'
+
+    def run_job(self, *args):
+        mr_job = MRTypedBytesJob(['-r', self.RUNNER,
+                                  '--jobconf=mapred.reduce.tasks=2'] +
+                                 list(args))
+        mr_job.sandbox(stdin=BytesIO(b'foo bar\nfoo\n'))
+
+        with mr_job.make_runner() as runner:
+            self.assertEqual(runner._get_step(0).get('shuffle_io'),
+                             'typedbytes')
+
+            runner.run()
+
+            self.assertEqual(
+                sorted(mr_job.parse_output_line(line)
+                       for line in runner.stream_output()),
+                [('bar', [9, 10]), ('foo', [9, 20])])
+
+    def test_internal_protocol(self):
+        self.run_job()
+
+    def test_shuffle_typed_bytes(self):
+        # mappers write typed bytes records, which we convert to lines to
+        # sort them, and back again for reducers
+        writer_class = self.start(patch(
+            'mrjob.inline._TypedBytesToLinesWriter',
+            side_effect=_TypedBytesToLinesWriter))
+        line_to_record = self.start(patch(
+            'mrjob.inline._typedbytes_line_to_record',
+            side_effect=_typedbytes_line_to_record))
+
+        self.run_job()
+
+        self.assertTrue(writer_class.called)
+        # one for each record the mappers wrote
+        self.assertEqual(line_to_record.call_count, 3)
+
+    def test_text_shuffle(self):
+        line_to_record = self.start(patch(
+            'mrjob.inline._typedbytes_line_to_record'))
+
+        # if the user tells us to pass lines, we pass lines
+        self.run_job('--jobconf', 'stream.map.output=text',
+                     '--jobconf', 'stream.reduce.input=text')
+
+        self.assertFalse(line_to_record.called)
+
+
+class MRAggregateWordCount(MRJob):
+
+    # small enough that some words get spilled more than once
+    MAPPER_AGGREGATE_SIZE = 2
+
+    def mapper(self, _, line):
+        for word in line.split():
+            yield word, 1
+
+    def mapper_aggregate(self, count1, count2):
+        return count1 + count2
+
+    def reducer(self, word, counts):
+        yield word, sum(counts)
+
+
+class InlineMapperAggregateTestCase(SandboxedTestCase):
+
+    def test_word_count(self):
+        mr_job = MRAggregateWordCount(['-r', 'inline',
+                                       '--jobconf=mapred.reduce.tasks=2'])
+        mr_job.sandbox(stdin=BytesIO(b'a b c a\nb a d\na c\n'))
+
+        with mr_job.make_runner() as runner:
+            runner.run()
+
+            self.assertEqual(
+                sorted(mr_job.parse_output_line(line)
+                       for line in runner.stream_output()),
+                [('a', 4), ('b', 2), ('c', 2), ('d', 1)])
+
+
 class MRJobFileOptionsTestCase(SandboxedTestCase):
 
     def setUp(self):
@@ -261,6 +688,42 @@ class InlineMRJobRunnerJobConfTestCase(SandboxedTestCase):
         self.assertEqual(sorted(results),
                          [(input_path, 3), (input_gz_path, 1)])
 
+    def test_mappers_read_byte_ranges(self):
+        input_path = os.path.join(self.tmp_dir, 'input')
+        lines = [('%d' % i).encode('ascii') * i + b'\n' for i in range(20)]
+        with open(input_path, 'wb') as input_file:
+            input_file.write(b''.join(lines))
+
+        mr_job = MRInputSplitJob(['-r', self.RUNNER,
+                                  '--jobconf=mapred.map.tasks=4',
+                                  input_path])
+        mr_job.sandbox()
+
+        results = []
+
+        with mr_job.make_runner() as runner:
+            runner.run()
+
+            for line in runner.stream_output():
+                results.append(mr_job.parse_output_line(line))
+
+        self.assertEqual(len(set(tuple(split) for split, _ in results)), 4)
+
+        # each line was read once, by the split it starts in
+        self.assertEqual(sorted(line for _, line in results),
+                         sorted(line.decode('ascii').rstrip('\n')
+                                for line in lines))
+
+        offsets = {}
+        offset = 0
+        for line in lines:
+            offsets[line.decode('ascii').rstrip('\n')] = offset
+            offset += len(line)
+
+        for (start, length), line in results:
+            self.assertGreaterEqual(offsets[line], start)
+            self.assertLess(offsets[line], start + length)
+
     def test_jobconf_simulated_by_runner(self):
         input_path = os.path.join(self.tmp_dir, 'input')
         with open(input_path, 'wb') as input_file:
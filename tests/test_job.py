@@ -27,6 +27,7 @@ from mrjob.conf import combine_envs
 from mrjob.job import MRJob
 from mrjob.job import UsageError
 from mrjob.job import _im_func
+import mrjob.job
 from mrjob.parse import parse_mr_job_stderr
 from mrjob.protocol import JSONProtocol
 from mrjob.protocol import JSONValueProtocol
@@ -35,6 +36,10 @@ from mrjob.protocol import RawValueProtocol
 from mrjob.protocol import ReprProtocol
 from mrjob.protocol import ReprValueProtocol
 from mrjob.protocol import StandardJSONProtocol
+from mrjob.protocol import TypedBytesProtocol
+from mrjob.protocol import _read_typedbytes_records
+from mrjob.protocol import _typedbytes_dumps
+from mrjob.protocol import _typedbytes_loads
 from mrjob.py2 import StringIO
 from mrjob.step import _IDENTITY_MAPPER
 from mrjob.step import _IDENTITY_REDUCER
@@ -52,6 +57,7 @@ from tests.py2 import Mock
 from tests.py2 import MagicMock
 from tests.py2 import TestCase
 from tests.py2 import patch
+from tests.py2 import skipIf
 from tests.quiet import logger_disabled
 from tests.quiet import no_handlers_for_logger
 from tests.sandbox import EmptyMrjobConfTestCase
@@ -208,6 +214,73 @@ class CountersAndStatusTestCase(TestCase):
                           'girl; interrupted': {'movie': 1}})
 
 
+class MRCountingJob(MRJob):
+
+    def mapper(self, _, line):
+        self.increment_counter('Lines', 'mapped')
+        if line == 'boom':
+            raise ValueError('boom')
+        yield line, 1
+
+
+class BufferedCountersTestCase(TestCase):
+
+    def _counter_lines(self, mr_job):
+        return [line for line in mr_job.stderr.getvalue().splitlines()
+                if line.startswith(b'reporter:counter:')]
+
+    def test_summed_while_running_task(self):
+        mr_job = MRCountingJob(['--mapper']).sandbox(
+            stdin=BytesIO(b'a\nb\nc\n'))
+        mr_job.run_mapper()
+
+        self.assertEqual(self._counter_lines(mr_job),
+                         [b'reporter:counter:Lines,mapped,3'])
+
+    def test_flush_interval(self):
+        # the clock advances 6 seconds every time we check it
+        now = [0]
+
+        def fake_time():
+            now[0] += 6
+            return now[0]
+
+        mr_job = MRCountingJob(['--mapper']).sandbox(
+            stdin=BytesIO(b'a\nb\nc\nd\ne\n'))
+
+        with patch('mrjob.job.time.time', side_effect=fake_time):
+            mr_job.run_mapper()
+
+        self.assertEqual(self._counter_lines(mr_job),
+                         [b'reporter:counter:Lines,mapped,2',
+                          b'reporter:counter:Lines,mapped,2',
+                          b'reporter:counter:Lines,mapped,1'])
+
+    def test_no_flush_interval(self):
+        class MRUnbufferedCountingJob(MRCountingJob):
+            COUNTER_FLUSH_INTERVAL = 0
+
+        mr_job = MRUnbufferedCountingJob(['--mapper']).sandbox(
+            stdin=BytesIO(b'a\nb\n'))
+        mr_job.run_mapper()
+
+        self.assertEqual(self._counter_lines(mr_job),
+                         [b'reporter:counter:Lines,mapped,1'] * 2)
+
+    def test_flushed_when_task_fails(self):
+        mr_job = MRCountingJob(['--mapper']).sandbox(
+            stdin=BytesIO(b'a\nboom\nc\n'))
+        self.assertRaises(ValueError, mr_job.run_mapper)
+
+        self.assertEqual(self._counter_lines(mr_job),
+                         [b'reporter:counter:Lines,mapped,2'])
+
+        # outside the task, counters are written immediately
+        mr_job.increment_counter('Lines', 'other')
+        self.assertEqual(self._counter_lines(mr_job)[-1],
+                         b'reporter:counter:Lines,other,1')
+
+
 class ProtocolsTestCase(TestCase):
     # not putting these in their own files because we're not going to invoke
     # it as a script anyway.
@@ -306,6 +379,501 @@ class ProtocolsTestCase(TestCase):
         self.assertEqual(mr_job.stdout.getvalue(),
                          RAW_INPUT.getvalue())
 
+    def test_decode_input_in_batches(self):
+        RAW_INPUT = BytesIO(b'foo\nbar\nbaz\nqux\r\nquux\n')
+
+        mr_job = MRBoringJob(['--mapper'])
+        mr_job.sandbox(stdin=RAW_INPUT)
+
+        with patch('mrjob.job._PROTOCOL_BATCH_SIZE', 2):
+            with patch.object(RawValueProtocol, 'read_many', autospec=True,
+                              side_effect=RawValueProtocol.read_many) as m:
+                mr_job.run_mapper()
+
+        self.assertEqual(m.call_count, 3)
+
+        self.assertEqual(mr_job.stdout.getvalue(),
+                         b'null\t"foo"\n' +
+                         b'null\t"bar"\n' +
+                         b'null\t"baz"\n' +
+                         b'null\t"qux"\n' +
+                         b'null\t"quux"\n')
+
+    def test_decode_cache_counters(self):
+        class MRDecodeCacheJob(MRBoringJob):
+
+            def internal_protocol(self):
+                return JSONProtocol(decode_cache_size=10)
+
+        JSON_INPUT = BytesIO(b'"foo"\t"bar"\n' +
+                             b'"foo"\t"bar"\n' +
+                             b'"baz"\t"bar"\n')
+
+        mr_job = MRDecodeCacheJob(['--reducer'])
+        mr_job.sandbox(stdin=JSON_INPUT)
+        mr_job.run_reducer()
+
+        self.assertEqual(
+            parse_mr_job_stderr(mr_job.stderr.getvalue())['counters'],
+            {'Protocol decode cache': {'hits': 2, 'misses': 3}})
+
+    def test_no_decode_cache_counters_by_default(self):
+        mr_job = MRBoringJob(['--reducer'])
+        mr_job.sandbox(stdin=BytesIO(b'"foo"\t"bar"\n'))
+        mr_job.run_reducer()
+
+        self.assertEqual(
+            parse_mr_job_stderr(mr_job.stderr.getvalue())['counters'], {})
+
+    def test_write_output_in_batches(self):
+        RAW_INPUT = BytesIO(b'foo\nbar\nbaz\n')
+
+        stdout = Mock(wraps=BytesIO())
+
+        mr_job = MRBoringJob(['--mapper'])
+        mr_job.sandbox(stdin=RAW_INPUT, stdout=stdout)
+
+        # each line is 11 bytes
+        mr_job.OUTPUT_BUFFER_SIZE = 20
+        mr_job.run_mapper()
+
+        self.assertEqual(
+            stdout.write.call_args_list,
+            [((b'null\t"foo"\nnull\t"bar"\n',),),
+             ((b'null\t"baz"\n',),)])
+
+        self.assertEqual(mr_job.output_stats(), dict(bytes=33, records=3))
+
+    def test_no_output_buffer(self):
+        stdout = Mock(wraps=BytesIO())
+
+        mr_job = MRBoringJob(['--mapper'])
+        mr_job.sandbox(stdin=BytesIO(b'foo\nbar\n'), stdout=stdout)
+        mr_job.OUTPUT_BUFFER_SIZE = 0
+        mr_job.run_mapper()
+
+        self.assertEqual(
+            stdout.write.call_args_list,
+            [((b'null\t"foo"\n',),), ((b'null\t"bar"\n',),)])
+
+    def test_no_output_stats_before_task(self):
+        self.assertEqual(MRBoringJob().output_stats(), {})
+
+    def test_flush_output_before_final(self):
+        class MRRawFinalJob(MRBoringJob):
+
+            def mapper_final(self):
+                self.stdout.write(b'raw\n')
+                yield 'final', 'line'
+
+        mr_job = MRRawFinalJob(['--mapper'])
+        mr_job.sandbox(stdin=BytesIO(b'foo\n'))
+        mr_job.run_mapper()
+
+        self.assertEqual(mr_job.stdout.getvalue(),
+                         b'null\t"foo"\nraw\n"final"\t"line"\n')
+        self.assertEqual(mr_job.output_stats(), dict(bytes=26, records=2))
+
+    def test_flush_output_when_task_fails(self):
+        class MRFailingJob(MRBoringJob):
+
+            def mapper(self, key, value):
+                if value == 'boom':
+                    raise ValueError('boom')
+                yield key, value
+
+        mr_job = MRFailingJob(['--mapper'])
+        mr_job.sandbox(stdin=BytesIO(b'foo\nboom\nbar\n'))
+        self.assertRaises(ValueError, mr_job.run_mapper)
+
+        self.assertEqual(mr_job.stdout.getvalue(), b'null\t"foo"\n')
+
+
+class MRBatchJob(MRJob):
+
+    def mapper_batch(self, keys, values):
+        yield values, [len(v) for v in values]
+
+    def reducer_batch(self, key, value_batches):
+        value_batches = list(value_batches)
+        yield [key], [[len(vs) for vs in value_batches]]
+
+
+class CountingJSONProtocol(JSONProtocol):
+
+    values_read = 0
+
+    def read_value(self, raw_value):
+        CountingJSONProtocol.values_read += 1
+        return super(CountingJSONProtocol, self).read_value(raw_value)
+
+
+class MRFirstValueJob(MRJob):
+
+    INTERNAL_PROTOCOL = CountingJSONProtocol
+    SORT_VALUES = True
+
+    def reducer(self, key, values):
+        yield key, next(values)
+
+
+class LazyValuesTestCase(TestCase):
+
+    INPUT = (b'"a"\t1\n"a"\t2\n"a"\t3\n' +
+             b'"b"\t4\n' +
+             b'"c"\t5\n"c"\t{bad}\n')
+
+    def setUp(self):
+        CountingJSONProtocol.values_read = 0
+
+    def run_reducer(self, mr_job, stdin=INPUT):
+        mr_job.sandbox(stdin=BytesIO(stdin))
+        mr_job.run_reducer()
+
+        return mr_job.stdout.getvalue()
+
+    def num_undecodable(self, mr_job):
+        # exception class names vary between Python versions
+        counters = parse_mr_job_stderr(mr_job.stderr.getvalue())['counters']
+        return sum(counters.get('Undecodable input', {}).values())
+
+    def test_only_decode_values_used(self):
+        mr_job = MRFirstValueJob(['--reducer'])
+
+        self.assertEqual(self.run_reducer(mr_job),
+                         b'"a"\t1\n"b"\t4\n"c"\t5\n')
+        self.assertEqual(CountingJSONProtocol.values_read, 3)
+
+        # we never got to the bad value
+        self.assertEqual(self.num_undecodable(mr_job), 0)
+
+    def test_all_values(self):
+        class MRAllValuesJob(MRFirstValueJob):
+
+            def reducer(self, key, values):
+                yield key, list(values)
+
+        mr_job = MRAllValuesJob(['--reducer', '--no-strict-protocols'])
+
+        self.assertEqual(self.run_reducer(mr_job),
+                         b'"a"\t[1, 2, 3]\n"b"\t[4]\n"c"\t[5]\n')
+        self.assertEqual(CountingJSONProtocol.values_read, 6)
+        self.assertEqual(self.num_undecodable(mr_job), 1)
+
+    def test_bad_value_strict(self):
+        class MRAllValuesJob(MRFirstValueJob):
+
+            def reducer(self, key, values):
+                yield key, list(values)
+
+        mr_job = MRAllValuesJob(['--reducer', '--strict-protocols'])
+        self.assertRaises(ValueError, self.run_reducer, mr_job)
+
+    def test_bad_key(self):
+        mr_job = MRFirstValueJob(['--reducer', '--no-strict-protocols'])
+
+        self.assertEqual(
+            self.run_reducer(mr_job, b'"a"\t1\nbad\t2\n"b"\t3\n'),
+            b'"a"\t1\n"b"\t3\n')
+        self.assertEqual(self.num_undecodable(mr_job), 1)
+
+    def test_no_lazy_values_without_sort_values(self):
+        class MRUnsortedFirstValueJob(MRFirstValueJob):
+            SORT_VALUES = False
+
+        mr_job = MRUnsortedFirstValueJob(['--reducer',
+                                          '--no-strict-protocols'])
+
+        self.assertEqual(self.run_reducer(mr_job),
+                         b'"a"\t1\n"b"\t4\n"c"\t5\n')
+        self.assertEqual(CountingJSONProtocol.values_read, 0)
+        self.assertEqual(self.num_undecodable(mr_job), 1)
+
+
+class BatchTestCase(TestCase):
+
+    def test_steps(self):
+        job = MRBatchJob()
+        self.assertEqual(job.steps(),
+                         [MRStep(mapper_batch=job.mapper_batch,
+                                 reducer_batch=job.reducer_batch)])
+
+    def test_mapper_batch(self):
+        mr_job = MRBatchJob(['--mapper'])
+        mr_job.sandbox(stdin=BytesIO(b'a\nbb\nccc\n'))
+
+        with patch('mrjob.job._PROTOCOL_BATCH_SIZE', 2):
+            with patch.object(mr_job, 'mapper_batch',
+                              side_effect=mr_job.mapper_batch) as m:
+                mr_job.run_mapper()
+
+        self.assertEqual(m.call_args_list,
+                         [(([None, None], ['a', 'bb']),),
+                          (([None], ['ccc']),)])
+
+        self.assertEqual(mr_job.stdout.getvalue(),
+                         b'"a"\t1\n"bb"\t2\n"ccc"\t3\n')
+
+    def test_reducer_batch(self):
+        # "foo" has five values, which should be split into batches
+        JSON_INPUT = BytesIO(b'"bar"\t1\n' + b'"foo"\t1\n' * 5 +
+                             b'"qux"\t1\n')
+
+        mr_job = MRBatchJob(['--reducer'])
+        mr_job.sandbox(stdin=JSON_INPUT)
+
+        with patch('mrjob.job._PROTOCOL_BATCH_SIZE', 2):
+            mr_job.run_reducer()
+
+        self.assertEqual(mr_job.stdout.getvalue().replace(b' ', b''),
+                         b'"bar"\t[1]\n"foo"\t[2,2,1]\n"qux"\t[1]\n')
+
+    def test_mismatched_batch(self):
+        class MRBadBatchJob(MRJob):
+
+            def mapper_batch(self, keys, values):
+                yield values, []
+
+        mr_job = MRBadBatchJob(['--mapper'])
+        mr_job.sandbox(stdin=BytesIO(b'a\n'))
+
+        self.assertRaises(ValueError, mr_job.run_mapper)
+
+    def test_bad_output_still_counted(self):
+        class MRSetBatchJob(MRJob):
+
+            def mapper_batch(self, keys, values):
+                yield values, [set()] + values[1:]
+
+        mr_job = MRSetBatchJob(['--mapper', '--no-strict-protocols'])
+        mr_job.sandbox(stdin=BytesIO(b'a\nb\n'))
+        mr_job.run_mapper()
+
+        self.assertEqual(mr_job.stdout.getvalue(), b'"b"\t"b"\n')
+        self.assertEqual(
+            parse_mr_job_stderr(mr_job.stderr.getvalue())['counters'],
+            {'Unencodable output': {'TypeError': 1}})
+
+    @skipIf(mrjob.job.numpy is None, 'numpy module not installed')
+    def test_batch_arrays(self):
+        class MRSumJob(MRJob):
+            INPUT_PROTOCOL = JSONValueProtocol
+            BATCH_ARRAYS = True
+
+            def mapper_batch(self, keys, values):
+                yield values * 2, values + 1
+
+        mr_job = MRSumJob(['--mapper'])
+        mr_job.sandbox(stdin=BytesIO(b'1\n2\n'))
+        mr_job.run_mapper()
+
+        self.assertEqual(mr_job.stdout.getvalue(), b'2\t2\n4\t3\n')
+
+    def test_batch_arrays_requires_numpy(self):
+        class MRArrayJob(MRBatchJob):
+            BATCH_ARRAYS = True
+
+        mr_job = MRArrayJob(['--mapper'])
+        mr_job.sandbox(stdin=BytesIO(b'a\n'))
+
+        with patch('mrjob.job.numpy', None):
+            self.assertRaises(ImportError, mr_job.run_mapper)
+
+
+class MRAggregateWordCount(MRJob):
+
+    def mapper(self, _, line):
+        for word in line.split():
+            yield word, 1
+
+    def mapper_aggregate(self, count1, count2):
+        return count1 + count2
+
+    def reducer(self, word, counts):
+        yield word, sum(counts)
+
+
+class MapperAggregateTestCase(TestCase):
+
+    def _mapper_output(self, mr_job, stdin):
+        mr_job.sandbox(stdin=BytesIO(stdin))
+        mr_job.run_mapper()
+
+        return sorted(mr_job.parse_output_line(line)
+                      for line in mr_job.stdout.getvalue().splitlines())
+
+    def test_steps(self):
+        job = MRAggregateWordCount()
+        self.assertEqual(job.steps(),
+                         [MRStep(mapper=job.mapper,
+                                 mapper_aggregate=job.mapper_aggregate,
+                                 reducer=job.reducer)])
+
+    def test_aggregate(self):
+        self.assertEqual(
+            self._mapper_output(MRAggregateWordCount(['--mapper']),
+                                b'a b a\nc a b\n'),
+            [('a', 3), ('b', 2), ('c', 1)])
+
+    def test_empty(self):
+        self.assertEqual(
+            self._mapper_output(MRAggregateWordCount(['--mapper']), b''),
+            [])
+
+    def test_spill_least_recently_used(self):
+        class MRSmallAggregateJob(MRAggregateWordCount):
+            MAPPER_AGGREGATE_SIZE = 4
+
+        # generations hold two keys each. "a" keeps getting used, so it's
+        # held on to, but "b" gets spilled
+        self.assertEqual(
+            self._mapper_output(MRSmallAggregateJob(['--mapper']),
+                                b'a b\na c\na d\na b\n'),
+            [('a', 4), ('b', 1), ('b', 1), ('c', 1), ('d', 1)])
+
+    def test_keys_of_different_types(self):
+        class MRTypesJob(MRAggregateWordCount):
+
+            def mapper(self, _, line):
+                for key in (1, 1.0, True, '1', 1):
+                    yield key, 1
+
+        mr_job = MRTypesJob(['--mapper'])
+        mr_job.sandbox(stdin=BytesIO(b'x\n'))
+        mr_job.run_mapper()
+
+        self.assertEqual(sorted(mr_job.stdout.getvalue().splitlines()),
+                         [b'"1"\t1', b'1\t2', b'1.0\t1', b'true\t1'])
+
+    def test_unhashable_keys(self):
+        class MRListKeyJob(MRAggregateWordCount):
+
+            def mapper(self, _, line):
+                yield line.split(), 1
+
+        self.assertEqual(
+            self._mapper_output(MRListKeyJob(['--mapper']),
+                                b'a b\na b\n'),
+            [(['a', 'b'], 1), (['a', 'b'], 1)])
+
+    def test_mapper_init_and_final(self):
+        class MRInitFinalJob(MRAggregateWordCount):
+
+            def mapper_init(self):
+                yield 'lines', 0
+
+            def mapper(self, _, line):
+                yield 'lines', 1
+
+            def mapper_final(self):
+                yield 'lines', 100
+
+        self.assertEqual(
+            self._mapper_output(MRInitFinalJob(['--mapper']),
+                                b'x\ny\n'),
+            [('lines', 102)])
+
+    def test_mapper_batch(self):
+        class MRBatchAggregateJob(MRJob):
+
+            def mapper_batch(self, keys, values):
+                yield values, [1] * len(values)
+
+            def mapper_aggregate(self, count1, count2):
+                return count1 + count2
+
+        self.assertEqual(
+            self._mapper_output(MRBatchAggregateJob(['--mapper']),
+                                b'a\nb\na\n'),
+            [('a', 2), ('b', 1)])
+
+    def test_unencodable_output_counted(self):
+        class MRSetAggregateJob(MRAggregateWordCount):
+
+            def mapper(self, _, line):
+                yield line, set([line])
+
+            def mapper_aggregate(self, value1, value2):
+                return value1 | value2
+
+        mr_job = MRSetAggregateJob(['--mapper', '--no-strict-protocols'])
+        self.assertEqual(self._mapper_output(mr_job, b'a\na\nb\n'), [])
+        self.assertEqual(
+            parse_mr_job_stderr(mr_job.stderr.getvalue())['counters'],
+            {'Unencodable output': {'TypeError': 2}})
+
+
+class TypedBytesShuffleTestCase(TestCase):
+
+    class MRTypedBytesJob(MRJob):
+        INTERNAL_PROTOCOL = TypedBytesProtocol
+
+        def mapper(self, _, line):
+            yield line, 1
+
+        def reducer(self, key, values):
+            yield key, sum(values)
+
+    class MRTypedBytesCombinerJob(MRTypedBytesJob):
+
+        def combiner(self, key, values):
+            yield key, sum(values)
+
+    class MRTypedBytesSortValuesJob(MRTypedBytesJob):
+        SORT_VALUES = True
+
+    def decode_records(self, data):
+        return [(_typedbytes_loads(k), _typedbytes_loads(v))
+                for k, v in _read_typedbytes_records([data])]
+
+    def test_steps_desc(self):
+        self.assertEqual(
+            self.MRTypedBytesJob()._steps_desc()[0].get('shuffle_io'),
+            'typedbytes')
+
+    def test_not_with_other_protocols(self):
+        self.assertNotIn('shuffle_io', MRBoringJob()._steps_desc()[0])
+
+    def test_not_with_combiner(self):
+        self.assertNotIn('shuffle_io',
+                         self.MRTypedBytesCombinerJob()._steps_desc()[0])
+
+    def test_not_with_sort_values(self):
+        self.assertNotIn('shuffle_io',
+                         self.MRTypedBytesSortValuesJob()._steps_desc()[0])
+
+    def test_mapper_writes_lines_by_default(self):
+        mr_job = self.MRTypedBytesJob(['--mapper'])
+        mr_job.sandbox(stdin=BytesIO(b'foo\nbar\n'))
+        mr_job.run_mapper()
+
+        lines = mr_job.stdout.getvalue().splitlines()
+        self.assertEqual([TypedBytesProtocol().read(line) for line in lines],
+                         [('foo', 1), ('bar', 1)])
+
+    def test_mapper_writes_typedbytes(self):
+        mr_job = self.MRTypedBytesJob(['--mapper'])
+        mr_job.sandbox(stdin=BytesIO(b'foo\nbar\n'))
+
+        with patch.dict('os.environ', stream_map_output='typedbytes'):
+            mr_job.run_mapper()
+
+        self.assertEqual(self.decode_records(mr_job.stdout.getvalue()),
+                         [('foo', 1), ('bar', 1)])
+
+    def test_reducer_reads_typedbytes(self):
+        data = b''.join(_typedbytes_dumps(k) + _typedbytes_dumps(v)
+                        for k, v in [(u'bar', 1), (u'foo', 1), (u'foo', 2)])
+
+        mr_job = self.MRTypedBytesJob(['--reducer'])
+        mr_job.sandbox(stdin=BytesIO(data))
+
+        with patch.dict('os.environ', stream_reduce_input='typedbytes'):
+            mr_job.run_reducer()
+
+        self.assertEqual(mr_job.stdout.getvalue(),
+                         b'"bar"\t1\n"foo"\t3\n')
+
 
 class StrictProtocolsTestCase(EmptyMrjobConfTestCase):
 
@@ -13,17 +13,25 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 """Tests for LocalMRJobRunner"""
+import bz2
+import glob
 import gzip
 import os
 import shutil
 import signal
 import stat
+import string
 import sys
 import tempfile
+import zlib
 from io import BytesIO
 
 import mrjob
+from mrjob.cat import _partition_for_key
+from mrjob.cat import gzip_index_path
+from mrjob.cat import read_split
 from mrjob.local import LocalMRJobRunner
+from mrjob.step import StepFailedException
 from mrjob.util import bash_wrap
 from mrjob.util import cmd_line
 from mrjob.util import read_file
@@ -33,6 +41,7 @@ from tests.mr_counting_job import MRCountingJob
 from tests.mr_exit_42_job import MRExit42Job
 from tests.mr_filter_job import FilterJob
 from tests.mr_job_where_are_you import MRJobWhereAreYou
+from tests.mr_slow_first_mapper_job import MRSlowFirstMapperJob
 from tests.mr_two_step_job import MRTwoStepJob
 from tests.mr_verbose_job import MRVerboseJob
 from tests.mr_word_count import MRWordCount
@@ -47,7 +56,11 @@ from tests.sandbox import SandboxedTestCase
 from tests.sandbox import mrjob_conf_patcher
 from tests.test_inline import InlineMRJobRunnerFSTestCase
 from tests.test_inline import InlineMRJobRunnerJobConfTestCase
+from tests.test_inline import InlineMapOutputCompressionTestCase
+from tests.test_inline import InlineMapSortBufferTestCase
 from tests.test_inline import InlineMRJobRunnerNoMapperTestCase
+from tests.test_inline import InlinePipelineStepsTestCase
+from tests.test_inline import InlineTypedBytesProtocolTestCase
 
 
 class LocalMRJobRunnerEndToEndTestCase(SandboxedTestCase):
@@ -129,6 +142,19 @@ class LocalMRJobRunnerEndToEndTestCase(SandboxedTestCase):
         self.assertEqual(sorted(results),
                          [(1, 'qux'), (2, 'bar'), (2, 'foo'), (5, None)])
 
+    def _read_splits(self, splits):
+        # read the lines in each split
+        lines = []
+        for split in splits:
+            if (split['start'] == 0 and split['length'] ==
+                    os.stat(split['path'])[stat.ST_SIZE]):
+                lines.append(list(read_file(split['path'])))
+            else:
+                with open(split['path'], 'rb') as f:
+                    lines.append(list(read_split(
+                        f, split['start'], split['length'], split['path'])))
+        return lines
+
     def test_get_file_splits_test(self):
         # set up input paths
         input_path = os.path.join(self.tmp_dir, 'input')
@@ -144,45 +170,131 @@ class LocalMRJobRunnerEndToEndTestCase(SandboxedTestCase):
         # split into 3 files
         file_splits = runner._get_file_splits([input_path, input_path2], 3)
 
-        # make sure we get 3 files
-        self.assertEqual(len(file_splits), 3)
+        self.assertEqual(
+            [(split['path'], split['start'], split['length'],
+              split['task_num']) for split in file_splits],
+            [(input_path, 0, 12, 0),
+             (input_path, 12, 12, 1),
+             (input_path2, 0, 12, 2)])
 
         # make sure all the data is preserved
-        content = []
-        for file_name in file_splits:
-            with open(file_name, 'rb') as f:
-                content.extend(f.readlines())
+        self.assertEqual(self._read_splits(file_splits),
+                         [[b'bar\n', b'qux\n', b'foo\n'],
+                          [b'bar\n', b'qux\n', b'foo\n'],
+                          [b'foo\n', b'bar\n', b'bar\n']])
 
-        self.assertEqual(sorted(content),
-                         [b'bar\n', b'bar\n', b'bar\n', b'bar\n', b'foo\n',
-                          b'foo\n', b'foo\n', b'qux\n', b'qux\n'])
+    def test_get_file_splits_dont_copy(self):
+        input_path = os.path.join(self.tmp_dir, 'input')
+        with open(input_path, 'wb') as input_file:
+            input_file.write(b'foo\n' * 100)
 
-    def test_get_file_splits_sorted_test(self):
-        # set up input paths
+        runner = LocalMRJobRunner(conf_paths=[])
+
+        runner._get_file_splits([input_path], 3)
+
+        self.assertEqual(os.listdir(runner._get_local_tmp_dir()), [])
+
+    def test_get_file_splits_across_lines(self):
+        # splits won't line up with lines; each line should be read
+        # by exactly one split, in order
         input_path = os.path.join(self.tmp_dir, 'input')
+        lines = [(('%d' % i) * (i % 7) + '\n').encode('ascii')
+                 for i in range(50)]
         with open(input_path, 'wb') as input_file:
-            input_file.write(
-                b'1\tbar\n1\tbar\n1\tbar\n2\tfoo\n2\tfoo\n2\tfoo\n3\tqux\n'
-                b'3\tqux\n3\tqux\n')
+            input_file.write(b''.join(lines))
 
         runner = LocalMRJobRunner(conf_paths=[])
 
-        file_splits = runner._get_file_splits([input_path], 3,
-                                              keep_sorted=True)
+        for num_splits in (1, 2, 3, 7, 10, 100):
+            file_splits = runner._get_file_splits([input_path], num_splits)
 
-        # make sure we get 3 files
-        self.assertEqual(len(file_splits), 3)
+            # splits are contiguous
+            self.assertEqual(file_splits[0]['start'], 0)
+            for prev_split, split in zip(file_splits, file_splits[1:]):
+                self.assertEqual(prev_split['start'] + prev_split['length'],
+                                 split['start'])
+            self.assertEqual(
+                file_splits[-1]['start'] + file_splits[-1]['length'],
+                os.stat(input_path)[stat.ST_SIZE])
 
-        # make sure all the data is preserved in sorted order
-        content = []
-        for file_name in sorted(file_splits.keys()):
-            with open(file_name, 'rb') as f:
-                content.extend(f.readlines())
+            self.assertEqual(sum(self._read_splits(file_splits), []), lines)
 
-        self.assertEqual(content,
-                         [b'1\tbar\n', b'1\tbar\n', b'1\tbar\n',
-                          b'2\tfoo\n', b'2\tfoo\n', b'2\tfoo\n',
-                          b'3\tqux\n', b'3\tqux\n', b'3\tqux\n'])
+    def test_get_file_splits_no_tiny_last_split(self):
+        input_path = os.path.join(self.tmp_dir, 'input')
+        with open(input_path, 'wb') as input_file:
+            input_file.write(b'x' * 105)
+
+        input_path2 = os.path.join(self.tmp_dir, 'input2')
+        with open(input_path2, 'wb') as input_file:
+            input_file.write(b'x' * 95)
+
+        input_path3 = os.path.join(self.tmp_dir, 'input3')
+        open(input_path3, 'wb').close()
+
+        runner = LocalMRJobRunner(conf_paths=[])
+
+        file_splits = runner._get_file_splits(
+            [input_path, input_path2, input_path3], 2)
+
+        # split size is 100, but the last 5 bytes of input don't get their
+        # own split. Empty files still get a split
+        self.assertEqual(
+            [(split['path'], split['start'], split['length'])
+             for split in file_splits],
+            [(input_path, 0, 105), (input_path2, 0, 95), (input_path3, 0, 0)])
+
+    def test_mappers_write_sorted_partitions(self):
+        input_path = os.path.join(self.tmp_dir, 'input')
+        with open(input_path, 'wb') as input_file:
+            input_file.write(b'qux\nbar\nfoo\nbar\nqux\nfoo\nbar\n')
+
+        mr_job = MRTwoStepJob(['-r', 'local',
+                               '--jobconf=mapred.map.tasks=2',
+                               '--jobconf=mapred.reduce.tasks=3',
+                               input_path])
+        mr_job.sandbox()
+
+        with mr_job.make_runner() as runner:
+            runner.run()
+
+            partition_paths = sorted(glob.glob(os.path.join(
+                runner._get_local_tmp_dir(), 'step-0000-mapper_part-*-*')))
+
+            # one partition for each (mapper, reducer) pair
+            self.assertEqual(len(partition_paths), 6)
+
+            lines = []
+            for path in partition_paths:
+                partition = int(path.split('-')[-1])
+                partition_lines = list(read_file(path))
+
+                self.assertEqual(partition_lines, sorted(partition_lines))
+                for line in partition_lines:
+                    self.assertEqual(
+                        _partition_for_key(line.split(b'\t')[0], 3),
+                        partition)
+
+                lines.extend(partition_lines)
+
+            # mapper outputs two lines for each line of input
+            self.assertEqual(len(lines), 14)
+
+    def test_reducer_for_each_partition(self):
+        input_path = os.path.join(self.tmp_dir, 'input')
+        open(input_path, 'wb').close()
+
+        mr_job = MRWordCount(['-r', 'local',
+                              '--jobconf=mapred.reduce.tasks=3',
+                              input_path])
+        mr_job.sandbox()
+
+        # still need a reducer for each partition (e.g. for reducer_final())
+        with mr_job.make_runner() as runner:
+            runner.run()
+
+            self.assertEqual(
+                sorted(os.listdir(runner.get_output_dir())),
+                ['part-00000', 'part-00001', 'part-00002'])
 
     def gz_test(self, dir_path_name):
         contents_gz = [b'bar\n', b'qux\n', b'foo\n', b'bar\n',
@@ -205,27 +317,22 @@ class LocalMRJobRunnerEndToEndTestCase(SandboxedTestCase):
 
         # Make sure that input.gz occurs in a single split that starts at
         # its beginning and ends at its end
-        for split_info in file_splits.values():
-            if split_info['orig_name'] == input_gz_path:
-                self.assertEqual(split_info['start'], 0)
-                self.assertEqual(split_info['length'],
-                                 os.stat(input_gz_path)[stat.ST_SIZE])
+        gz_splits = [split for split in file_splits
+                     if split['path'] == os.path.abspath(input_gz_path)]
+        self.assertEqual(len(gz_splits), 1)
+        self.assertEqual(gz_splits[0]['start'], 0)
+        self.assertEqual(gz_splits[0]['length'],
+                         os.stat(input_gz_path)[stat.ST_SIZE])
 
         # make sure we get 3 files
         self.assertEqual(len(file_splits), 3)
 
-        # make sure all the data is preserved
-        content = []
-        for file_name in file_splits:
-            lines = list(read_file(file_name))
-
-            # make sure the input_gz split got its entire contents
-            if file_name == input_gz_path:
-                self.assertEqual(lines, contents_gz)
-
-            content.extend(lines)
+        # make sure all the data is preserved, and the input_gz split
+        # got its entire contents
+        split_lines = self._read_splits(file_splits)
+        self.assertEqual(split_lines[gz_splits[0]['task_num']], contents_gz)
 
-        self.assertEqual(sorted(content),
+        self.assertEqual(sorted(sum(split_lines, [])),
                          all_contents_sorted)
 
     def test_dont_split_gz(self):
@@ -241,6 +348,111 @@ class LocalMRJobRunnerEndToEndTestCase(SandboxedTestCase):
         os.chdir(self.tmp_dir)
         self.gz_test('')
 
+    def test_split_bz2(self):
+        # with compresslevel=1, bzip2 blocks hold 100k of data each
+        lines = [('%d\n' % i).encode('ascii') for i in range(100000)]
+
+        input_bz2_path = os.path.join(self.tmp_dir, 'input.bz2')
+        with open(input_bz2_path, 'wb') as f:
+            f.write(bz2.compress(b''.join(lines), 1))
+
+        runner = LocalMRJobRunner(conf_paths=[])
+
+        file_splits = runner._get_file_splits([input_bz2_path], 4)
+        self.assertEqual(len(file_splits), 4)
+
+        split_lines = self._read_splits(file_splits)
+        self.assertEqual(sum(split_lines, []), lines)
+        # every split got some blocks
+        self.assertNotIn([], split_lines)
+
+    def test_dont_split_other_compressed_files(self):
+        input_deflate_path = os.path.join(self.tmp_dir, 'input.deflate')
+        with open(input_deflate_path, 'wb') as f:
+            f.write(zlib.compress(b'foo\n' * 10000))
+
+        runner = LocalMRJobRunner(conf_paths=[])
+
+        file_splits = runner._get_file_splits([input_deflate_path], 4)
+        self.assertEqual(len(file_splits), 1)
+        self.assertEqual(file_splits[0]['length'],
+                         os.stat(input_deflate_path)[stat.ST_SIZE])
+
+    def test_split_bz2_end_to_end(self):
+        input_bz2_path = os.path.join(self.tmp_dir, 'input.bz2')
+        with open(input_bz2_path, 'wb') as f:
+            # 600k of data, so 6 bzip2 blocks
+            f.write(bz2.compress(b''.join(
+                ('%05d%s\n' % (i, string.ascii_letters[:44])).encode('ascii')
+                for i in range(12000)), 1))
+
+        mr_job = MRWordCount(['-r', 'local',
+                              '--jobconf=mapred.map.tasks=4',
+                              input_bz2_path])
+        mr_job.sandbox()
+
+        with mr_job.make_runner() as runner:
+            runner.run()
+
+            self.assertEqual(
+                [mr_job.parse_output_line(line)
+                 for line in runner.stream_output()],
+                [(input_bz2_path, 12000)])
+
+            # each mapper ran the combiner once
+            self.assertEqual(runner.counters()[0]['count']['combiners'], 4)
+
+    def _write_gz_members(self, path, *contents):
+        # write a gzipped file made of several gzip members
+        with open(path, 'wb') as f:
+            for data in contents:
+                member = BytesIO()
+                gz = gzip.GzipFile(fileobj=member, mode='wb')
+                gz.write(data)
+                gz.close()
+                f.write(member.getvalue())
+
+    def test_dont_index_gz_by_default(self):
+        input_gz_path = os.path.join(self.tmp_dir, 'input.gz')
+        self._write_gz_members(input_gz_path, b'foo\n' * 100, b'bar\n' * 100)
+
+        runner = LocalMRJobRunner(conf_paths=[])
+
+        file_splits = runner._get_file_splits([input_gz_path], 2)
+        self.assertEqual(len(file_splits), 1)
+        self.assertFalse(os.path.exists(gzip_index_path(input_gz_path)))
+
+    def test_split_indexed_gz(self):
+        input_gz_path = os.path.join(self.tmp_dir, 'input.gz')
+        self._write_gz_members(input_gz_path, b'foo\n' * 100, b'bar\n' * 100)
+
+        runner = LocalMRJobRunner(conf_paths=[], index_gzip_input=True)
+
+        file_splits = runner._get_file_splits([input_gz_path], 2)
+        self.assertEqual(len(file_splits), 2)
+        self.assertTrue(os.path.exists(gzip_index_path(input_gz_path)))
+
+        # like LineRecordReader, the line that starts right at the end of a
+        # split goes to that split
+        self.assertEqual(self._read_splits(file_splits),
+                         [[b'foo\n'] * 100 + [b'bar\n'], [b'bar\n'] * 99])
+
+        # don't treat the index as input, and use it without
+        # index_gzip_input
+        runner = LocalMRJobRunner(conf_paths=[])
+        file_splits = runner._get_file_splits([self.tmp_dir], 2)
+        self.assertEqual([split['path'] for split in file_splits],
+                         [input_gz_path, input_gz_path])
+
+    def test_cant_split_gz_with_one_member(self):
+        input_gz_path = os.path.join(self.tmp_dir, 'input.gz')
+        self._write_gz_members(input_gz_path, b'foo\n' * 100)
+
+        runner = LocalMRJobRunner(conf_paths=[], index_gzip_input=True)
+
+        file_splits = runner._get_file_splits([input_gz_path], 2)
+        self.assertEqual(len(file_splits), 1)
+
     def test_multi_step_counters(self):
         stdin = BytesIO(b'foo\nbar\n')
 
@@ -276,7 +488,233 @@ class LocalMRJobRunnerEndToEndTestCase(SandboxedTestCase):
         with mr_job.make_runner() as r:
             splits = r._get_file_splits([gz_path_1, gz_path_2, path_3], 1)
             self.assertEqual(
-                len(set(s['task_num'] for s in splits.values())), 3)
+                len(set(s['task_num'] for s in splits)), 3)
+
+
+class LocalMaxConcurrentTasksTestCase(SandboxedTestCase):
+
+    def run_and_count_tasks(self, *args):
+        input_path = os.path.join(self.tmp_dir, 'input')
+        with open(input_path, 'wb') as input_file:
+            input_file.write(b'bar\nqux\nfoo\nbar\nqux\nfoo\n')
+
+        mr_job = MRTwoStepJob(['-r', 'local',
+                               '--jobconf=mapred.map.tasks=4',
+                               '--jobconf=mapred.reduce.tasks=3',
+                               input_path] + list(args))
+        mr_job.sandbox()
+
+        max_running = [0]
+        real_invoke_processes = LocalMRJobRunner._invoke_processes
+
+        def invoke_processes(runner, *args, **kwargs):
+            max_running[0] = max(max_running[0],
+                                 len(runner._running_tasks) + 1)
+            return real_invoke_processes(runner, *args, **kwargs)
+
+        self.start(patch.object(LocalMRJobRunner, '_invoke_processes',
+                                side_effect=invoke_processes,
+                                autospec=True))
+
+        results = []
+
+        with mr_job.make_runner() as runner:
+            runner.run()
+
+            for line in runner.stream_output():
+                results.append(mr_job.parse_output_line(line))
+
+            self.assertEqual(runner._running_tasks, [])
+
+        self.assertEqual(sorted(results),
+                         [(2, 'bar'), (2, 'foo'), (2, 'qux'), (6, None)])
+
+        return max_running[0]
+
+    def test_default_is_cpu_count(self):
+        self.start(patch('multiprocessing.cpu_count', return_value=3))
+
+        runner = LocalMRJobRunner(conf_paths=[])
+        self.assertEqual(runner._opts['local_max_concurrent_tasks'], 3)
+
+    def test_cpu_count_not_implemented(self):
+        self.start(patch('multiprocessing.cpu_count',
+                         side_effect=NotImplementedError))
+
+        runner = LocalMRJobRunner(conf_paths=[])
+        self.assertEqual(runner._opts['local_max_concurrent_tasks'], 1)
+
+    def test_one_task_at_a_time(self):
+        self.assertEqual(
+            self.run_and_count_tasks('--local-max-concurrent-tasks', '1'), 1)
+
+    def test_two_tasks_at_a_time(self):
+        self.assertEqual(
+            self.run_and_count_tasks('--local-max-concurrent-tasks', '2'), 2)
+
+    def test_more_slots_than_tasks(self):
+        self.assertEqual(
+            self.run_and_count_tasks('--local-max-concurrent-tasks', '100'),
+            4)
+
+    def test_must_be_positive(self):
+        self.assertRaises(ValueError, LocalMRJobRunner,
+                          conf_paths=[], local_max_concurrent_tasks=0)
+
+    def test_start_next_task_when_any_task_finishes(self):
+        input_path = os.path.join(self.tmp_dir, 'input')
+        with open(input_path, 'wb') as input_file:
+            input_file.write(b'bar\nqux\nfoo\n')
+
+        # task 0 is slow, so task 1 finishes first
+        mr_job = MRSlowFirstMapperJob(['-r', 'local',
+                                       '--jobconf=mapred.map.tasks=3',
+                                       '--local-max-concurrent-tasks', '2',
+                                       input_path])
+        mr_job.sandbox()
+
+        started = []
+        task_0_running = []
+        real_invoke_processes = LocalMRJobRunner._invoke_processes
+
+        def invoke_processes(runner, *args, **kwargs):
+            if len(started) == 2:
+                task_0_running.append(
+                    any(pd['proc'].poll() is None for pd in started[0]))
+
+            proc_dicts = real_invoke_processes(runner, *args, **kwargs)
+            started.append(proc_dicts)
+            return proc_dicts
+
+        self.start(patch.object(LocalMRJobRunner, '_invoke_processes',
+                                side_effect=invoke_processes,
+                                autospec=True))
+
+        with mr_job.make_runner() as runner:
+            runner.run()
+
+            self.assertEqual(
+                sorted(mr_job.parse_output_line(line)[1]
+                       for line in runner.stream_output()),
+                ['bar', 'foo', 'qux'])
+
+        self.assertEqual(len(started), 3)
+        self.assertEqual(task_0_running, [True])
+
+    def test_handle_stderr_while_task_is_running(self):
+        input_path = os.path.join(self.tmp_dir, 'input')
+        with open(input_path, 'wb') as input_file:
+            input_file.write(b'bar\nqux\n')
+
+        # task 0 sets its status, then sleeps
+        mr_job = MRSlowFirstMapperJob(['-r', 'local',
+                                       '--jobconf=mapred.map.tasks=2',
+                                       input_path])
+        mr_job.sandbox()
+
+        running_at_status = []
+        real_handle_stderr_line = LocalMRJobRunner._handle_stderr_line
+
+        def handle_stderr_line(runner, proc_dict, line):
+            if line and line.startswith(b'reporter:status:'):
+                running_at_status.append(proc_dict['proc'].poll() is None)
+
+            return real_handle_stderr_line(runner, proc_dict, line)
+
+        self.start(patch.object(LocalMRJobRunner, '_handle_stderr_line',
+                                side_effect=handle_stderr_line,
+                                autospec=True))
+
+        with mr_job.make_runner() as runner:
+            runner.run()
+
+        self.assertEqual(running_at_status, [True])
+
+
+class LocalTaskWorkersTestCase(SandboxedTestCase):
+
+    def setUp(self):
+        super(LocalTaskWorkersTestCase, self).setUp()
+
+        self.invoke_processes = self.start(patch.object(
+            LocalMRJobRunner, '_invoke_processes',
+            side_effect=LocalMRJobRunner._invoke_processes,
+            autospec=True))
+
+        self.log = self.start(patch('mrjob.local.log'))
+
+    def run_two_step_job(self, *args):
+        input_path = os.path.join(self.tmp_dir, 'input')
+        with open(input_path, 'wb') as input_file:
+            input_file.write(b'bar\nqux\nfoo\nbar\nqux\nfoo\n')
+
+        input_gz_path = os.path.join(self.tmp_dir, 'input.gz')
+        input_gz = gzip.GzipFile(input_gz_path, 'wb')
+        input_gz.write(b'foo\n')
+        input_gz.close()
+
+        mr_job = MRTwoStepJob(['-r', 'local',
+                               '--local-max-concurrent-tasks', '2',
+                               input_path, input_gz_path] + list(args))
+        mr_job.sandbox()
+
+        results = []
+
+        with mr_job.make_runner() as runner:
+            runner.run()
+
+            for line in runner.stream_output():
+                results.append(mr_job.parse_output_line(line))
+
+            self.assertEqual(runner._pool, None)
+            self.assertEqual(runner._task_results, [])
+            counters = runner.counters()
+
+        self.assertEqual(sorted(results),
+                         [(2, 'bar'), (2, 'qux'), (3, 'foo'), (7, None)])
+
+        return counters
+
+    def test_default_is_subprocesses(self):
+        self.run_two_step_job()
+        self.assertTrue(self.invoke_processes.called)
+
+    def test_task_workers(self):
+        counters = self.run_two_step_job('--local-task-workers')
+
+        self.assertFalse(self.invoke_processes.called)
+        self.assertFalse(self.log.warning.called)
+        self.assertIn('combiners', counters[0]['count'])
+
+    def test_counters_match_subprocesses(self):
+        self.assertEqual(self.run_two_step_job('--local-task-workers'),
+                         self.run_two_step_job())
+
+    def test_fall_back_to_subprocesses_for_setup(self):
+        self.run_two_step_job('--local-task-workers',
+                              '--setup', 'true')
+
+        self.assertTrue(self.invoke_processes.called)
+        self.assertTrue(self.log.warning.called)
+
+    def test_fall_back_to_subprocesses_without_job_class(self):
+        runner = LocalMRJobRunner(conf_paths=[], local_task_workers=True)
+        self.assertFalse(runner._can_use_task_workers())
+
+    def test_task_failure(self):
+        mr_job = MRVerboseJob(['-r', 'local', '--local-task-workers', '-'])
+        mr_job.sandbox(stdin=BytesIO(b'a\nb\n'))
+
+        with mr_job.make_runner() as runner:
+            self.assertRaises(StepFailedException, runner.run)
+            self.assertEqual(runner._pool, None)
+
+            self.assertEqual(runner.counters(), [{'Foo': {'Bar': 10000}}])
+
+        logged = '\n'.join(
+            args[0] for args, _ in self.log.error.call_args_list)
+        self.assertIn('Traceback', logged)
+        self.assertIn('Exception: BOOM', logged)
 
 
 class LocalMRJobRunnerNoSymlinksTestCase(LocalMRJobRunnerEndToEndTestCase):
@@ -514,6 +952,42 @@ class LocalMRJobRunnerJobConfTestCase(InlineMRJobRunnerJobConfTestCase):
     RUNNER = 'local'
 
 
+class LocalMapSortBufferTestCase(InlineMapSortBufferTestCase):
+
+    RUNNER = 'local'
+
+
+class LocalMapOutputCompressionTestCase(InlineMapOutputCompressionTestCase):
+
+    RUNNER = 'local'
+
+
+class LocalPipelineStepsTestCase(InlinePipelineStepsTestCase):
+
+    RUNNER = 'local'
+
+
+class LocalTypedBytesProtocolTestCase(InlineTypedBytesProtocolTestCase):
+
+    RUNNER = 'local'
+
+    def test_shuffle_typed_bytes(self):
+        invoke_processes = self.start(patch.object(
+            LocalMRJobRunner, '_invoke_processes',
+            side_effect=LocalMRJobRunner._invoke_processes,
+            autospec=True))
+
+        self.run_job()
+
+        procs_args = [args for c in invoke_processes.call_args_list
+                      for args in c[0][1]]
+
+        self.assertTrue(any('--from-typedbytes' in args
+                            for args in procs_args))
+        self.assertTrue(any('--to-typedbytes' in args
+                            for args in procs_args))
+
+
 class LocalMRJobRunnerNoMapperTestCase(InlineMRJobRunnerNoMapperTestCase):
 
     RUNNER = 'local'
@@ -624,8 +1098,11 @@ class CommandSubstepTestCase(SandboxedTestCase):
         data = b'x\nx\nx\nx\nx\nx\n'
         mapper_cmd = 'cat -e'
         reducer_cmd = bash_wrap('wc -l | tr -Cd "[:digit:]"')
+        # use one reducer; the other partition would be empty, and wc -l
+        # would output 0
         job = CmdJob([
             '--runner', 'local',
+            '--jobconf', 'mapreduce.job.reduces=1',
             '--mapper-cmd', mapper_cmd,
             '--combiner-cmd', 'uniq',
             '--reducer-cmd', reducer_cmd])
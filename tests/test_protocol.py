@@ -14,10 +14,14 @@
 # limitations under the License.
 
 """Make sure all of our protocols work as advertised."""
+from io import BytesIO
+
 from mrjob.protocol import BytesProtocol
 from mrjob.protocol import BytesValueProtocol
 from mrjob.protocol import JSONProtocol
 from mrjob.protocol import JSONValueProtocol
+from mrjob.protocol import MsgpackProtocol
+from mrjob.protocol import MsgpackValueProtocol
 from mrjob.protocol import PickleProtocol
 from mrjob.protocol import PickleValueProtocol
 from mrjob.protocol import RawProtocol
@@ -30,8 +34,19 @@ from mrjob.protocol import StandardJSONProtocol
 from mrjob.protocol import StandardJSONValueProtocol
 from mrjob.protocol import TextProtocol
 from mrjob.protocol import TextValueProtocol
+from mrjob.protocol import TypedBytesProtocol
+from mrjob.protocol import TypedBytesValueProtocol
 from mrjob.protocol import UltraJSONProtocol
 from mrjob.protocol import UltraJSONValueProtocol
+from mrjob.protocol import _TypedBytesToLinesWriter
+from mrjob.protocol import _msgpack_dumps_pure
+from mrjob.protocol import _msgpack_loads_pure
+from mrjob.protocol import _read_typedbytes_records
+from mrjob.protocol import _typedbytes_dumps
+from mrjob.protocol import _typedbytes_line_to_record
+from mrjob.protocol import _typedbytes_loads
+from mrjob.protocol import _typedbytes_record_to_line
+from mrjob.protocol import msgpack
 from mrjob.protocol import simplejson
 from mrjob.protocol import ujson
 from mrjob.py2 import PY2
@@ -72,6 +87,38 @@ JSON_KEYS_AND_VALUES = [
     ('\t', '\n'),
 ]
 
+# keys and values that MessagePack protocols should encode/decode correctly,
+# including the boundaries between different encodings of ints, strings,
+# bytes, lists, and dicts
+MSGPACK_KEYS_AND_VALUES = JSON_KEYS_AND_VALUES + [
+    (True, False),
+    (1.5, -0.0),
+    (b'0\xa2', b'\x00\t\n\r\\'),
+    (0, 127), (128, 255), (256, 65535), (65536, 2 ** 32 - 1),
+    (2 ** 32, 2 ** 64 - 1),
+    (-1, -32), (-33, -128), (-129, -32768), (-32769, -2 ** 31),
+    (-2 ** 31 - 1, -2 ** 63),
+    (u'x' * 31, u'x' * 32), (u'x' * 256, u'x' * 70000),
+    (b'x' * 256, b'x' * 70000),
+    (list(range(15)), list(range(16))), (list(range(70000)), []),
+    (dict((i, i) for i in range(15)),
+     dict((str(i), [i]) for i in range(16))),
+]
+
+# keys and values that typed bytes protocols should encode/decode correctly
+# (typed bytes has no null type)
+TYPEDBYTES_KEYS_AND_VALUES = [
+    (k, v) for k, v in JSON_KEYS_AND_VALUES if k is not None
+] + [
+    (True, False),
+    (1.5, -0.0),
+    (b'0\xa2', b'\x00\t\n\r\\'),
+    (2 ** 31 - 1, 2 ** 31), (-2 ** 31, -2 ** 31 - 1),
+    (2 ** 63 - 1, -2 ** 63),
+    (u'x' * 70000, b'x' * 70000),
+    ([[1, u'a'], {2: [b'b']}], list(range(70000))),
+]
+
 # keys and values that repr protocols should encode/decode correctly
 REPR_KEYS_AND_VALUES = JSON_KEYS_AND_VALUES + [
     ((1, 2), (3, 4)),
@@ -100,6 +147,19 @@ class ProtocolTestCase(TestCase):
         self.assertEqual((key, value),
                          protocol.read(protocol.write(key, value) + b'\t'))
 
+    def assertReadAndWriteManyOK(self, protocol, pairs):
+        """Assert that read_many() and write_many() do the same thing as
+        read() and write() on each record."""
+        lines = [protocol.write(k, v) for k, v in pairs]
+
+        self.assertEqual(protocol.write_many(pairs),
+                         b''.join(line + b'\n' for line in lines))
+        self.assertEqual(protocol.write_many([]), b'')
+
+        self.assertEqual(protocol.read_many(lines),
+                         [protocol.read(line) for line in lines])
+        self.assertEqual(protocol.read_many([]), [])
+
     def assertCantEncode(self, protocol, key, value):
         self.assertRaises(Exception, protocol.write, key, value)
 
@@ -107,6 +167,81 @@ class ProtocolTestCase(TestCase):
         self.assertRaises(Exception, protocol.read, data)
 
 
+class ReadKeyTestCase(TestCase):
+
+    def test_read_key_and_value(self):
+        p = JSONProtocol()
+
+        key, raw_value = p.read_key(b'"a"\t{"x": 1}')
+        self.assertEqual(key, 'a')
+        self.assertEqual(raw_value, b'{"x": 1}')
+        self.assertEqual(p.read_value(raw_value), {'x': 1})
+
+    def test_key_cached(self):
+        p = PickleProtocol()
+        lines = [p.write(k, v) for k, v in [([1], 'a'), ([1], 'b')]]
+
+        self.assertIs(p.read_key(lines[0])[0], p.read_key(lines[1])[0])
+
+    def test_bad_value_only_raised_when_read(self):
+        p = JSONProtocol()
+
+        key, raw_value = p.read_key(b'"a"\t{bad}')
+        self.assertEqual(key, 'a')
+        self.assertRaises(ValueError, p.read_value, raw_value)
+
+
+class DecodeCacheTestCase(TestCase):
+
+    def test_off_by_default(self):
+        p = JSONProtocol()
+        self.assertEqual(p.read(b'1\t2'), (1, 2))
+        self.assertEqual(p.decode_cache_stats(), {})
+
+    def test_cache_keys_and_values(self):
+        p = JSONProtocol(decode_cache_size=10)
+
+        self.assertEqual(p.read(b'"a"\t{"x": 1}'), ('a', {'x': 1}))
+        self.assertEqual(p.read(b'"b"\t{"x": 1}'), ('b', {'x': 1}))
+        self.assertEqual(p.read(b'"b"\t"a"'), ('b', 'a'))
+
+        # the last key is cached separately, so "b" is only decoded once,
+        # and never looked up in the cache
+        self.assertEqual(p.decode_cache_stats(), dict(hits=2, misses=3))
+
+    def test_read_many(self):
+        p = PickleProtocol(decode_cache_size=10)
+        lines = [p.write(k, v) for k, v in [(1, 'a'), (2, 'a'), (1, 'a')]]
+
+        self.assertEqual(p.read_many(lines), [(1, 'a'), (2, 'a'), (1, 'a')])
+        self.assertEqual(p.decode_cache_stats(), dict(hits=3, misses=3))
+
+    def test_same_decoded_object(self):
+        p = JSONProtocol(decode_cache_size=10)
+
+        self.assertIs(p.read(b'1\t[1]')[1], p.read(b'2\t[1]')[1])
+
+    def test_bounded(self):
+        p = JSONProtocol(decode_cache_size=4)
+
+        for i in range(100):
+            p.read(('"k"\t%d' % i).encode('ascii'))
+
+        self.assertLessEqual(
+            len(p._decode_cache._new) + len(p._decode_cache._old), 4)
+
+        # recently used values are still cached
+        p.read(b'"k"\t99')
+        self.assertEqual(p.decode_cache_stats(), dict(hits=1, misses=101))
+
+    def test_errors_not_cached(self):
+        p = JSONProtocol(decode_cache_size=10)
+
+        self.assertRaises(Exception, p.read, b'1\t{')
+        self.assertRaises(Exception, p.read, b'1\t{')
+        self.assertEqual(p.decode_cache_stats(), dict(hits=0, misses=1))
+
+
 class JSONProtocolAliasesTestCase(TestCase):
 
     def test_use_ujson_or_simplejson_if_installed(self):
@@ -135,6 +270,13 @@ class StandardJSONProtocolTestCase(ProtocolTestCase):
         for k, v in JSON_KEYS_AND_VALUES:
             self.assertRoundTripWithTrailingTabOK(self.PROTOCOL, k, v)
 
+    def test_read_and_write_many(self):
+        self.assertReadAndWriteManyOK(self.PROTOCOL, JSON_KEYS_AND_VALUES)
+
+    def test_read_many_bad_data(self):
+        self.assertRaises(Exception, self.PROTOCOL.read_many,
+                          [b'1\t2', b'{@#$@#!^&*$%^'])
+
     def test_uses_json_format(self):
         KEY = ['a', 1]
         VALUE = {'foo': 'bar'}
@@ -277,6 +419,12 @@ class PickleProtocolTestCase(ProtocolTestCase):
         for k, v in PICKLE_KEYS_AND_VALUES:
             self.assertRoundTripWithTrailingTabOK(PickleProtocol(), k, v)
 
+    def test_read_and_write_many(self):
+        # repeat keys, to exercise key caching
+        self.assertReadAndWriteManyOK(
+            PickleProtocol(), PICKLE_KEYS_AND_VALUES * 2 +
+            [(Point(1, 2), 3)] * 3)
+
     def test_bad_data(self):
         self.assertCantDecode(PickleProtocol(), b'{@#$@#!^&*$%^')
 
@@ -300,6 +448,231 @@ class PickleValueProtocolTestCase(ProtocolTestCase):
     # no tests of what encoded data looks like; pickle is an opaque protocol
 
 
+class MsgpackProtocolTestCase(ProtocolTestCase):
+
+    def test_round_trip(self):
+        for k, v in MSGPACK_KEYS_AND_VALUES:
+            self.assertRoundTripOK(MsgpackProtocol(), k, v)
+
+    def test_round_trip_with_trailing_tab(self):
+        for k, v in MSGPACK_KEYS_AND_VALUES:
+            self.assertRoundTripWithTrailingTabOK(MsgpackProtocol(), k, v)
+
+    def test_tuples_become_lists(self):
+        self.assertEqual(
+            ([1, 2], [3, 4]),
+            MsgpackProtocol().read(MsgpackProtocol().write((1, 2), (3, 4))))
+
+    def test_uses_msgpack_format(self):
+        # example from msgpack.org
+        self.assertEqual(
+            MsgpackProtocol().write(u'x', {u'compact': True, u'schema': 0}),
+            b'\xa1x\t\x82\xa7compact\xc3\xa6schema\x00')
+
+    def test_escapes_tabs_and_newlines(self):
+        line = MsgpackProtocol().write(b'\t', b'\n\r')
+
+        self.assertEqual(line.count(b'\t'), 1)
+        self.assertNotIn(b'\n', line)
+        self.assertNotIn(b'\r', line)
+
+    def test_smaller_than_json_despite_escaping(self):
+        def encoded_size(protocol, records):
+            return sum(len(protocol.write(k, v)) for k, v in records)
+
+        # 9, 10, 13, and 92 encode as bytes that need escaping
+        records = [
+            (u'user%d' % i,
+             {u'id': i, u'score': i * 0.5, u'tags': [9, 10, 13, 92],
+              u'name': u'tab\there'})
+            for i in range(100)]
+
+        self.assertLess(encoded_size(MsgpackProtocol(), records),
+                        encoded_size(JSONProtocol(), records))
+
+        # at worst, escaping doubles the size of the encoded data
+        worst = [([9] * 100, [10] * 100)]
+        unescaped_size = sum(len(_msgpack_dumps_pure(k)) +
+                             len(_msgpack_dumps_pure(v))
+                             for k, v in worst)
+
+        self.assertLessEqual(encoded_size(MsgpackProtocol(), worst),
+                             2 * unescaped_size + 1)
+
+    def test_read_and_write_many(self):
+        self.assertReadAndWriteManyOK(MsgpackProtocol(),
+                                      MSGPACK_KEYS_AND_VALUES)
+
+    def test_bad_data(self):
+        self.assertCantDecode(MsgpackProtocol(), b'{@#$@#!^&*$%^\t1')
+        # truncated
+        self.assertCantDecode(MsgpackProtocol(), b'\xa3fo\t1')
+        # extra data
+        self.assertCantDecode(MsgpackProtocol(), b'\xa1foo\t1')
+        # bad escape sequence
+        self.assertCantDecode(MsgpackProtocol(), b'\\x\t1')
+
+    def test_bad_keys_and_values(self):
+        self.assertCantEncode(MsgpackProtocol(), set([1]), set())
+        self.assertCantEncode(MsgpackProtocol(), Point(2, 3), Point(1, 4))
+        self.assertCantEncode(MsgpackProtocol(), 2 ** 64, None)
+
+
+class MsgpackValueProtocolTestCase(ProtocolTestCase):
+
+    def test_round_trip(self):
+        for _, v in MSGPACK_KEYS_AND_VALUES:
+            self.assertRoundTripOK(MsgpackValueProtocol(), None, v)
+
+    def test_dont_encode_key(self):
+        self.assertEqual(MsgpackValueProtocol().write(u'foo', u'bar'),
+                         b'\xa3bar')
+
+
+class PureMsgpackTestCase(TestCase):
+
+    # these are always tested, even if the msgpack library is installed
+
+    def test_round_trip(self):
+        for k, v in MSGPACK_KEYS_AND_VALUES:
+            self.assertEqual(_msgpack_loads_pure(_msgpack_dumps_pure(v)), v)
+
+    @skipIf(msgpack is None, 'msgpack module not installed')
+    def test_same_as_msgpack_library(self):
+        for _, v in MSGPACK_KEYS_AND_VALUES:
+            self.assertEqual(_msgpack_dumps_pure(v),
+                             msgpack.packb(v, use_bin_type=True))
+
+
+class TypedBytesProtocolTestCase(ProtocolTestCase):
+
+    def test_round_trip(self):
+        for k, v in TYPEDBYTES_KEYS_AND_VALUES:
+            self.assertRoundTripOK(TypedBytesProtocol(), k, v)
+
+    def test_round_trip_with_trailing_tab(self):
+        for k, v in TYPEDBYTES_KEYS_AND_VALUES:
+            self.assertRoundTripWithTrailingTabOK(TypedBytesProtocol(), k, v)
+
+    def test_uses_typedbytes_format(self):
+        self.assertEqual(
+            TypedBytesProtocol().write(u'x', [1, True]),
+            b'\x07\x00\x00\x00\x01x\t'
+            b'\x08\x00\x00\x00\x02\x03\x00\x00\x00\x01\x02\x01')
+
+    def test_escapes_tabs_and_newlines(self):
+        line = TypedBytesProtocol().write(b'\t', b'\n\r')
+
+        self.assertEqual(line.count(b'\t'), 1)
+        self.assertNotIn(b'\n', line)
+        self.assertNotIn(b'\r', line)
+
+    def test_read_and_write_many(self):
+        self.assertReadAndWriteManyOK(TypedBytesProtocol(),
+                                      TYPEDBYTES_KEYS_AND_VALUES)
+
+    def test_bad_data(self):
+        self.assertCantDecode(TypedBytesProtocol(), b'{@#$@#!^&*$%^\t1')
+        # truncated
+        self.assertCantDecode(TypedBytesProtocol(),
+                              b'\x07\x00\x00\x00\x03fo\t\x02\x01')
+        # extra data
+        self.assertCantDecode(TypedBytesProtocol(),
+                              b'\x02\x01\x01\t\x02\x01')
+
+    def test_bad_keys_and_values(self):
+        self.assertCantEncode(TypedBytesProtocol(), None, None)
+        self.assertCantEncode(TypedBytesProtocol(), set([1]), set())
+        self.assertCantEncode(TypedBytesProtocol(), Point(2, 3), Point(1, 4))
+        self.assertCantEncode(TypedBytesProtocol(), 2 ** 63, 1)
+
+    def test_hadoop_types(self):
+        # types we don't write, but Hadoop might
+        self.assertEqual(_typedbytes_loads(b'\x01\xff'), -1)
+        self.assertEqual(_typedbytes_loads(b'\x04' + b'\x00' * 7 + b'\x01'),
+                         1)
+        self.assertEqual(_typedbytes_loads(b'\x05?\xc0\x00\x00'), 1.5)
+        self.assertEqual(
+            _typedbytes_loads(b'\x09\x03\x00\x00\x00\x01\x02\x00\xff'),
+            [1, False])
+        # application-specific type
+        self.assertEqual(_typedbytes_loads(b'\x32\x00\x00\x00\x01z'), b'z')
+
+
+class TypedBytesValueProtocolTestCase(ProtocolTestCase):
+
+    def test_round_trip(self):
+        for _, v in TYPEDBYTES_KEYS_AND_VALUES:
+            self.assertRoundTripOK(TypedBytesValueProtocol(), None, v)
+
+    def test_writes_empty_key(self):
+        self.assertEqual(TypedBytesValueProtocol().write(u'foo', True),
+                         b'\x00\x00\x00\x00\x00\t\x02\x01')
+
+    def test_read_without_key(self):
+        self.assertEqual(TypedBytesValueProtocol().read(b'\x02\x01'),
+                         (None, True))
+
+
+class TypedBytesRecordsTestCase(TestCase):
+
+    RECORDS = [
+        (_typedbytes_dumps(k), _typedbytes_dumps(v))
+        for k, v in TYPEDBYTES_KEYS_AND_VALUES
+    ]
+
+    DATA = b''.join(k + v for k, v in RECORDS)
+
+    def test_read_whole(self):
+        self.assertEqual(list(_read_typedbytes_records([self.DATA])),
+                         self.RECORDS)
+
+    def test_read_in_chunks(self):
+        for chunk_size in (1, 7, 1000, 100000):
+            chunks = [self.DATA[i:i + chunk_size]
+                      for i in range(0, len(self.DATA), chunk_size)]
+
+            self.assertEqual(list(_read_typedbytes_records(chunks)),
+                             self.RECORDS)
+
+    def test_truncated(self):
+        self.assertRaises(ValueError, list,
+                          _read_typedbytes_records([self.DATA[:-1]]))
+
+    def test_empty(self):
+        self.assertEqual(list(_read_typedbytes_records([])), [])
+
+    def test_lines(self):
+        for k, v in self.RECORDS:
+            line = _typedbytes_record_to_line(k, v)
+            self.assertNotIn(b'\n', line)
+            self.assertEqual(_typedbytes_line_to_record(line), k + v)
+            self.assertEqual(TypedBytesProtocol().read(line),
+                             (_typedbytes_loads(k), _typedbytes_loads(v)))
+
+    def test_line_with_no_key(self):
+        self.assertRaises(ValueError, _typedbytes_line_to_record, b'\x02\x01')
+
+    def test_lines_writer(self):
+        expected = b''.join(_typedbytes_record_to_line(k, v) + b'\n'
+                            for k, v in self.RECORDS)
+
+        for chunk_size in (1, 7, 1000, 100000):
+            output = BytesIO()
+
+            with _TypedBytesToLinesWriter(output) as writer:
+                for i in range(0, len(self.DATA), chunk_size):
+                    writer.write(self.DATA[i:i + chunk_size])
+
+            self.assertEqual(output.getvalue(), expected)
+
+    def test_lines_writer_truncated(self):
+        writer = _TypedBytesToLinesWriter(BytesIO())
+        writer.write(self.DATA[:-1])
+
+        self.assertRaises(ValueError, writer.close)
+
+
 class RawProtocolAliasesTestCase(TestCase):
 
     def test_raw_protocol_aliases(self):
@@ -327,6 +700,11 @@ class BytesValueProtocolTestCase(ProtocolTestCase):
         self.assertEqual(BytesValueProtocol().read(b'foo\t \n\n'),
                          (None, b'foo\t \n\n'))
 
+    def test_read_and_write_many(self):
+        self.assertReadAndWriteManyOK(
+            BytesValueProtocol(), [(None, b'foo'), (b'bar', b'\xe9'),
+                                   (None, b'')])
+
 
 class TextValueProtocolTestCase(ProtocolTestCase):
 
@@ -349,6 +727,22 @@ class TextValueProtocolTestCase(ProtocolTestCase):
         self.assertEqual(TextValueProtocol().read(b'foo\t \n\n'),
                          (None, u'foo\t \n\n'))
 
+    def test_read_and_write_many(self):
+        self.assertReadAndWriteManyOK(
+            TextValueProtocol(), [(None, u'foo'), (u'bar', u'caf\xe9'),
+                                  (None, u'')])
+
+    def test_read_many_falls_back_to_latin_1(self):
+        # only for the line that isn't UTF-8
+        self.assertEqual(
+            TextValueProtocol().read_many([b'caf\xc3\xa9', b'caf\xe9']),
+            [(None, u'caf\xe9'), (None, u'caf\xe9')])
+
+    def test_read_many_no_strip(self):
+        self.assertEqual(
+            TextValueProtocol().read_many([b'foo\n', b'bar']),
+            [(None, u'foo\n'), (None, u'bar')])
+
 
 class BytesProtocolTestCase(ProtocolTestCase):
 
@@ -380,6 +774,11 @@ class BytesProtocolTestCase(ProtocolTestCase):
         self.assertEqual(BytesProtocol().read(b'foo\t \n\n'),
                          (b'foo', b' \n\n'))
 
+    def test_read_and_write_many(self):
+        self.assertReadAndWriteManyOK(
+            BytesProtocol(), [(b'foo', b'bar'), (b'foo', None),
+                              (b'caf\xe9', b'bar\tbaz')])
+
 
 class TextProtocolTestCase(ProtocolTestCase):
 
@@ -420,6 +819,17 @@ class TextProtocolTestCase(ProtocolTestCase):
         self.assertEqual(TextProtocol().read(b'caf\xe9\tol\xc3\xa9'),
                          (u'caf\xe9', u'ol\xc3\xa9'))
 
+    def test_read_and_write_many(self):
+        self.assertReadAndWriteManyOK(
+            TextProtocol(), [(u'foo', u'bar'), (u'foo', None),
+                             (u'caf\xe9', u'bar\tbaz'), (u'', None)])
+
+    def test_read_many_latin_1_fallback(self):
+        self.assertEqual(
+            TextProtocol().read_many([b'caf\xc3\xa9\tol\xc3\xa9',
+                                      b'caf\xe9\tol\xc3\xa9']),
+            [(u'caf\xe9', u'ol\xe9'), (u'caf\xe9', u'ol\xc3\xa9')])
+
 
 class ReprProtocolTestCase(ProtocolTestCase):
 
@@ -389,6 +389,16 @@ sys.exit(13)
         self.assertRaises(ValueError,
                           runner._invoke_sort, [], self.out)
 
+    def test_deprecated(self):
+        runner = MRJobRunner(conf_paths=[])
+        self.addCleanup(runner.cleanup)
+
+        with patch('mrjob.runner.log') as log:
+            runner._invoke_sort([self.a], self.out)
+
+        self.assertTrue(log.warning.called)
+        self.assertIn('deprecated', log.warning.call_args[0][0])
+
     def test_one_file(self):
         runner = MRJobRunner(conf_paths=[])
         self.addCleanup(runner.cleanup)
@@ -556,6 +566,16 @@ class HadoopArgsForStepTestCase(EmptyMrjobConfTestCase):
                           '-D', 'FOO=bar',
                           ])
 
+    def test_shuffle_io_from_step(self):
+        runner = LocalMRJobRunner(jobconf={'stream.reduce.input': 'text'})
+        runner._steps = [{'shuffle_io': 'typedbytes'}]
+
+        # user can still override it
+        self.assertEqual(runner._hadoop_args_for_step(0),
+                         ['-D', 'stream.map.output=typedbytes',
+                          '-D', 'stream.reduce.input=text',
+                          ])
+
     def test_partitioner(self):
         partitioner = 'org.apache.hadoop.mapreduce.Partitioner'
         job = MRWordCount(['--partitioner', partitioner])
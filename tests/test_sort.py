@@ -0,0 +1,168 @@
+# Copyright 2017 Yelp
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests of mrjob.sort"""
+import os
+from io import BytesIO
+
+from mrjob.sort import SortAndCombineWriter
+from mrjob.sort import sort_and_combine
+from mrjob.sort import sort_lines
+
+from tests.sandbox import SandboxedTestCase
+
+
+class SortLinesTestCase(SandboxedTestCase):
+
+    def sort(self, lines, **kwargs):
+        return list(sort_lines(lines, self.tmp_dir, **kwargs))
+
+    def test_empty(self):
+        self.assertEqual(self.sort([]), [])
+
+    def test_in_memory(self):
+        self.assertEqual(self.sort([b'b\n', b'c\n', b'a\n']),
+                         [b'a\n', b'b\n', b'c\n'])
+
+    def test_adds_missing_newline(self):
+        self.assertEqual(self.sort([b'b\n', b'a']), [b'a\n', b'b\n'])
+
+    def test_ignores_newline_when_comparing(self):
+        # this is how sort works with LC_ALL=C; '\t' < '\n'
+        self.assertEqual(self.sort([b'a\tb\n', b'a\n']),
+                         [b'a\n', b'a\tb\n'])
+
+    def test_bytewise(self):
+        self.assertEqual(self.sort([b'a\n', b'B\n', b'\xe2\x98\x83\n']),
+                         [b'B\n', b'a\n', b'\xe2\x98\x83\n'])
+
+    def test_spill_to_disk(self):
+        lines = [('%d\tfoo\n' % (i * 7 % 100)).encode('ascii')
+                 for i in range(100)]
+
+        self.assertEqual(self.sort(lines, buffer_size=50),
+                         sorted(lines, key=lambda line: line[:-1]))
+
+        # temp files are cleaned up
+        self.assertEqual(os.listdir(self.tmp_dir), [])
+
+    def test_cleanup_after_partial_read(self):
+        lines = [b'c\n', b'b\n', b'a\n', b'd\n']
+
+        sorted_lines = sort_lines(lines, self.tmp_dir, buffer_size=2)
+        self.assertEqual(next(sorted_lines), b'a\n')
+        self.assertNotEqual(os.listdir(self.tmp_dir), [])
+
+        sorted_lines.close()
+        self.assertEqual(os.listdir(self.tmp_dir), [])
+
+
+class SortAndCombineTestCase(SandboxedTestCase):
+
+    def setUp(self):
+        super(SortAndCombineTestCase, self).setUp()
+        self.combiner_inputs = []
+
+    def combine(self, lines, output_file):
+        # sum up values for each key, like a word count combiner
+        lines = list(lines)
+        self.combiner_inputs.append(lines)
+
+        totals = {}
+        for line in lines:
+            key, value = line.rstrip(b'\n').split(b'\t')
+            totals[key] = totals.get(key, 0) + int(value)
+
+        # output in reverse order, to make sure we re-sort it
+        for key in sorted(totals, reverse=True):
+            output_file.write(key + b'\t' + str(totals[key]).encode('ascii'))
+            output_file.write(b'\n')
+
+    def sort_and_combine(self, lines, **kwargs):
+        output_file = BytesIO()
+        sort_and_combine(lines, output_file, self.combine, self.tmp_dir,
+                         **kwargs)
+        return output_file.getvalue()
+
+    def test_empty(self):
+        self.assertEqual(self.sort_and_combine([]), b'')
+        # combiner still runs
+        self.assertEqual(self.combiner_inputs, [[]])
+
+    def test_in_memory(self):
+        self.assertEqual(
+            self.sort_and_combine([b'b\t1\n', b'a\t1\n', b'b\t1\n']),
+            b'b\t2\na\t1\n')
+
+        self.assertEqual(self.combiner_inputs,
+                         [[b'a\t1\n', b'b\t1\n', b'b\t1\n']])
+
+    def test_spill(self):
+        lines = [b'a\t1\n', b'b\t1\n', b'a\t1\n', b'c\t1\n'] * 10
+
+        self.assertEqual(self.sort_and_combine(lines, buffer_size=20),
+                         b'c\t10\nb\t10\na\t20\n')
+
+        # combined each spill, then the merged spills
+        self.assertGreater(len(self.combiner_inputs), 2)
+        merged = self.combiner_inputs[-1]
+        self.assertEqual(merged, sorted(merged))
+
+        # temp files are cleaned up
+        self.assertEqual(os.listdir(self.tmp_dir), [])
+
+    def test_writer(self):
+        output_file = BytesIO()
+
+        with SortAndCombineWriter(output_file, self.combine,
+                                  self.tmp_dir) as writer:
+            # lines can be split across writes
+            writer.write(b'b\t1\na\t')
+            writer.write(b'1\nb\t1')
+            writer.flush()
+
+            self.assertEqual(output_file.getvalue(), b'')
+
+        self.assertEqual(output_file.getvalue(), b'b\t2\na\t1\n')
+        self.assertEqual(self.combiner_inputs,
+                         [[b'a\t1\n', b'b\t1\n', b'b\t1\n']])
+
+    def test_writer_without_combiner(self):
+        output_file = BytesIO()
+
+        with SortAndCombineWriter(output_file, None, self.tmp_dir,
+                                  buffer_size=20) as writer:
+            for i in range(10):
+                writer.write(b'b\t1\na\t1\n')
+
+            # spilled to disk
+            self.assertNotEqual(os.listdir(self.tmp_dir), [])
+
+        self.assertEqual(output_file.getvalue(),
+                         b'a\t1\n' * 10 + b'b\t1\n' * 10)
+        self.assertEqual(os.listdir(self.tmp_dir), [])
+
+    def test_writer_cleans_up_after_error(self):
+        output_file = BytesIO()
+
+        def write_and_fail():
+            with SortAndCombineWriter(output_file, self.combine,
+                                      self.tmp_dir, buffer_size=5) as writer:
+                writer.write(b'a\t1\nb\t1\n')
+                raise ValueError
+
+        self.assertRaises(ValueError, write_and_fail)
+
+        # combiner didn't run on partial output
+        self.assertEqual(output_file.getvalue(), b'')
+        self.assertEqual(os.listdir(self.tmp_dir), [])
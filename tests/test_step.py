@@ -222,6 +222,19 @@ class MRStepInitTestCase(TestCase):
     def test_explicit_reducer_pre_filter(self):
         self._test_explicit(reducer_pre_filter='cat', r=True)
 
+    # batch
+
+    def test_explicit_mapper_batch(self):
+        self._test_explicit(mapper_batch=identity_mapper, m=True)
+
+    def test_explicit_reducer_batch(self):
+        self._test_explicit(reducer_batch=identity_reducer, r=True)
+
+    # aggregate
+
+    def test_explicit_mapper_aggregate(self):
+        self._test_explicit(mapper_aggregate=max, m=True)
+
     ### Conflicts ###
 
     def _test_conflict(self, **kwargs):
@@ -236,6 +249,20 @@ class MRStepInitTestCase(TestCase):
     def test_conflict_reducer(self):
         self._test_conflict(reducer_cmd='cat', reducer=identity_reducer)
 
+    def test_conflict_mapper_batch(self):
+        self._test_conflict(mapper_batch=identity_mapper,
+                            mapper=identity_mapper)
+        self._test_conflict(mapper_batch=identity_mapper, mapper_cmd='cat')
+
+    def test_conflict_reducer_batch(self):
+        self._test_conflict(reducer_batch=identity_reducer,
+                            reducer=identity_reducer)
+        self._test_conflict(reducer_batch=identity_reducer,
+                            reducer_cmd='cat')
+
+    def test_conflict_mapper_aggregate(self):
+        self._test_conflict(mapper_aggregate=max, mapper_cmd='cat')
+
 
 class MRStepGetItemTestCase(TestCase):
 
@@ -26,6 +26,8 @@ from subprocess import Popen
 
 from mrjob.py2 import PY2
 from mrjob.py2 import StringIO
+from mrjob.util import _ChunkReader
+from mrjob.util import _read_ahead
 from mrjob.util import buffer_iterator_to_line_iterator
 from mrjob.util import cmd_line
 from mrjob.util import file_ext
@@ -42,6 +44,7 @@ from mrjob.util import unarchive
 from mrjob.util import unique
 from mrjob.util import which
 
+from tests.compress import gzip_compress
 from tests.py2 import TestCase
 from tests.py2 import patch
 from tests.quiet import no_handlers_for_logger
@@ -94,6 +97,18 @@ class ToLinesTestCase(TestCase):
                  for i in range(0, len(super_long_line), 1024)))),
             [b'a' * 10000 + b'\n', b'b' * 1000 + b'\n', b'last\n'])
 
+    def test_line_across_many_chunks(self):
+        self.assertEqual(
+            list(to_lines(chunk for chunk in
+                          [b'The', b' quick', b' brown\nfox', b'\n'])),
+            [b'The quick brown\n', b'fox\n'])
+
+    def test_only_break_on_newlines(self):
+        self.assertEqual(
+            list(to_lines(chunk for chunk in
+                          [b'foo\r\nbar\rbaz\nq', b'ux\r', b'\n'])),
+            [b'foo\r\n', b'bar\rbaz\n', b'qux\r\n'])
+
     def test_deprecated_alias(self):
         with no_handlers_for_logger('mrjob.util'):
             stderr = StringIO()
@@ -299,6 +314,82 @@ class ReadInputTestCase(TestCase):
                           read_input(os.path.join(self.tmpdir, 'lions*')))
 
 
+class ReadAheadTestCase(TestCase):
+
+    def test_empty(self):
+        self.assertEqual(list(_read_ahead([], 4)), [])
+
+    def test_yields_results_in_order(self):
+        funcs = [(lambda i=i: i * i) for i in range(20)]
+
+        self.assertEqual(list(_read_ahead(funcs, 4)),
+                         [i * i for i in range(20)])
+
+    def test_no_pool(self):
+        funcs = [(lambda i=i: i) for i in range(5)]
+
+        with patch('mrjob.util.ThreadPool') as mock_pool:
+            self.assertEqual(list(_read_ahead(funcs, 1)), list(range(5)))
+
+        self.assertFalse(mock_pool.called)
+
+    def test_reads_ahead_lazily(self):
+        called = []
+
+        def funcs():
+            for i in range(100):
+                yield (lambda i=i: called.append(i) or i)
+
+        results = _read_ahead(funcs(), 4)
+        self.assertEqual(next(results), 0)
+        results.close()
+
+        # we never asked for more than 4 results
+        self.assertLessEqual(len(called), 4)
+
+    def test_error(self):
+        def boom():
+            raise IOError
+
+        results = _read_ahead([lambda: 1, boom, lambda: 3], 4)
+
+        self.assertEqual(next(results), 1)
+        self.assertRaises(IOError, next, results)
+
+
+class ChunkReaderTestCase(TestCase):
+
+    CHUNKS = [b'foo\nb', b'', b'ar\nbaz', b'\nqux']
+
+    def test_read_all(self):
+        self.assertEqual(_ChunkReader(self.CHUNKS).read(),
+                         b'foo\nbar\nbaz\nqux')
+
+    def test_read_sizes(self):
+        reader = _ChunkReader(self.CHUNKS)
+
+        self.assertEqual(reader.read(2), b'fo')
+        self.assertEqual(reader.read(5), b'o\nbar')
+        self.assertEqual(reader.read(0), b'')
+        self.assertEqual(reader.read(100), b'\nbaz\nqux')
+        self.assertEqual(reader.read(100), b'')
+
+    def test_iterate_after_read(self):
+        reader = _ChunkReader(self.CHUNKS)
+
+        self.assertEqual(reader.read(2), b'fo')
+        self.assertEqual(list(reader), [b'o\nb', b'', b'ar\nbaz', b'\nqux'])
+
+    def test_read_gz_file(self):
+        data = b'bar\nfoo\n' * 1000
+        gz_data = gzip_compress(data)
+        chunks = [gz_data[i:i + 100] for i in range(0, len(gz_data), 100)]
+
+        lines = read_file('data.gz', fileobj=_ChunkReader(chunks),
+                          yields_lines=False)
+        self.assertEqual(b''.join(lines), data)
+
+
 class SafeEvalTestCase(TestCase):
 
     def test_simple_data_structures(self):
@@ -541,6 +632,15 @@ class ReadFileTestCase(TestCase):
 
         self.assertEqual(output, [b'foo\n', b'bar\n'])
 
+    def test_read_gz_file_in_background(self):
+        input_gz_path = os.path.join(self.tmp_dir, 'input.gz')
+        input_gz = gzip.GzipFile(input_gz_path, 'wb')
+        input_gz.write(b'foo\nbar\n')
+        input_gz.close()
+
+        self.assertEqual(list(read_file(input_gz_path, background=True)),
+                         [b'foo\n', b'bar\n'])
+
     def test_read_bz2_file(self):
         input_bz2_path = os.path.join(self.tmp_dir, 'input.bz2')
         input_bz2 = bz2.BZ2File(input_bz2_path, 'wb')
@@ -43,6 +43,7 @@ class ClusterInspectionTestCase(ToolTestCase):
                 'bootstrap_spark': None,
                 'cloud_fs_sync_secs': None,
                 'cloud_log_dir': None,
+                'cloud_max_concurrent_uploads': None,
                 'cloud_tmp_dir': None,
                 'cloud_upload_part_size': None,
                 'conf_paths': None,